@@ -0,0 +1,248 @@
+import csv, json, os, sys, tempfile, time, tracemalloc
+
+from . import extract, load, transform
+
+
+class Benchmark:
+    """
+    Measures the throughput of ETL stages against synthetic rows
+
+    Each case returns a list of result dicts, one per implementation being
+    compared.
+    """
+    case_list = [
+        "json_extract",
+        "csv_load",
+        "key_transform",
+    ]
+    # The number of keys in each row, for the key_transform case
+    wide_key_count = 50
+
+    def __init__(self, row_count, trace_memory=False, directory_path=None):
+        self.row_count = row_count
+        self.trace_memory = trace_memory
+        self.directory_path = directory_path
+
+    def run(self, case):
+        assert case in self.case_list, (
+            f"case must be one of {self.case_list}"
+        )
+
+        with tempfile.TemporaryDirectory(dir=self.directory_path) as directory_path:
+            return getattr(self, f"run_{case}")(directory_path)
+
+    def run_json_extract(self, directory_path):
+        array_path = os.path.join(directory_path, "data.json")
+        newline_path = os.path.join(directory_path, "data.ndjson")
+
+        with open(array_path, "w") as open_file:
+            open_file.write('{"results": [')
+
+            for row_number, row in enumerate(self.make_rows()):
+
+                if row_number:
+                    open_file.write(",")
+
+                open_file.write(json.dumps(row))
+
+            open_file.write("]}")
+
+        with open(newline_path, "w") as open_file:
+
+            for row in self.make_rows():
+                open_file.write(json.dumps(row) + "\n")
+
+        class JsonExtractor(extract.JsonFileExtractor):
+            file_path = array_path
+
+            def get_data_list(self, data):
+                return data["results"]
+
+        class IncrementalJsonExtractor(extract.JsonFileExtractor):
+            file_path = array_path
+            incremental = True
+            data_path = ["results"]
+
+        class NewlineJsonExtractor(extract.NewlineJsonFileExtractor):
+            file_path = newline_path
+
+        return [
+            self.time_rows(name, lambda: extractor_class().extract())
+            for name, extractor_class in [
+                ("JsonFileExtractor", JsonExtractor),
+                ("JsonFileExtractor.incremental", IncrementalJsonExtractor),
+                ("NewlineJsonFileExtractor", NewlineJsonExtractor),
+            ]
+        ]
+
+    def run_csv_load(self, directory_path):
+        field_name_list = ["id", "name", "email", "price", "active"]
+
+        class CsvLoader(load.CsvLoader):
+            file_path = os.path.join(directory_path, "data.csv")
+            field_names = field_name_list
+
+        class CompressedCsvLoader(CsvLoader):
+            file_path = os.path.join(directory_path, "data.csv.gz")
+            compress = True
+
+        class DictWriterCsvLoader(CsvLoader):
+            """
+            Writes chunks the way that CsvLoader used to, for comparison
+            """
+            file_path = os.path.join(directory_path, "data-dict-writer.csv")
+
+            def load_data(self, object_list):
+                with open(self.get_file_path(), "a") as open_file:
+                    self.load_file(open_file, object_list)
+
+            def load_file(self, open_file, object_list):
+                field_names = self.get_field_names()
+                csv_writer = csv.DictWriter(open_file, fieldnames=field_names)
+
+                for obj in object_list:
+                    if not self.header_written:
+                        csv_writer.writeheader()
+                        self.header_written = True
+
+                    obj = {field_name: obj[field_name] for field_name in field_names}
+                    csv_writer.writerow(obj)
+
+        return [
+            self.time_function(name, lambda: self.load_rows(loader_class()))
+            for name, loader_class in [
+                ("CsvLoader.dict_writer", DictWriterCsvLoader),
+                ("CsvLoader", CsvLoader),
+                ("CsvLoader.compress", CompressedCsvLoader),
+            ]
+        ]
+
+    def run_key_transform(self, directory_path):
+        key_list = [
+            f"field name {key_number}"
+            for key_number in range(self.wide_key_count)
+        ]
+        row_list = [
+            {key: row_id for key in key_list}
+            for row_id in range(self.row_count)
+        ]
+
+        class KeyMapTransformer(transform.KeyMapTransformer):
+            key_map = {key: key.upper() for key in key_list[::2]}
+
+        class KeyReplaceTransformer(transform.KeyReplaceTransformer):
+            old = " "
+            new = "_"
+
+        class ObjectKeyMapTransformer(KeyMapTransformer):
+            """
+            Renames the keys of each object separately, for comparison
+            """
+
+            def transform_batch(self, object_list):
+                return list(self.transform(object_list))
+
+            def transform_object(self, obj):
+                return {
+                    self.key_map.get(key, key): value
+                    for key, value in obj.items()
+                }
+
+        class ObjectKeyReplaceTransformer(KeyReplaceTransformer):
+
+            def transform_batch(self, object_list):
+                return list(self.transform(object_list))
+
+            def transform_object(self, obj):
+                return {
+                    key.replace(self.old, self.new): value
+                    for key, value in obj.items()
+                }
+
+        return [
+            self.time_function(
+                name,
+                lambda: len(transformer_class().transform_batch(row_list)),
+            )
+            for name, transformer_class in [
+                ("KeyMapTransformer.object", ObjectKeyMapTransformer),
+                ("KeyMapTransformer", KeyMapTransformer),
+                ("KeyReplaceTransformer.object", ObjectKeyReplaceTransformer),
+                ("KeyReplaceTransformer", KeyReplaceTransformer),
+            ]
+        ]
+
+    def load_rows(self, loader):
+        loader.load(self.make_rows())
+        return self.row_count
+
+    def make_rows(self):
+        for row_id in range(self.row_count):
+            yield {
+                "id": row_id,
+                "name": f"name-{row_id}",
+                "email": f"user-{row_id}@example.com",
+                "price": row_id / 100,
+                "active": row_id % 2 == 0,
+            }
+
+    def time_rows(self, name, make_row_iter):
+        """
+        Takes a name, and a function which returns an iterable of rows
+        Consumes the rows, and returns a result dict
+        """
+        return self.time_function(
+            name,
+            lambda: self.consume(make_row_iter()),
+        )
+
+    def time_function(self, name, function):
+        """
+        Takes a name, and a function which processes rows and returns how
+        many it processed
+        Runs the function, and returns a result dict
+        """
+        start = time.perf_counter()
+        row_count = function()
+        seconds = time.perf_counter() - start
+
+        result = {
+            "name": name,
+            "row_count": row_count,
+            "seconds": seconds,
+            "rows_per_second": row_count / seconds if seconds else None,
+        }
+
+        if self.trace_memory:
+            # Measure memory in a separate pass, since tracing slows
+            # everything down
+            tracemalloc.start()
+            function()
+            _, result["peak_traced_bytes"] = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        return result
+
+    def consume(self, row_iter):
+        row_count = 0
+
+        for row in row_iter:
+            row_count += 1
+
+        return row_count
+
+
+def run(case_list, row_count_list, output=sys.stdout, **kwargs):
+    """
+    Runs each benchmark case for each row count
+    Writes each result to `output` as a line of JSON
+    """
+    for case in case_list:
+
+        for row_count in row_count_list:
+            benchmark = Benchmark(row_count, **kwargs)
+
+            for result in benchmark.run(case):
+                result["case"] = case
+                output.write(json.dumps(result) + "\n")
+                output.flush()
@@ -0,0 +1,147 @@
+import collections, json, os, tempfile, threading
+
+
+class Checkpoint:
+    """
+    Tracks how far an extraction has been loaded, so that a job can resume
+    where it left off
+
+    The extractor marks each page as it finishes yielding the page's
+    objects, and the loader reports each chunk of objects once it has been
+    flushed. A page is committed to the store only after every object up to
+    the end of that page has been loaded. A job which stops part way through
+    resumes after the last committed page, so objects from partly loaded
+    pages may be loaded again, but none are skipped.
+
+    Objects must reach the loader in the order that they were extracted,
+    one for one.
+    """
+
+    def __init__(self, job_name, store=None):
+        self.job_name = job_name
+        self.store = store or FileCheckpointStore()
+        self.lock = threading.Lock()
+        self.mark_list = collections.deque()
+        self.extracted_count = 0
+        self.loaded_count = 0
+        self.is_failed = False
+
+    def get(self):
+        """
+        Returns the last committed value, or None if there isn't one
+        """
+        return self.store.get(self.job_name)
+
+    def mark(self, object_count, value):
+        """
+        Takes a number of objects which were extracted, and a value to commit
+        once they, and all of the objects before them, have been loaded
+        """
+        with self.lock:
+            self.extracted_count += object_count
+            self.mark_list.append((self.extracted_count, value, False))
+
+    def finish(self, object_count):
+        """
+        Takes the number of objects which were extracted since the last mark
+        Clears the checkpoint once they have been loaded, so that the next
+        run starts from the beginning
+        """
+        with self.lock:
+            self.extracted_count += object_count
+            self.mark_list.append((self.extracted_count, None, True))
+
+    def commit(self, object_count):
+        """
+        Takes a number of objects which were loaded
+        Commits the latest value whose objects have all been loaded
+        """
+        with self.lock:
+
+            if self.is_failed:
+                return
+
+            self.loaded_count += object_count
+            committed_mark = None
+
+            while self.mark_list and self.mark_list[0][0] <= self.loaded_count:
+                committed_mark = self.mark_list.popleft()
+
+            if committed_mark is None:
+                return
+
+            _, value, is_finished = committed_mark
+
+            if is_finished:
+                self.store.delete(self.job_name)
+            else:
+                self.store.set(self.job_name, value)
+
+    def fail(self):
+        """
+        Stops any further commits, after a chunk failed to load
+        """
+        with self.lock:
+            self.is_failed = True
+
+
+class CheckpointStore:
+
+    def get(self, job_name):
+        raise NotImplementedError(
+            f"{self.__class__} must implement .get()"
+        )
+
+    def set(self, job_name, value):
+        raise NotImplementedError(
+            f"{self.__class__} must implement .set()"
+        )
+
+    def delete(self, job_name):
+        raise NotImplementedError(
+            f"{self.__class__} must implement .delete()"
+        )
+
+
+class FileCheckpointStore(CheckpointStore):
+    """
+    Stores each job's checkpoint as a JSON file in a directory
+
+    Files are written to a temporary file first, and moved into place, so a
+    crash never leaves a partly written checkpoint.
+    """
+    directory_path = ".checkpoints"
+
+    def __init__(self, directory_path=None):
+        self.directory_path = directory_path or self.directory_path
+
+    def get(self, job_name):
+        try:
+            with open(self.get_file_path(job_name)) as open_file:
+                return json.load(open_file)
+        except FileNotFoundError:
+            return None
+
+    def set(self, job_name, value):
+        os.makedirs(self.directory_path, exist_ok=True)
+
+        with tempfile.NamedTemporaryFile(
+            "w",
+            dir=self.directory_path,
+            prefix=f".{job_name}.",
+            delete=False,
+        ) as temp:
+            json.dump(value, temp)
+            temp.flush()
+            os.fsync(temp.fileno())
+
+        os.replace(temp.name, self.get_file_path(job_name))
+
+    def delete(self, job_name):
+        try:
+            os.remove(self.get_file_path(job_name))
+        except FileNotFoundError:
+            pass
+
+    def get_file_path(self, job_name):
+        return os.path.join(self.directory_path, f"{job_name}.json")
@@ -0,0 +1,32 @@
+from kbde.kbde_cli import command
+
+
+class Command(command.Command):
+
+    def add_arguments(self, parser):
+        from kbde.etl import benchmark
+
+        parser.add_argument(
+            "case",
+            type=str,
+            nargs="+",
+            choices=benchmark.Benchmark.case_list,
+        )
+        parser.add_argument(
+            "--row-count",
+            type=int,
+            nargs="+",
+            default=[10 ** 5, 10 ** 6],
+        )
+        parser.add_argument("--trace-memory", action="store_true")
+        parser.add_argument("--directory-path", type=str)
+
+    def handle(self, case, row_count, trace_memory, directory_path):
+        from kbde.etl import benchmark
+
+        benchmark.run(
+            case,
+            row_count,
+            trace_memory=trace_memory,
+            directory_path=directory_path,
+        )
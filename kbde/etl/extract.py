@@ -1,31 +1,158 @@
-import tempfile, csv, os, json
+import bisect, csv, json, collections, gzip, io, os, time
+from concurrent import futures
+
+from kbde.json.stream import ArrayReader
 
 
 class Extractor:
+    # Number of pages to fetch ahead of the consumer, on a thread pool. When
+    # this is set, `.get_page()` must be safe to call from multiple threads.
+    prefetch_page_count = 0
+    # A `checkpoint.Checkpoint`. When this is set, extraction resumes after
+    # the last page which was fully loaded.
+    checkpoint = None
+    # A `metrics.Metrics`, which records each page under the `extract` stage
+    metrics = None
+
+    def __init__(self, checkpoint=None, metrics=None):
+        self.checkpoint = checkpoint or self.checkpoint
+        self.metrics = metrics or self.metrics
 
     def extract(self, page_number=None):
 
         if page_number is not None:
             # Get a single page
-            object_list = self.get_page(page_number)
+            object_list = self.get_measured_page(page_number)
 
             # Return results
             for obj in object_list:
                 yield obj
         
+        elif self.checkpoint is not None:
+            yield from self.extract_from_checkpoint()
+
         else:
+
+            for object_list in self.get_page_list(1):
+
+                for obj in object_list:
+                    yield obj
+
+    def extract_from_checkpoint(self):
+        """
+        Yields objects from the page after the last checkpoint
+        Marks the checkpoint at the end of each page
+        """
+        checkpoint_value = self.checkpoint.get()
+
+        if checkpoint_value is None:
             page_number = 1
+        else:
+            page_number = self.get_page_number_from_checkpoint(checkpoint_value) + 1
+
+        object_count = 0
+
+        for object_list in self.get_page_list(page_number):
+
+            for obj in object_list:
+                object_count += 1
+                yield obj
+
+            self.checkpoint.mark(
+                object_count,
+                self.get_checkpoint_value(page_number),
+            )
+            object_count = 0
+            page_number += 1
+
+        self.checkpoint.finish(object_count)
+
+    def get_checkpoint_value(self, page_number):
+        """
+        Takes a page number which has been extracted
+        Returns a JSON serializable value to store in the checkpoint
+        """
+        return page_number
+
+    def get_page_number_from_checkpoint(self, checkpoint_value):
+        """
+        Takes a value from `.get_checkpoint_value()`
+        Returns the page number which it was made from
+        """
+        return checkpoint_value
+
+    def get_page_list(self, page_number):
+        """
+        Takes the first page number to get
+        Yields each page's object list, in order, until a page returns None
+        """
+        if self.get_prefetch_page_count() > 0:
+            yield from self.get_prefetched_page_list(page_number)
+            return
+
+        while True:
+            object_list = self.get_measured_page(page_number)
+
+            if object_list is None:
+                break
+
+            yield object_list
+
+            page_number += 1
+
+    def get_prefetched_page_list(self, page_number):
+        """
+        Takes the first page number to get
+        Yields each page's object list, in order, while up to
+        `.prefetch_page_count` pages are fetched ahead on a thread pool
+        """
+        prefetch_page_count = self.get_prefetch_page_count()
+        executor = futures.ThreadPoolExecutor(max_workers=prefetch_page_count)
+        page_future_list = collections.deque()
+
+        try:
 
             while True:
-                object_list = self.get_page(page_number)
+
+                # Keep the window of in-flight pages full
+                while len(page_future_list) < prefetch_page_count:
+                    page_future_list.append(
+                        executor.submit(self.get_measured_page, page_number)
+                    )
+                    page_number += 1
+
+                object_list = page_future_list.popleft().result()
 
                 if object_list is None:
+                    # Pages past the end were fetched speculatively, and are
+                    # discarded
                     break
 
-                for obj in object_list:
-                    yield obj
+                yield object_list
+
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
 
-                page_number += 1
+    def get_prefetch_page_count(self):
+        return self.prefetch_page_count
+
+    def get_measured_page(self, page_number):
+        """
+        Takes a page number
+        Returns the page from `.get_page()`, recording the time spent
+        getting the page and its objects, if `.metrics` is set
+        """
+        if self.metrics is None:
+            return self.get_page(page_number)
+
+        start = time.perf_counter()
+        object_list = self.get_page(page_number)
+        seconds = time.perf_counter() - start
+
+        if object_list is None:
+            return None
+
+        return self.metrics.measure("extract", object_list, seconds)
 
     def get_page(self, page_number):
         raise NotImplementedError(
@@ -40,8 +167,18 @@ class FileExtractor(Extractor):
         if page_number > 1:
             return None
 
-        with open(self.get_file_path()) as open_file:
-            return self.process_file(open_file)
+        file_path = self.get_file_path()
+
+        if self.metrics is not None:
+            self.metrics.record_bytes("extract", os.path.getsize(file_path))
+
+        return self.get_object_list_from_path(file_path)
+
+    def get_object_list_from_path(self, file_path):
+        # Keep the file open while objects are consumed, so that
+        # `.process_file()` can read it lazily
+        with open(file_path) as open_file:
+            yield from self.process_file(open_file)
 
     def get_file_path(self):
         assert self.file_path, (
@@ -57,12 +194,23 @@ class FileExtractor(Extractor):
 
 
 class JsonFileExtractor(FileExtractor):
+    # When set, the file is parsed incrementally, and elements of the array
+    # at `data_path` are yielded as they are read, in constant memory
+    incremental = False
+    # Keys which lead to the array of data, when it is nested within objects
+    data_path = []
     
     def process_file(self, open_file):
+        if self.incremental:
+            return ArrayReader(open_file, path=self.get_data_path())
+
         json_string = open_file.read()
         data = json.loads(json_string)
         return self.get_data_list(data)
 
+    def get_data_path(self):
+        return self.data_path
+
     def get_data_list(self, data):
         assert isinstance(data, list), (
             f"{self.__class__} .get_data_list() must return a list. Override "
@@ -71,6 +219,51 @@ class JsonFileExtractor(FileExtractor):
         return data
 
 
+class NewlineJsonFileExtractor(FileExtractor):
+    """
+    Extracts one object per line from a newline-delimited JSON file
+    """
+    
+    def process_file(self, open_file):
+        for line in open_file:
+
+            if line.isspace():
+                continue
+
+            yield json.loads(line)
+
+
+class ParquetExtractor(FileExtractor):
+    """
+    Extracts objects from a Parquet file, one record batch at a time
+
+    Only the columns in `field_names` are read, or every column if it is
+    empty. Requires `pyarrow`.
+    """
+    field_names = []
+    batch_size = 65536
+
+    def get_object_list_from_path(self, file_path):
+        from pyarrow import parquet
+
+        parquet_file = parquet.ParquetFile(file_path)
+
+        try:
+            batch_list = parquet_file.iter_batches(
+                batch_size=self.batch_size,
+                columns=self.get_field_names() or None,
+            )
+
+            for batch in batch_list:
+                yield from batch.to_pylist()
+
+        finally:
+            parquet_file.close()
+
+    def get_field_names(self):
+        return self.field_names
+
+
 class HttpExtractor(Extractor):
     
     def get_page(self, page_number):
@@ -93,9 +286,28 @@ class HttpExtractor(Extractor):
 
 
 class S3Extractor(Extractor):
+    """
+    Extracts rows from every CSV file under a path in an S3 bucket, one file
+    per page
+
+    Files are streamed straight from S3, rather than downloaded first. Files
+    which are gzipped, either by key suffix or by content encoding, are
+    decompressed as they are read.
+
+    When pages are prefetched, up to `prefetch_byte_count` bytes of each
+    file are downloaded on the prefetching thread, so that downloads overlap
+    with processing, and the rest of a larger file is streamed as it is
+    consumed.
+    """
+    prefetch_byte_count = 2 ** 26
     bucket_name = None
     bucket_path = None
     bucket_path_complete = None
+    encoding = "utf-8"
+    gzip_suffix_list = [
+        ".gz",
+        ".gzip",
+    ]
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -110,39 +322,57 @@ class S3Extractor(Extractor):
         """
         Returns a mapping of all of the files which need to be processed by this extractor
         """
-        response = self.client.list_objects(Bucket=self.bucket_name, Prefix=self.get_bucket_path())
-        return [obj["Key"] for obj in response["Contents"]]
+        paginator = self.client.get_paginator("list_objects_v2")
+        page_path_list = []
+
+        for response in paginator.paginate(
+            Bucket=self.bucket_name,
+            Prefix=self.get_bucket_path(),
+        ):
+            page_path_list.extend(
+                obj["Key"] for obj in response.get("Contents", [])
+            )
+
+        return page_path_list
 
     def get_bucket_path(self):
         return self.bucket_path
     
     def get_page(self, page_number):
         """
-        Downloads a file from s3
-        returns the content as a list of objects
+        Opens a file from s3
+        returns the content as an iterable of objects, which is read from s3
+        as it is consumed
         """
-        file_path = self.download_to_tempfile(page_number)
+        key = self.get_path_from_page_number(page_number)
 
-        if file_path is None:
+        if key is None:
             return None
 
-        return self.get_object_list_from_file(file_path)
+        # Request the object now, so that prefetched pages have their
+        # responses ready, but only read the body as rows are consumed
+        response = self.client.get_object(Bucket=self.bucket_name, Key=key)
 
-    def download_to_tempfile(self, page_number):
-        """
-        Gets the s3 object key
-        Downloads the file to the local environment
-        Returns the file path
-        """
-        key = self.get_path_from_page_number(page_number)
+        if self.metrics is not None:
+            self.metrics.record_bytes("extract", response.get("ContentLength", 0))
 
-        if key is None:
-            return None
+        if self.get_prefetch_page_count() > 0:
+            response["Body"] = PrefetchedStream(
+                response["Body"],
+                self.prefetch_byte_count,
+            )
+
+        return self.get_object_list_from_response(response, key)
 
-        with tempfile.NamedTemporaryFile(delete=False) as temp:
-            self.client.download_fileobj(self.bucket_name, key, temp)
+    def get_checkpoint_value(self, page_number):
+        # Store the key, so that files which are added under the path don't
+        # shift the extraction
+        return self.get_path_from_page_number(page_number)
 
-        return temp.name
+    def get_page_number_from_checkpoint(self, checkpoint_value):
+        # Keys are listed in order, so resume before the first key which
+        # comes after the stored one
+        return bisect.bisect_right(self.page_path_list, checkpoint_value)
 
     def get_path_from_page_number(self, page_number):
         try:
@@ -152,13 +382,93 @@ class S3Extractor(Extractor):
             # No more files to process
             return None
 
-    def get_object_list_from_file(self, file_path):
-        with open(file_path) as open_file:
-            reader = csv.DictReader(open_file)
+    def get_object_list_from_response(self, response, key):
+        body = response["Body"]
 
-            for obj in reader:
-                yield obj
-                
-        # Finished reading from the file, and it's closed
-        # Remove it from the system
-        os.remove(file_path)
+        if self.is_gzipped(response, key):
+            stream = gzip.GzipFile(fileobj=body, mode="rb")
+        else:
+            stream = io.BufferedReader(RawStream(body))
+
+        open_file = io.TextIOWrapper(stream, encoding=self.encoding, newline="")
+
+        try:
+            yield from self.get_object_list_from_file(open_file)
+        finally:
+            open_file.close()
+            body.close()
+
+    def is_gzipped(self, response, key):
+        return (
+            response.get("ContentEncoding") == "gzip"
+            or key.endswith(tuple(self.gzip_suffix_list))
+        )
+
+    def get_object_list_from_file(self, open_file):
+        """
+        Takes an open text file
+        Yields each object within it
+        """
+        reader = csv.DictReader(open_file)
+
+        for obj in reader:
+            yield obj
+
+
+class PrefetchedStream:
+    """
+    Reads up to `byte_count` bytes of a stream when it is made, and then
+    reads those bytes, followed by the rest of the stream
+    """
+
+    def __init__(self, stream, byte_count):
+        self.stream = stream
+        self.is_finished = False
+        data_list = []
+
+        while byte_count > 0:
+            data = stream.read(byte_count)
+
+            if not data:
+                self.is_finished = True
+                break
+
+            data_list.append(data)
+            byte_count -= len(data)
+
+        self.buffer = io.BytesIO(b"".join(data_list))
+
+    def read(self, size=-1):
+        data = self.buffer.read(size)
+
+        if self.is_finished:
+            return data
+
+        if size is None or size < 0:
+            return data + self.stream.read()
+
+        if len(data) < size:
+            data += self.stream.read(size - len(data))
+
+        return data
+
+    def close(self):
+        self.stream.close()
+
+
+class RawStream(io.RawIOBase):
+    """
+    Adapts any object with a `.read(size)` method, such as a botocore
+    streaming body, to a raw stream which can be buffered
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
@@ -1,22 +1,163 @@
-import tempfile, os, csv
+import tempfile, os, csv, collections, gzip, io, json, logging, operator, time
+from concurrent import futures
 
 
 class Loader:
     chunk_size = 100000
+    # Number of chunks which can be waiting on, or running in, a background
+    # flush, while the next chunk accumulates. When this is 0, chunks are
+    # flushed synchronously.
+    max_in_flight_chunk_count = 0
+    flush_executor = None
+    # A `checkpoint.Checkpoint`, which is committed as chunks are flushed
+    checkpoint = None
+    # A `metrics.Metrics`, which records each chunk under the `load` stage,
+    # and is reported when the load finishes
+    metrics = None
+
+    def __init__(self, checkpoint=None, metrics=None):
+        self.checkpoint = checkpoint or self.checkpoint
+        self.metrics = metrics or self.metrics
 
     def load(self, object_list):
         load_object_list = []
-        
-        for obj in object_list:
-            load_object_list.append(obj)
 
-            if len(load_object_list) >= self.chunk_size:
-                # Flush the object list into the destination
-                self.load_data(load_object_list)
-                load_object_list = []
+        try:
+
+            for obj in object_list:
+                load_object_list.append(obj)
+
+                if len(load_object_list) >= self.chunk_size:
+                    # Flush the object list into the destination
+                    self.flush(load_object_list)
+                    load_object_list = []
+
+            if load_object_list:
+                self.flush(load_object_list)
+
+        except BaseException:
+            # Let in-flight chunks finish, but raise the original exception
+            self.close(raise_exception=False)
+
+            if self.metrics is not None:
+                self.metrics.report(is_final=True)
+
+            raise
+
+        try:
+            self.close()
+        finally:
+
+            if self.metrics is not None:
+                self.metrics.report(is_final=True)
+
+        if self.checkpoint is not None:
+            # Commit anything which was marked after the last chunk was
+            # flushed, such as the end of the extraction
+            self.checkpoint.commit(0)
+
+    def flush(self, object_list):
+        """
+        Takes a chunk of objects
+        Loads it with `.load_data()`, in the background if
+        `.max_in_flight_chunk_count` is set
+        """
+        max_in_flight_chunk_count = self.get_max_in_flight_chunk_count()
+
+        if max_in_flight_chunk_count < 1:
+            self.load_chunk(object_list)
+            return
+
+        if self.flush_executor is None:
+            # A single worker, so that chunks are loaded in order, and
+            # `.load_data()` is never run concurrently
+            self.flush_executor = futures.ThreadPoolExecutor(max_workers=1)
+            self.flush_future_list = collections.deque()
+
+        flush_future_list = self.flush_future_list
+
+        # Surface exceptions from chunks which have already been flushed
+        while flush_future_list and flush_future_list[0].done():
+            flush_future_list.popleft().result()
+
+        start = time.perf_counter()
+
+        # Wait for room, so that only a bounded number of chunks are held
+        while len(flush_future_list) >= max_in_flight_chunk_count:
+            flush_future_list.popleft().result()
+
+        if self.metrics is not None:
+            self.metrics.record_wait("load", time.perf_counter() - start)
+
+        flush_future_list.append(
+            self.flush_executor.submit(self.load_chunk, object_list)
+        )
+
+    def load_chunk(self, object_list):
+        """
+        Takes a chunk of objects
+        Loads it, and then commits the checkpoint, if there is one
+        """
+        start = time.perf_counter()
+
+        try:
+            self.load_data(object_list)
+        except BaseException:
 
-        if load_object_list:
-            self.load_data(load_object_list)
+            if self.checkpoint is not None:
+                # Chunks after this one may still be loaded, but the
+                # checkpoint must not move past this one
+                self.checkpoint.fail()
+
+            raise
+
+        if self.metrics is not None:
+            self.metrics.record(
+                "load",
+                time.perf_counter() - start,
+                len(object_list),
+            )
+
+        self.commit_checkpoint(len(object_list))
+
+    def commit_checkpoint(self, object_count):
+        """
+        Takes a number of objects which have been loaded
+        Commits them to the checkpoint, if there is one
+
+        Loaders which finish loading chunks later than `.load_data()`
+        returns should override this, and commit once the chunks are loaded.
+        """
+        if self.checkpoint is not None:
+            self.checkpoint.commit(object_count)
+
+    def close(self, raise_exception=True):
+        """
+        Waits for all background flushes to finish
+        Raises the first exception from them, if `raise_exception` is set
+        """
+        if self.flush_executor is None:
+            return
+
+        flush_future_list = self.flush_future_list
+        executor = self.flush_executor
+        self.flush_executor = None
+
+        try:
+
+            while flush_future_list:
+                flush_future = flush_future_list.popleft()
+
+                if raise_exception:
+                    flush_future.result()
+                else:
+                    futures.wait([flush_future])
+
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def get_max_in_flight_chunk_count(self):
+        return self.max_in_flight_chunk_count
 
     def load_data(self, object_list):
         raise NotImplementedError(
@@ -25,11 +166,54 @@ class Loader:
 
 
 class FileLoader(Loader):
+    """
+    Loads data into a file, which is kept open until the load is finished
+    """
     file_path = None
-    
+    newline = None
+    # Compress the output with gzip. Appending to an existing gzipped file
+    # adds another gzip member, which is read back as one stream.
+    compress = False
+    compress_level = 6
+    open_file = None
+
     def load_data(self, object_list):
-        with open(self.get_file_path(), "a") as open_file:
+        open_file = self.get_open_file()
+
+        if self.metrics is None:
             self.load_file(open_file, object_list)
+            return
+
+        start_position = open_file.tell()
+        self.load_file(open_file, object_list)
+        # Bytes before compression, if the file is compressed
+        self.metrics.record_bytes("load", open_file.tell() - start_position)
+
+    def close(self, raise_exception=True):
+        try:
+            super().close(raise_exception=raise_exception)
+        finally:
+
+            if self.open_file is not None:
+                open_file = self.open_file
+                self.open_file = None
+                open_file.close()
+
+    def get_open_file(self):
+        if self.open_file is None:
+            file_path = self.get_file_path()
+
+            if self.compress:
+                self.open_file = gzip.open(
+                    file_path,
+                    "at",
+                    compresslevel=self.compress_level,
+                    newline=self.newline,
+                )
+            else:
+                self.open_file = open(file_path, "a", newline=self.newline)
+
+        return self.open_file
 
     def get_file_path(self):
         assert self.file_path, (
@@ -46,21 +230,38 @@ class FileLoader(Loader):
 
 class CsvLoader(FileLoader):
     field_names = []
+    # The csv module does its own newline handling
+    newline = ""
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.header_written = False
+        self.row_getter = None
 
     def load_file(self, open_file, object_list):
-        field_names = self.get_field_names()
-        csv_writer = csv.DictWriter(open_file, fieldnames=field_names)
-        for obj in object_list:
-            if not self.header_written:
-                csv_writer.writeheader()
-                self.header_written = True
+        csv_writer = csv.writer(open_file)
+
+        if not self.header_written:
+            csv_writer.writerow(self.get_field_names())
+            self.header_written = True
 
-            obj = {field_name: obj[field_name] for field_name in field_names}
-            csv_writer.writerow(obj)
+        csv_writer.writerows(map(self.get_row_getter(), object_list))
+
+    def get_row_getter(self):
+        """
+        Returns a function which takes an object, and returns a tuple of its
+        values for each field name
+        """
+        if self.row_getter is None:
+            field_names = self.get_field_names()
+
+            if len(field_names) == 1:
+                field_name = field_names[0]
+                self.row_getter = lambda obj: (obj[field_name],)
+            else:
+                self.row_getter = operator.itemgetter(*field_names)
+
+        return self.row_getter
 
     def get_field_names(self):
         assert self.field_names, (
@@ -69,7 +270,82 @@ class CsvLoader(FileLoader):
         return self.field_names
 
 
+class ParquetLoader(FileLoader):
+    """
+    Loads data into a Parquet file, writing each chunk as a row group
+
+    The file is replaced, rather than appended to, by each call to `load()`.
+    Columns are typed by `schema`, a `pyarrow.Schema`, or inferred from the
+    first chunk if it isn't set. Requires `pyarrow`.
+    """
+    field_names = []
+    schema = None
+    compression = "snappy"
+    parquet_writer = None
+
+    def load_data(self, object_list):
+        if self.parquet_writer is None:
+            from pyarrow import parquet
+
+            table = get_arrow_table(
+                object_list,
+                self.get_field_names(),
+                self.get_schema(),
+            )
+            self.parquet_writer = parquet.ParquetWriter(
+                self.get_file_path(),
+                table.schema,
+                compression=self.compression,
+            )
+
+        else:
+            # Later chunks must match the schema of the first one
+            table = get_arrow_table(
+                object_list,
+                self.get_field_names(),
+                self.parquet_writer.schema,
+            )
+
+        self.parquet_writer.write_table(table, row_group_size=len(object_list))
+
+    def close(self, raise_exception=True):
+        try:
+            super().close(raise_exception=raise_exception)
+        finally:
+
+            if self.parquet_writer is not None:
+                parquet_writer = self.parquet_writer
+                self.parquet_writer = None
+                parquet_writer.close()
+
+    def get_field_names(self):
+        assert self.field_names, (
+            f"{self.__class__} must define .field_names"
+        )
+        return self.field_names
+
+    def get_schema(self):
+        return self.schema
+
+
 class SnowflakeLoader(Loader):
+    """
+    Loads data into a Snowflake table, through the table's stage
+
+    Each chunk is written to a compressed file, which is uploaded with `PUT`
+    on a pool of `upload_worker_count` threads. Once `copy_file_count` files
+    have been uploaded, they are loaded into the table with one
+    `COPY INTO`, and removed from the stage. Chunks are only in the table
+    once their batch has been copied, which happens at the latest when the
+    load finishes. If the load fails, files which haven't been copied yet
+    are removed from the stage with `REMOVE`, so that they aren't loaded by
+    a later `COPY INTO`. Calling `load_data()` directly, outside of
+    `load()`, copies its chunk, and any staged before it, before returning.
+
+    Snowflake is only reached through `.connector`, which can be replaced
+    with a fake that has the same methods as `SnowflakeConnector`. The
+    Snowflake connection itself is `.connection`.
+    """
     database_name = None
     schema_name = None
     warehouse_name = None
@@ -78,28 +354,232 @@ class SnowflakeLoader(Loader):
     snowflake_username = None
     snowflake_password = None
     snowflake_account = None
+    # The format of the files which are staged in Snowflake. With `parquet`,
+    # which requires `pyarrow`, columns are matched to the table by name.
+    stage_format = "csv"
+    stage_format_list = [
+        "csv",
+        "parquet",
+    ]
+    # Typing for `parquet` staged files, as in ParquetLoader
+    schema = None
+    upload_worker_count = 4
+    copy_file_count = 8
+    compress_level = 6
+    upload_executor = None
+    # Failures to remove staged files are logged here, rather than raised
+    # over the exception which caused the load to fail
+    logger_name = "kbde.etl"
+    # Set while `load()` runs, when chunks are copied in batches
+    is_loading = False
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, connector=None, **kwargs):
         super().__init__(*args, **kwargs)
-        self.connection = self.get_snowflake_connection()
+        self.connector = connector or self.get_connector()
+        # Staged files which haven't been copied yet, as tuples of an upload
+        # future, a file name, and an object count
+        self.staged_file_list = []
+
+    @property
+    def connection(self):
+        return self.connector.connection
+
+    def load(self, object_list):
+        self.is_loading = True
+
+        try:
+            super().load(object_list)
+        finally:
+            self.is_loading = False
 
     def load_data(self, object_list):
-        field_names = self.get_field_names()
+        self.stage_data(object_list)
 
-        with tempfile.NamedTemporaryFile("w", delete=False) as temp:
-            writer = csv.DictWriter(temp, fieldnames=field_names)
+        if not self.is_loading:
+            # Nothing else will copy the chunk
+            self.copy_staged_file_list()
 
-            for obj in object_list:
-                writer.writerow(
-                    {field_name: obj[field_name] for field_name in field_names}
+    def stage_data(self, object_list):
+        """
+        Takes a chunk of objects
+        Writes it to a file, and starts uploading it to the table's stage
+        Copies the staged files once there are `copy_file_count` of them
+        """
+        stage_format = self.get_stage_format()
+
+        assert stage_format in self.stage_format_list, (
+            f"{self.__class__} .stage_format must be one of "
+            f"{self.stage_format_list}"
+        )
+
+        stage_file_path = getattr(self, f"write_{stage_format}_stage_file")(
+            object_list,
+        )
+
+        if self.upload_executor is None:
+            self.upload_executor = futures.ThreadPoolExecutor(
+                max_workers=self.upload_worker_count,
+            )
+
+        self.staged_file_list.append((
+            self.upload_executor.submit(self.upload_stage_file, stage_file_path),
+            os.path.basename(stage_file_path),
+            len(object_list),
+        ))
+
+        if len(self.staged_file_list) >= self.copy_file_count:
+            self.copy_staged_file_list()
+
+    def upload_stage_file(self, stage_file_path):
+        try:
+            self.connector.execute(self.get_put_statement(stage_file_path))
+        finally:
+            # Remove the tempfile
+            os.remove(stage_file_path)
+
+    def copy_staged_file_list(self):
+        """
+        Waits for the staged files to be uploaded
+        Copies them into the table with one statement
+        """
+        staged_file_list = self.staged_file_list
+        self.staged_file_list = []
+
+        if not staged_file_list:
+            return
+
+        # Wait for every upload, even if one has failed, so that the others
+        # can be removed
+        futures.wait([upload_future for upload_future, _, _ in staged_file_list])
+
+        try:
+
+            for upload_future, _, _ in staged_file_list:
+                upload_future.result()
+
+            self.connector.execute(self.get_copy_statement(
+                [file_name for _, file_name, _ in staged_file_list],
+            ))
+
+        except BaseException:
+            # None of the batch was copied
+            self.remove_staged_file_list(staged_file_list)
+            raise
+
+        super().commit_checkpoint(
+            sum(object_count for _, _, object_count in staged_file_list)
+        )
+
+    def commit_checkpoint(self, object_count):
+        # Chunks are committed once their batch has been copied
+        pass
+
+    def close(self, raise_exception=True):
+        try:
+            super().close(raise_exception=raise_exception)
+
+            if raise_exception:
+                self.copy_staged_file_list()
+
+        finally:
+
+            if self.upload_executor is not None:
+                upload_executor = self.upload_executor
+                self.upload_executor = None
+                upload_executor.shutdown(wait=True)
+
+            # Remove anything which was uploaded, but not copied
+            staged_file_list = self.staged_file_list
+            self.staged_file_list = []
+            self.remove_staged_file_list(staged_file_list)
+
+    def remove_staged_file_list(self, staged_file_list):
+        """
+        Takes a list of staged files whose uploads have finished
+        Removes each file whose upload was started from the table's stage,
+        logging any failures
+        """
+        for upload_future, file_name, _ in staged_file_list:
+
+            if upload_future.cancelled():
+                continue
+
+            # A failed `PUT` may still have left the file in the stage
+            try:
+                self.connector.execute(self.get_remove_statement(file_name))
+            except Exception:
+                logging.getLogger(self.logger_name).exception(
+                    "could not remove %s from the stage of %s",
+                    file_name,
+                    self.table_name,
                 )
 
-        # Send the written tempfile to snowflake
-        self.connection.cursor().execute(f"PUT file://{temp.name}* @%{self.table_name}")
-        self.connection.cursor().execute(f"copy into {self.table_name} file_format = (type = csv field_optionally_enclosed_by='\"')")
+    def write_csv_stage_file(self, object_list):
+        field_names = self.get_field_names()
+        row_getter = operator.itemgetter(*field_names)
+
+        if len(field_names) == 1:
+            row_list = ((row_getter(obj),) for obj in object_list)
+        else:
+            row_list = map(row_getter, object_list)
+
+        with tempfile.NamedTemporaryFile(suffix=".csv.gz", delete=False) as temp:
+
+            with gzip.open(
+                temp,
+                "wt",
+                compresslevel=self.compress_level,
+                newline="",
+            ) as open_file:
+                csv.writer(open_file).writerows(row_list)
+
+        return temp.name
+
+    def write_parquet_stage_file(self, object_list):
+        from pyarrow import parquet
+
+        table = get_arrow_table(
+            object_list,
+            self.get_field_names(),
+            self.schema,
+        )
+
+        with tempfile.NamedTemporaryFile(suffix=".parquet", delete=False) as temp:
+            parquet.write_table(table, temp)
+
+        return temp.name
+
+    def get_put_statement(self, stage_file_path):
+        # Staged files are already compressed
+        return (
+            f"PUT file://{stage_file_path} @%{self.table_name} "
+            f"auto_compress = false"
+        )
+
+    def get_copy_statement(self, file_name_list):
+        file_names = ", ".join(f"'{file_name}'" for file_name in file_name_list)
 
-        # Remove the tempfile
-        os.remove(temp.name)
+        if self.get_stage_format() == "parquet":
+            file_format = (
+                "file_format = (type = parquet) "
+                "match_by_column_name = case_insensitive"
+            )
+        else:
+            file_format = (
+                "file_format = (type = csv compression = gzip "
+                "field_optionally_enclosed_by='\"')"
+            )
+
+        return (
+            f"copy into {self.table_name} from @%{self.table_name} "
+            f"files = ({file_names}) {file_format} purge = true"
+        )
+
+    def get_remove_statement(self, file_name):
+        return f"remove @%{self.table_name}/{file_name}"
+
+    def get_stage_format(self):
+        return self.stage_format
 
     def get_insert_field_names(self):
         return ", ".join(self.get_field_names())
@@ -113,6 +593,9 @@ class SnowflakeLoader(Loader):
         )
         return self.field_names
 
+    def get_connector(self):
+        return SnowflakeConnector(self.get_snowflake_connection())
+
     def get_snowflake_connection(self):
         from snowflake import connector
 
@@ -124,3 +607,250 @@ class SnowflakeLoader(Loader):
             database=self.database_name,
             schema=self.schema_name,
         )
+
+
+class SnowflakeConnector:
+    """
+    Runs statements on a Snowflake connection, for SnowflakeLoader
+
+    `execute()` may be called from several threads at once.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, statement):
+        cursor = self.connection.cursor()
+
+        try:
+            cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    def close(self):
+        self.connection.close()
+
+
+class DjangoModelLoader(Loader):
+    """
+    Loads data into a Django model's table
+
+    Each chunk is saved with `bulk_create()`, in its own transaction, so a
+    failed chunk leaves no partial rows behind. Model fields are set from
+    the keys of each object, as mapped by `field_map`.
+
+    If `unique_field_names` are set, rows which conflict on them are updated
+    instead. On PostgreSQL, chunks which don't need to handle conflicts can
+    be streamed with `COPY FROM STDIN`, by setting `copy = True`. Like
+    `bulk_create()`, neither path calls `save()` or sends signals.
+    """
+    model = None
+    # Model field names to set
+    field_names = []
+    # Maps model field names to the object keys which they are read from,
+    # where they differ
+    field_map = {}
+    # Fields which identify an existing row. When these are set, rows which
+    # conflict are updated, rather than raising an error.
+    unique_field_names = []
+    # The fields which are updated on conflict. Defaults to every field in
+    # `field_names` which isn't unique.
+    update_field_names = []
+    ignore_conflicts = False
+    batch_size = None
+    database = "default"
+    copy = False
+    copy_escape_map = str.maketrans({
+        "\\": "\\\\",
+        "\t": "\\t",
+        "\n": "\\n",
+        "\r": "\\r",
+    })
+
+    def load_data(self, object_list):
+        from django.db import connections, transaction
+
+        instance_list = [self.make_instance(obj) for obj in object_list]
+        connection = connections[self.database]
+
+        with transaction.atomic(using=self.database):
+
+            if self.can_copy(connection):
+                self.copy_instance_list(connection, instance_list)
+            else:
+                self.bulk_create_instance_list(instance_list)
+
+    def make_instance(self, obj):
+        """
+        Takes an object
+        Returns an unsaved instance of `.model`
+        """
+        field_map = self.field_map
+
+        return self.get_model()(**{
+            field_name: obj[field_map.get(field_name, field_name)]
+            for field_name in self.get_field_names()
+        })
+
+    def bulk_create_instance_list(self, instance_list):
+        kwargs = {
+            "batch_size": self.batch_size,
+            "ignore_conflicts": self.ignore_conflicts,
+        }
+
+        unique_field_names = self.get_unique_field_names()
+
+        if unique_field_names:
+            kwargs.update(
+                update_conflicts=True,
+                unique_fields=unique_field_names,
+                update_fields=self.get_update_field_names(),
+            )
+
+        self.get_model().objects.using(self.database).bulk_create(
+            instance_list,
+            **kwargs,
+        )
+
+    def can_copy(self, connection):
+        """
+        Takes a database connection
+        Returns True if chunks can be streamed with `COPY FROM STDIN`
+        """
+        return (
+            self.copy
+            and connection.vendor == "postgresql"
+            and not self.get_unique_field_names()
+            and not self.ignore_conflicts
+        )
+
+    def copy_instance_list(self, connection, instance_list):
+        """
+        Takes a PostgreSQL connection, and a list of instances
+        Streams the instances into the model's table
+        """
+        field_list = self.get_copy_field_list()
+        quote_name = connection.ops.quote_name
+        column_names = ", ".join(quote_name(field.column) for field in field_list)
+        statement = (
+            f"COPY {quote_name(self.get_model()._meta.db_table)} "
+            f"({column_names}) FROM STDIN"
+        )
+
+        data = "".join(
+            "\t".join([
+                self.get_copy_field_value(field, instance)
+                for field in field_list
+            ]) + "\n"
+            for instance in instance_list
+        )
+
+        with connection.cursor() as cursor:
+
+            if hasattr(cursor, "copy_expert"):
+                # psycopg2
+                cursor.copy_expert(statement, io.StringIO(data))
+
+            else:
+                # psycopg 3
+                with cursor.copy(statement) as copy:
+                    copy.write(data)
+
+    def get_copy_field_list(self):
+        """
+        Returns the model fields which are written by `COPY`, in the same way
+        as `bulk_create()`, leaving out generated primary keys unless they are
+        in `.field_names`
+        """
+        from django.db import models
+
+        field_names = self.get_field_names()
+
+        return [
+            field for field in self.get_model()._meta.concrete_fields
+            if not isinstance(field, models.AutoField)
+            or field.name in field_names
+        ]
+
+    def get_copy_field_value(self, field, instance):
+        """
+        Takes a model field, and an instance
+        Returns the instance's value for that field in PostgreSQL's `COPY`
+        text format
+        """
+        from django.db import models
+
+        value = field.pre_save(instance, True)
+
+        if isinstance(field, models.JSONField):
+            # Every value is JSON, including strings, and None, which is
+            # JSON null rather than SQL NULL, as with `bulk_create()`
+            return json.dumps(value, cls=field.encoder).translate(
+                self.copy_escape_map,
+            )
+
+        return self.get_copy_value(field.get_prep_value(value))
+
+    def get_copy_value(self, value):
+        """
+        Takes a value which has been prepared for the database
+        Returns it in PostgreSQL's `COPY` text format
+        """
+        if value is None:
+            return "\\N"
+
+        if isinstance(value, bool):
+            return "t" if value else "f"
+
+        if isinstance(value, (dict, list)):
+            value = json.dumps(value)
+
+        elif isinstance(value, (bytes, memoryview)):
+            value = "\\x" + bytes(value).hex()
+
+        else:
+            value = str(value)
+
+        return value.translate(self.copy_escape_map)
+
+    def get_model(self):
+        assert self.model is not None, (
+            f"{self.__class__} must define .model"
+        )
+        return self.model
+
+    def get_field_names(self):
+        assert self.field_names, (
+            f"{self.__class__} must define .field_names"
+        )
+        return self.field_names
+
+    def get_unique_field_names(self):
+        return self.unique_field_names
+
+    def get_update_field_names(self):
+        if self.update_field_names:
+            return self.update_field_names
+
+        unique_field_names = self.get_unique_field_names()
+
+        return [
+            field_name for field_name in self.get_field_names()
+            if field_name not in unique_field_names
+        ]
+
+
+def get_arrow_table(object_list, field_names, schema=None):
+    """
+    Takes a list of objects, a list of field names, and an optional
+    `pyarrow.Schema`
+    Returns a `pyarrow.Table` with a column for each field name
+    """
+    import pyarrow
+
+    column_dict = {
+        field_name: [obj[field_name] for obj in object_list]
+        for field_name in field_names
+    }
+
+    return pyarrow.Table.from_pydict(column_dict, schema=schema)
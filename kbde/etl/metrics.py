@@ -0,0 +1,250 @@
+import bisect, json, logging, threading, time
+
+
+class Metrics:
+    """
+    Collects throughput and latency for each stage of an ETL job
+
+    Give the same instance to the extractor, transformers, loader, and
+    pipeline of a job. Each stage records its calls, rows, bytes, and the
+    time it spent waiting on queues. A summary is sent to the `sink` every
+    `log_interval` seconds, and when the loader finishes.
+    """
+    log_interval = 60
+
+    def __init__(self, sink=None, log_interval=None):
+        self.sink = sink or LogSink()
+        self.log_interval = self.log_interval if log_interval is None else log_interval
+        self.lock = threading.Lock()
+        self.stage_dict = {}
+        self.start_time = time.perf_counter()
+        self.report_time = self.start_time
+
+    def __getstate__(self):
+        # Copies which are sent to other processes only collect metrics, and
+        # send them back to be merged
+        state = self.__dict__.copy()
+        del state["lock"]
+        state["sink"] = None
+        state["stage_dict"] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def record(self, stage, seconds, row_count=0):
+        """
+        Takes a stage name, the duration of a call, and the number of rows
+        which the call processed
+        """
+        with self.lock:
+            self.get_stage(stage).record(seconds, row_count)
+
+        self.report_if_due()
+
+    def record_bytes(self, stage, byte_count):
+        with self.lock:
+            self.get_stage(stage).byte_count += byte_count
+
+    def record_wait(self, stage, seconds):
+        """
+        Takes a stage name, and a time which the stage spent waiting on
+        another stage
+        """
+        with self.lock:
+            self.get_stage(stage).wait_seconds += seconds
+
+    def measure(self, stage, object_list, seconds=0.0, row_batch_size=None):
+        """
+        Takes a stage name, an iterable of objects, the time already spent
+        getting the iterable, and an optional number of rows per call
+        Yields the objects, recording the time spent producing them as one
+        call, or as one call per `row_batch_size` rows
+        """
+        perf_counter = time.perf_counter
+        object_iterator = iter(object_list)
+        row_count = 0
+
+        try:
+
+            while True:
+                start = perf_counter()
+
+                try:
+                    obj = next(object_iterator)
+                except StopIteration:
+                    seconds += perf_counter() - start
+                    break
+
+                seconds += perf_counter() - start
+                row_count += 1
+
+                yield obj
+
+                if row_count == row_batch_size:
+                    self.record(stage, seconds, row_count)
+                    seconds = 0.0
+                    row_count = 0
+
+        finally:
+
+            if row_count or seconds:
+                self.record(stage, seconds, row_count)
+
+    def merge(self, stage_dict):
+        """
+        Takes the stages from another copy of this instance, and adds them to
+        this one
+        """
+        with self.lock:
+
+            for stage, stage_metrics in stage_dict.items():
+                self.get_stage(stage).merge(stage_metrics)
+
+    def pop_stage_dict(self):
+        with self.lock:
+            stage_dict = self.stage_dict
+            self.stage_dict = {}
+
+        return stage_dict
+
+    def get_stage(self, stage):
+        stage_metrics = self.stage_dict.get(stage)
+
+        if stage_metrics is None:
+            stage_metrics = StageMetrics()
+            self.stage_dict[stage] = stage_metrics
+
+        return stage_metrics
+
+    def get_summary(self):
+        with self.lock:
+            return {
+                "elapsed_seconds": time.perf_counter() - self.start_time,
+                "stages": {
+                    stage: stage_metrics.get_summary()
+                    for stage, stage_metrics in self.stage_dict.items()
+                },
+            }
+
+    def report(self, is_final=False):
+        self.report_time = time.perf_counter()
+
+        if self.sink is not None:
+            self.sink.emit(self.get_summary(), is_final)
+
+    def report_if_due(self):
+        if time.perf_counter() - self.report_time >= self.log_interval:
+            self.report()
+
+
+class StageMetrics:
+    # Upper bounds of the latency histogram buckets, in seconds, from 1ms to
+    # about 16s. The last bucket holds everything slower.
+    bucket_bound_list = [0.001 * 2 ** power for power in range(15)]
+    percentile_list = [50, 95, 99]
+
+    def __init__(self):
+        self.call_count = 0
+        self.row_count = 0
+        self.byte_count = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.bucket_count_list = [0] * (len(self.bucket_bound_list) + 1)
+
+    def record(self, seconds, row_count):
+        self.call_count += 1
+        self.row_count += row_count
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.bucket_count_list[
+            bisect.bisect_left(self.bucket_bound_list, seconds)
+        ] += 1
+
+    def merge(self, other):
+        self.call_count += other.call_count
+        self.row_count += other.row_count
+        self.byte_count += other.byte_count
+        self.seconds += other.seconds
+        self.max_seconds = max(self.max_seconds, other.max_seconds)
+        self.wait_seconds += other.wait_seconds
+        self.bucket_count_list = [
+            count + other_count
+            for count, other_count
+            in zip(self.bucket_count_list, other.bucket_count_list)
+        ]
+
+    def get_summary(self):
+        return {
+            "call_count": self.call_count,
+            "row_count": self.row_count,
+            "byte_count": self.byte_count,
+            "seconds": self.seconds,
+            "wait_seconds": self.wait_seconds,
+            # Rows per second of time spent in the stage itself
+            "rows_per_second": (
+                self.row_count / self.seconds if self.seconds else None
+            ),
+            "latency": {
+                **{
+                    f"p{percentile}": self.get_percentile(percentile)
+                    for percentile in self.percentile_list
+                },
+                "max": self.max_seconds,
+            },
+            "histogram": [
+                [bound, count]
+                for bound, count
+                in zip(self.bucket_bound_list + [None], self.bucket_count_list)
+                if count
+            ],
+        }
+
+    def get_percentile(self, percentile):
+        """
+        Takes a percentile
+        Returns the upper bound of the histogram bucket which holds it, or
+        the slowest call if that is in the last bucket
+        """
+        if not self.call_count:
+            return None
+
+        target_count = self.call_count * percentile / 100
+        count = 0
+
+        for bound, bucket_count in zip(self.bucket_bound_list, self.bucket_count_list):
+            count += bucket_count
+
+            if count >= target_count:
+                return min(bound, self.max_seconds)
+
+        return self.max_seconds
+
+
+class Sink:
+    """
+    Receives metrics summaries
+    """
+
+    def emit(self, summary, is_final):
+        raise NotImplementedError(
+            f"{self.__class__} must implement .emit()"
+        )
+
+
+class LogSink(Sink):
+    """
+    Logs each summary as a line of JSON
+    """
+    logger_name = "kbde.etl"
+    level = logging.INFO
+
+    def emit(self, summary, is_final):
+        logging.getLogger(self.logger_name).log(
+            self.level,
+            "%s %s",
+            "summary" if is_final else "progress",
+            json.dumps(summary),
+        )
@@ -0,0 +1,413 @@
+import multiprocessing, queue, threading, time, traceback
+from multiprocessing import reduction
+
+
+class Pipeline:
+    """
+    Runs an extractor, transformers, and a loader as concurrent stages
+
+    The extractor runs in its own thread or process, and groups objects into
+    chunks of `chunk_size`. Chunks are passed through the transformers by
+    `transformer_worker_count` workers, and the loader runs in the calling
+    thread. Stages are connected by queues, and at most
+    `max_in_flight_chunk_count` chunks are between the extractor and the
+    loader at once, so a slow stage holds back the stages before it.
+
+    In `process` mode, the extractor and transformers must be picklable.
+
+    If `metrics` is given, each stage records the time it spends waiting on
+    the queues, and it is given to any extractor, transformer, or loader
+    which doesn't have its own.
+    """
+    extractor = None
+    transformer_list = []
+    loader = None
+    mode = "thread"
+    mode_list = [
+        "thread",
+        "process",
+    ]
+    transformer_worker_count = 1
+    chunk_size = 1000
+    max_in_flight_chunk_count = 8
+    # When False, chunks are loaded in the order that transformer workers
+    # finish them
+    ordered = True
+    poll_timeout = 0.1
+    metrics = None
+
+    def __init__(self,
+                 extractor=None,
+                 transformer_list=None,
+                 loader=None,
+                 metrics=None):
+        self.extractor = extractor or self.extractor
+        self.transformer_list = (
+            transformer_list if transformer_list is not None
+            else self.transformer_list
+        )
+        self.loader = loader or self.loader
+        self.metrics = metrics or self.metrics
+
+        assert self.extractor is not None, (
+            f"{self.__class__} must define .extractor, or be given an "
+            f"`extractor`"
+        )
+        assert self.loader is not None, (
+            f"{self.__class__} must define .loader, or be given a `loader`"
+        )
+        assert self.mode in self.mode_list, (
+            f"{self.__class__} .mode must be one of {self.mode_list}"
+        )
+        assert getattr(self.extractor, "checkpoint", None) is None or (
+            self.mode == "thread" and self.ordered
+        ), (
+            f"{self.__class__} can only use an extractor with a checkpoint in "
+            f"`thread` mode, with .ordered set"
+        )
+
+        if self.metrics is not None:
+
+            for stage in [self.extractor, *self.transformer_list, self.loader]:
+
+                if getattr(stage, "metrics", False) is None:
+                    stage.metrics = self.metrics
+
+    def run(self):
+        context = self.get_context()
+        stop_event = context.Event()
+        chunk_slots = context.BoundedSemaphore(self.max_in_flight_chunk_count)
+        load_queue = context.Queue(self.max_in_flight_chunk_count + 1)
+        worker_list = []
+
+        if self.transformer_list:
+            transform_queue = context.Queue(self.max_in_flight_chunk_count + 1)
+            worker_count = self.transformer_worker_count
+
+            for _ in range(worker_count):
+                worker_list.append(context.Process(
+                    target=run_transform_stage,
+                    args=(
+                        self.transformer_list,
+                        transform_queue,
+                        load_queue,
+                        stop_event,
+                        self.poll_timeout,
+                        self.metrics,
+                        self.get_send_metrics(),
+                    ),
+                    daemon=True,
+                ))
+
+        else:
+            transform_queue = load_queue
+            worker_count = 1
+
+        worker_list.insert(0, context.Process(
+            target=run_extract_stage,
+            args=(
+                self.extractor,
+                self.chunk_size,
+                transform_queue,
+                worker_count,
+                chunk_slots,
+                stop_event,
+                self.poll_timeout,
+                self.metrics,
+                self.get_send_metrics(),
+            ),
+            daemon=True,
+        ))
+
+        for worker in worker_list:
+            worker.start()
+
+        try:
+            self.loader.load(
+                self.get_loaded_object_list(
+                    load_queue,
+                    worker_count,
+                    chunk_slots,
+                    stop_event,
+                )
+            )
+
+        except BaseException:
+            stop_event.set()
+            raise
+
+        finally:
+            self.join(worker_list)
+
+    def get_context(self):
+        if self.mode == "process":
+            return multiprocessing.get_context()
+
+        return ThreadContext
+
+    def get_send_metrics(self):
+        """
+        Returns True if stages must send their metrics back with their done
+        messages, because they run in other processes
+        """
+        return self.metrics is not None and self.mode == "process"
+
+    def get_loaded_object_list(self, load_queue, worker_count, chunk_slots, stop_event):
+        """
+        Yields the objects from each transformed chunk, in extraction order
+        if `.ordered` is set
+        """
+        done_count = 0
+        pending_chunk_dict = {}
+        next_chunk_number = 0
+
+        while done_count < worker_count:
+            message = get_message(
+                load_queue,
+                stop_event,
+                self.poll_timeout,
+                self.metrics,
+                "load",
+            )
+
+            if message is None:
+                raise self.StageException("pipeline was stopped")
+
+            message_type, chunk_number, value = message
+
+            if message_type == ERROR:
+                stop_event.set()
+                raise self.StageException(
+                    f"pipeline stage failed:\n{value[1]}"
+                ) from value[0]
+
+            if message_type == DONE:
+                done_count += 1
+
+                if value:
+                    self.metrics.merge(value)
+
+                continue
+
+            if not self.ordered:
+                chunk_slots.release()
+                yield from value
+                continue
+
+            pending_chunk_dict[chunk_number] = value
+
+            while next_chunk_number in pending_chunk_dict:
+                chunk_slots.release()
+                yield from pending_chunk_dict.pop(next_chunk_number)
+                next_chunk_number += 1
+
+    def join(self, worker_list):
+        for worker in worker_list:
+            worker.join(timeout=self.poll_timeout * 10)
+
+            if worker.is_alive() and hasattr(worker, "terminate"):
+                worker.terminate()
+                worker.join()
+
+    class StageException(Exception):
+        pass
+
+
+CHUNK = "chunk"
+DONE = "done"
+ERROR = "error"
+
+
+def run_extract_stage(extractor,
+                      chunk_size,
+                      output_queue,
+                      worker_count,
+                      chunk_slots,
+                      stop_event,
+                      poll_timeout,
+                      metrics=None,
+                      send_metrics=False):
+    """
+    Extracts objects, and puts them onto the output queue in numbered chunks
+    Puts a done message for each downstream worker when finished, the first
+    of which carries the stage's metrics, if `send_metrics` is set
+    """
+    try:
+        chunk_number = 0
+        chunk = []
+
+        for obj in extractor.extract():
+            chunk.append(obj)
+
+            if len(chunk) < chunk_size:
+                continue
+
+            if not put_chunk(output_queue, chunk_number, chunk, chunk_slots, stop_event, poll_timeout, metrics):
+                return
+
+            chunk_number += 1
+            chunk = []
+
+        if chunk:
+
+            if not put_chunk(output_queue, chunk_number, chunk, chunk_slots, stop_event, poll_timeout, metrics):
+                return
+
+        stage_dict = metrics.pop_stage_dict() if send_metrics else None
+
+        for _ in range(worker_count):
+            put_message(output_queue, (DONE, None, stage_dict), stop_event, poll_timeout)
+            stage_dict = None
+
+    except Exception as e:
+        put_error(output_queue, e, stop_event, poll_timeout)
+
+
+def run_transform_stage(transformer_list,
+                        input_queue,
+                        output_queue,
+                        stop_event,
+                        poll_timeout,
+                        metrics=None,
+                        send_metrics=False):
+    """
+    Takes chunks from the input queue, transforms them, and puts them onto
+    the output queue
+    Adds the stage's metrics to its done message, if `send_metrics` is set
+    """
+    try:
+
+        while True:
+            message = get_message(
+                input_queue,
+                stop_event,
+                poll_timeout,
+                metrics,
+                "transform",
+            )
+
+            if message is None:
+                return
+
+            message_type, chunk_number, chunk = message
+
+            if message_type == CHUNK:
+
+                for transformer in transformer_list:
+                    chunk = transformer.transform_batch(chunk)
+
+                message = (CHUNK, chunk_number, chunk)
+
+            elif message_type == DONE and send_metrics:
+
+                if chunk:
+                    # Pass on the extractor's metrics
+                    metrics.merge(chunk)
+
+                message = (DONE, None, metrics.pop_stage_dict())
+
+            if not put_message(output_queue, message, stop_event, poll_timeout, metrics, "transform"):
+                return
+
+            if message_type != CHUNK:
+                return
+
+    except Exception as e:
+        put_error(output_queue, e, stop_event, poll_timeout)
+
+
+def put_chunk(output_queue, chunk_number, chunk, chunk_slots, stop_event, poll_timeout, metrics=None):
+    start = time.perf_counter()
+
+    # Wait for a slot, so that only a bounded number of chunks are in flight
+    while not chunk_slots.acquire(timeout=poll_timeout):
+
+        if stop_event.is_set():
+            return False
+
+    if metrics is not None:
+        metrics.record_wait("extract", time.perf_counter() - start)
+
+    return put_message(output_queue, (CHUNK, chunk_number, chunk), stop_event, poll_timeout, metrics, "extract")
+
+
+def put_message(output_queue, message, stop_event, poll_timeout, metrics=None, stage=None):
+    """
+    Puts a message onto a queue, unless the pipeline is stopped first
+    Returns True if the message was put
+    Records the time spent waiting under `stage`, if `metrics` is given
+    """
+    start = time.perf_counter()
+
+    while not stop_event.is_set():
+
+        try:
+            output_queue.put(message, timeout=poll_timeout)
+        except queue.Full:
+            continue
+
+        if metrics is not None:
+            metrics.record_wait(stage, time.perf_counter() - start)
+
+        return True
+
+    # Don't wait for unsent messages when a stopped process exits
+    cancel_join_thread = getattr(output_queue, "cancel_join_thread", None)
+    if cancel_join_thread is not None:
+        cancel_join_thread()
+
+    return False
+
+
+def put_error(output_queue, exception, stop_event, poll_timeout):
+    traceback_string = traceback.format_exc()
+
+    try:
+        # Make sure that the exception can be sent to another process
+        reduction.ForkingPickler.dumps(exception)
+    except Exception:
+        exception = RuntimeError(repr(exception))
+
+    put_message(
+        output_queue,
+        (ERROR, None, (exception, traceback_string)),
+        stop_event,
+        poll_timeout,
+    )
+
+
+def get_message(input_queue, stop_event, poll_timeout, metrics=None, stage=None):
+    """
+    Gets a message from a queue
+    Returns None if the pipeline is stopped first
+    Records the time spent waiting under `stage`, if `metrics` is given
+    """
+    start = time.perf_counter()
+
+    while not stop_event.is_set():
+
+        try:
+            message = input_queue.get(timeout=poll_timeout)
+        except queue.Empty:
+            continue
+
+        if metrics is not None:
+            metrics.record_wait(stage, time.perf_counter() - start)
+
+        return message
+
+    return None
+
+
+class ThreadContext:
+    """
+    Mirrors the parts of a multiprocessing context which the pipeline uses,
+    with threads
+    """
+    Event = threading.Event
+    BoundedSemaphore = threading.BoundedSemaphore
+    Queue = queue.Queue
+
+    @staticmethod
+    def Process(target, args, daemon):
+        return threading.Thread(target=target, args=args, daemon=daemon)
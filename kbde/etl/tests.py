@@ -0,0 +1,1389 @@
+import csv, gzip, io, json, os, pickle, tempfile, threading, time, unittest
+
+from . import checkpoint, extract, load, metrics, pipeline, transform
+
+try:
+    import django
+except ImportError:
+    django = None
+
+try:
+    import pyarrow
+    from pyarrow import parquet
+except ImportError:
+    pyarrow = None
+
+
+class RangeExtractor(extract.Extractor):
+    """
+    Extracts `page_count` pages of `page_size` numbered objects
+    """
+    page_count = 10
+    page_size = 25
+    fail_page_number = None
+
+    def get_page(self, page_number):
+        if page_number == self.fail_page_number:
+            raise ValueError("extract failed")
+
+        if page_number > self.page_count:
+            return None
+
+        start = (page_number - 1) * self.page_size
+
+        return [
+            {"id": object_id}
+            for object_id in range(start, start + self.page_size)
+        ]
+
+
+class DoubleTransformer(transform.Transformer):
+    fail_id = None
+
+    def transform_object(self, obj):
+        if obj["id"] == self.fail_id:
+            raise ValueError("transform failed")
+
+        return {"id": obj["id"], "double": obj["id"] * 2}
+
+
+class ListLoader(load.Loader):
+    """
+    Loads objects into a list
+    """
+    chunk_size = 10
+    fail_chunk_number = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.object_list = []
+        self.chunk_count = 0
+        self.thread_set = set()
+
+    def load_data(self, object_list):
+        self.chunk_count += 1
+        self.thread_set.add(threading.get_ident())
+
+        if self.chunk_count == self.fail_chunk_number:
+            raise ValueError("load failed")
+
+        self.object_list.extend(object_list)
+
+
+def get_id_list(object_list):
+    return [obj["id"] for obj in object_list]
+
+
+class PipelineTest(unittest.TestCase):
+    object_count = RangeExtractor.page_count * RangeExtractor.page_size
+
+    def run_pipeline(self, loader=None, extractor=None, transformer=None, **kwargs):
+        pipeline_class = type("TestPipeline", (pipeline.Pipeline,), {
+            "chunk_size": 7,
+            "max_in_flight_chunk_count": 3,
+            "poll_timeout": 0.01,
+            **kwargs,
+        })
+        loader = loader or ListLoader()
+        pipeline_class(
+            extractor=extractor or RangeExtractor(),
+            transformer_list=[transformer or DoubleTransformer()],
+            loader=loader,
+        ).run()
+
+        return loader
+
+    def testOrdered(self):
+        for mode in pipeline.Pipeline.mode_list:
+            loader = self.run_pipeline(mode=mode, transformer_worker_count=3)
+            self.assertEqual(get_id_list(loader.object_list), list(range(self.object_count)))
+            self.assertEqual(loader.object_list[5], {"id": 5, "double": 10})
+
+    def testUnordered(self):
+        for mode in pipeline.Pipeline.mode_list:
+            loader = self.run_pipeline(
+                mode=mode,
+                transformer_worker_count=3,
+                ordered=False,
+            )
+            self.assertEqual(
+                sorted(get_id_list(loader.object_list)),
+                list(range(self.object_count)),
+            )
+
+    def testStageFailure(self):
+        for mode in pipeline.Pipeline.mode_list:
+
+            extractor = RangeExtractor()
+            extractor.fail_page_number = 3
+
+            with self.assertRaises(pipeline.Pipeline.StageException) as context:
+                self.run_pipeline(extractor=extractor, mode=mode)
+
+            self.assertIsInstance(context.exception.__cause__, ValueError)
+
+            transformer = DoubleTransformer()
+            transformer.fail_id = 100
+
+            with self.assertRaises(pipeline.Pipeline.StageException) as context:
+                self.run_pipeline(transformer=transformer, mode=mode)
+
+            self.assertIsInstance(context.exception.__cause__, ValueError)
+
+    def testLoaderFailure(self):
+        for mode in pipeline.Pipeline.mode_list:
+            loader = ListLoader()
+            loader.fail_chunk_number = 2
+
+            with self.assertRaisesRegex(ValueError, "load failed"):
+                self.run_pipeline(loader=loader, mode=mode)
+
+            self.assertEqual(get_id_list(loader.object_list), list(range(10)))
+
+    def testBackpressure(self):
+        extracted_count = 0
+        lag_list = []
+
+        class CountingExtractor(RangeExtractor):
+
+            def get_page(self, page_number):
+                nonlocal extracted_count
+                object_list = super().get_page(page_number)
+
+                if object_list is not None:
+                    extracted_count += len(object_list)
+
+                return object_list
+
+        class SlowLoader(ListLoader):
+
+            def load_data(self, object_list):
+                lag_list.append(extracted_count - len(self.object_list))
+                time.sleep(0.005)
+                super().load_data(object_list)
+
+        self.run_pipeline(
+            loader=SlowLoader(),
+            extractor=CountingExtractor(),
+            chunk_size=5,
+            max_in_flight_chunk_count=2,
+        )
+
+        # Chunks in flight, the chunk and page which the extractor is
+        # building, and the chunk which the loader is building
+        self.assertLessEqual(
+            max(lag_list),
+            2 * 5 + 5 + RangeExtractor.page_size + ListLoader.chunk_size,
+        )
+
+
+class KeyTransformerTest(unittest.TestCase):
+
+    def make_transformer(self, **kwargs):
+        new_key_list = []
+
+        class CountingTransformer(transform.KeyMapTransformer):
+            key_map = {"a": "A", "b": "B"}
+
+            def get_new_key(self, key):
+                new_key_list.append(key)
+                return super().get_new_key(key)
+
+        return type("TestTransformer", (CountingTransformer,), kwargs)(), new_key_list
+
+    def get_object_list(self):
+        return [
+            {"a": 1, "b": 2, "c": 3},
+            {"a": 4, "b": 5, "c": 6},
+            {"c": 7, "a": 8},
+        ]
+
+    def testTransform(self):
+        result_list = [
+            {"A": 1, "B": 2, "c": 3},
+            {"A": 4, "B": 5, "c": 6},
+            {"c": 7, "A": 8},
+        ]
+
+        for method_name in ["transform", "transform_batch"]:
+            transformer, new_key_list = self.make_transformer()
+            object_list = getattr(transformer, method_name)(self.get_object_list())
+            self.assertEqual(list(object_list), result_list)
+
+            # New keys are worked out once for each sequence of keys
+            self.assertEqual(new_key_list, ["a", "b", "c", "c", "a"])
+
+        class DashTransformer(transform.KeyReplaceTransformer):
+            old = "-"
+            new = "_"
+
+        self.assertEqual(
+            DashTransformer().transform_batch([{"a-b": 1, "c": 2}]),
+            [{"a_b": 1, "c": 2}],
+        )
+
+    def testCacheSize(self):
+        transformer, new_key_list = self.make_transformer(key_cache_size=2)
+
+        for obj in self.get_object_list() + self.get_object_list():
+            transformer.transform_object(obj)
+            self.assertLessEqual(len(transformer.key_cache), 2)
+
+        self.assertEqual(transformer.transform_object({"b": 1}), {"B": 1})
+
+    def testTransformObjectOverride(self):
+
+        class ExtraTransformer(transform.KeyMapTransformer):
+            key_map = {"a": "A"}
+
+            def transform_object(self, obj):
+                obj = super().transform_object(obj)
+                obj["extra"] = 1
+                return obj
+
+        transformer = ExtraTransformer()
+
+        # Batches go through the overridden `.transform_object()`
+        self.assertEqual(
+            transformer.transform_batch([{"a": 1}]),
+            list(transformer.transform([{"a": 1}])),
+        )
+        self.assertEqual(transformer.transform_batch([{"a": 1}]), [{"A": 1, "extra": 1}])
+
+    def testMetrics(self):
+        job_metrics = metrics.Metrics(sink=metrics.Sink())
+        transformer, _ = self.make_transformer(metrics=job_metrics)
+        transformer.transform_batch(self.get_object_list())
+
+        stage_metrics = job_metrics.stage_dict["transform"]
+        self.assertEqual(stage_metrics.call_count, 1)
+        self.assertEqual(stage_metrics.row_count, 3)
+
+
+class ListSink(metrics.Sink):
+
+    def __init__(self):
+        self.summary_list = []
+
+    def emit(self, summary, is_final):
+        self.summary_list.append((summary, is_final))
+
+
+class MetricsTest(unittest.TestCase):
+
+    def testHistogram(self):
+        stage_metrics = metrics.StageMetrics()
+
+        for seconds in [0.0005, 0.003, 0.003, 100]:
+            stage_metrics.record(seconds, 10)
+
+        summary = stage_metrics.get_summary()
+        self.assertEqual(summary["call_count"], 4)
+        self.assertEqual(summary["row_count"], 40)
+        # Buckets are listed by upper bound, and the last one has none
+        self.assertEqual(summary["histogram"], [[0.001, 1], [0.004, 2], [None, 1]])
+        self.assertEqual(summary["latency"]["max"], 100)
+
+    def testPercentiles(self):
+        stage_metrics = metrics.StageMetrics()
+        self.assertIsNone(stage_metrics.get_percentile(50))
+
+        for _ in range(90):
+            stage_metrics.record(0.0015, 1)
+
+        for _ in range(10):
+            stage_metrics.record(0.5, 1)
+
+        # The upper bound of the bucket which holds the percentile, but no
+        # more than the slowest call
+        self.assertEqual(stage_metrics.get_percentile(50), 0.002)
+        self.assertEqual(stage_metrics.get_percentile(90), 0.002)
+        self.assertEqual(stage_metrics.get_percentile(95), 0.5)
+
+        stage_metrics.record(60, 1)
+        self.assertEqual(stage_metrics.get_percentile(100), 60)
+
+    def testMerge(self):
+        job_metrics = metrics.Metrics(sink=ListSink())
+        job_metrics.record("load", 0.003, 10)
+
+        # Copies sent to other processes start empty, and are merged back
+        process_metrics = pickle.loads(pickle.dumps(job_metrics))
+        self.assertIsNone(process_metrics.sink)
+        self.assertEqual(process_metrics.stage_dict, {})
+
+        process_metrics.record("load", 0.0005, 5)
+        process_metrics.record("transform", 0.1, 5)
+        process_metrics.record_bytes("load", 100)
+        process_metrics.record_wait("load", 1.5)
+        job_metrics.merge(process_metrics.pop_stage_dict())
+
+        self.assertEqual(process_metrics.stage_dict, {})
+
+        summary = job_metrics.get_summary()["stages"]
+        self.assertEqual(summary["load"]["call_count"], 2)
+        self.assertEqual(summary["load"]["row_count"], 15)
+        self.assertEqual(summary["load"]["byte_count"], 100)
+        self.assertEqual(summary["load"]["wait_seconds"], 1.5)
+        self.assertEqual(summary["load"]["histogram"], [[0.001, 1], [0.004, 1]])
+        self.assertEqual(summary["transform"]["row_count"], 5)
+
+    def testPipelineMerge(self):
+        for mode in pipeline.Pipeline.mode_list:
+            sink = ListSink()
+            job_metrics = metrics.Metrics(sink=sink)
+            pipeline_class = type("MetricsPipeline", (pipeline.Pipeline,), {
+                "mode": mode,
+                "chunk_size": 7,
+                "poll_timeout": 0.01,
+            })
+            pipeline_class(
+                extractor=RangeExtractor(),
+                transformer_list=[DoubleTransformer()],
+                loader=ListLoader(),
+                metrics=job_metrics,
+            ).run()
+
+            # Rows are counted once, whichever process transformed them
+            summary, is_final = sink.summary_list[-1]
+            self.assertTrue(is_final)
+
+            for stage in ["extract", "transform", "load"]:
+                self.assertEqual(
+                    summary["stages"][stage]["row_count"],
+                    RangeExtractor.page_count * RangeExtractor.page_size,
+                    (mode, stage),
+                )
+
+    def testLogInterval(self):
+        sink = ListSink()
+        job_metrics = metrics.Metrics(sink=sink, log_interval=0)
+
+        # Every call is reported
+        job_metrics.record("load", 0.1, 1)
+        job_metrics.record("load", 0.1, 1)
+        self.assertEqual([is_final for _, is_final in sink.summary_list], [False, False])
+
+        job_metrics = metrics.Metrics(sink=sink)
+        self.assertEqual(job_metrics.log_interval, metrics.Metrics.log_interval)
+
+    def testLogSink(self):
+        job_metrics = metrics.Metrics()
+        job_metrics.record("load", 0.1, 1)
+
+        with self.assertLogs("kbde.etl", level="INFO") as logs:
+            job_metrics.report(is_final=True)
+
+        message = logs.records[0].getMessage()
+        self.assertTrue(message.startswith("summary "))
+        summary = json.loads(message[len("summary "):])
+        self.assertEqual(summary["stages"]["load"]["row_count"], 1)
+
+        with self.assertLogs("kbde.etl", level="INFO") as logs:
+            job_metrics.report()
+
+        self.assertTrue(logs.records[0].getMessage().startswith("progress "))
+
+
+class BackgroundFlushTest(unittest.TestCase):
+
+    def make_loader(self, **kwargs):
+        return type("BackgroundLoader", (ListLoader,), {
+            "max_in_flight_chunk_count": 2,
+            **kwargs,
+        })()
+
+    def testOrder(self):
+        loader = self.make_loader()
+        loader.load({"id": object_id} for object_id in range(95))
+
+        self.assertEqual(get_id_list(loader.object_list), list(range(95)))
+        self.assertEqual(loader.chunk_count, 10)
+        # Chunks are loaded by one background thread
+        self.assertEqual(len(loader.thread_set), 1)
+        self.assertNotIn(threading.get_ident(), loader.thread_set)
+
+    def testFailure(self):
+        for fail_chunk_number in [2, 10]:
+            loader = self.make_loader(fail_chunk_number=fail_chunk_number)
+
+            # Raised at a later flush, or when the load finishes
+            with self.assertRaisesRegex(ValueError, "load failed"):
+                loader.load({"id": object_id} for object_id in range(100))
+
+            self.assertIsNone(loader.flush_executor)
+
+    def testBoundedInFlightChunks(self):
+        release = threading.Event()
+        consumed_count = 0
+
+        class BlockedLoader(ListLoader):
+            max_in_flight_chunk_count = 2
+
+            def load_data(self, object_list):
+                release.wait()
+                super().load_data(object_list)
+
+        def make_object_list():
+            nonlocal consumed_count
+
+            for object_id in range(100):
+                consumed_count += 1
+                yield {"id": object_id}
+
+        loader = BlockedLoader()
+        thread = threading.Thread(target=loader.load, args=(make_object_list(),))
+        thread.start()
+        time.sleep(0.2)
+
+        # Two chunks are in flight, and load() waits for room for the third
+        self.assertEqual(consumed_count, 3 * ListLoader.chunk_size)
+
+        release.set()
+        thread.join()
+
+        self.assertEqual(get_id_list(loader.object_list), list(range(100)))
+
+
+class MemoryCheckpointStore(checkpoint.CheckpointStore):
+
+    def __init__(self):
+        self.value_dict = {}
+
+    def get(self, job_name):
+        return self.value_dict.get(job_name)
+
+    def set(self, job_name, value):
+        self.value_dict[job_name] = value
+
+    def delete(self, job_name):
+        self.value_dict.pop(job_name, None)
+
+
+class CheckpointTest(unittest.TestCase):
+
+    def testCommitOrder(self):
+        store = MemoryCheckpointStore()
+        job_checkpoint = checkpoint.Checkpoint("job", store)
+        job_checkpoint.mark(5, "a")
+        job_checkpoint.mark(5, "b")
+
+        # Only values whose objects have all been loaded are committed
+        job_checkpoint.commit(4)
+        self.assertIsNone(job_checkpoint.get())
+        job_checkpoint.commit(3)
+        self.assertEqual(job_checkpoint.get(), "a")
+
+        job_checkpoint.finish(2)
+        job_checkpoint.commit(3)
+        self.assertEqual(job_checkpoint.get(), "b")
+
+        # Nothing is committed after a failure
+        job_checkpoint.fail()
+        job_checkpoint.commit(2)
+        self.assertEqual(job_checkpoint.get(), "b")
+
+        # Finishing clears the checkpoint
+        job_checkpoint = checkpoint.Checkpoint("job", store)
+        job_checkpoint.finish(1)
+        job_checkpoint.commit(1)
+        self.assertIsNone(job_checkpoint.get())
+
+    def testFileStore(self):
+        with tempfile.TemporaryDirectory() as directory_path:
+            store = checkpoint.FileCheckpointStore(directory_path)
+            self.assertIsNone(store.get("job"))
+
+            store.set("job", {"page": 3})
+            self.assertEqual(store.get("job"), {"page": 3})
+            self.assertEqual(os.listdir(directory_path), ["job.json"])
+
+            store.delete("job")
+            store.delete("job")
+            self.assertIsNone(store.get("job"))
+
+    def testResume(self):
+        object_count = RangeExtractor.page_count * RangeExtractor.page_size
+
+        for max_in_flight_chunk_count in [0, 2]:
+            store = MemoryCheckpointStore()
+            loader_class = type("CheckpointLoader", (ListLoader,), {
+                "max_in_flight_chunk_count": max_in_flight_chunk_count,
+            })
+
+            # The 6th chunk holds objects 50 to 59, so pages 1 and 2 are
+            # fully loaded before the failure
+            job_checkpoint = checkpoint.Checkpoint("job", store)
+            loader = loader_class(checkpoint=job_checkpoint)
+            loader.fail_chunk_number = 6
+
+            with self.assertRaisesRegex(ValueError, "load failed"):
+                loader.load(RangeExtractor(checkpoint=job_checkpoint).extract())
+
+            first_id_list = get_id_list(loader.object_list)
+            # A page is marked when the extractor moves past its last
+            # object, which can be after the chunk holding it was loaded, so
+            # the checkpoint may be a page behind
+            page_number = store.get("job")
+            self.assertIn(page_number, [1, 2])
+
+            job_checkpoint = checkpoint.Checkpoint("job", store)
+            loader = loader_class(checkpoint=job_checkpoint)
+            loader.load(RangeExtractor(checkpoint=job_checkpoint).extract())
+
+            second_id_list = get_id_list(loader.object_list)
+            self.assertEqual(
+                second_id_list,
+                list(range(page_number * RangeExtractor.page_size, object_count)),
+            )
+
+            # Nothing was skipped, and the checkpoint is cleared
+            self.assertEqual(
+                set(first_id_list) | set(second_id_list),
+                set(range(object_count)),
+            )
+            self.assertIsNone(store.get("job"))
+
+    def testPipelineMode(self):
+        extractor = RangeExtractor(checkpoint=checkpoint.Checkpoint(
+            "job",
+            MemoryCheckpointStore(),
+        ))
+
+        class UnorderedPipeline(pipeline.Pipeline):
+            ordered = False
+
+        class ProcessPipeline(pipeline.Pipeline):
+            mode = "process"
+
+        # Checkpoints need objects to reach the loader in extraction order
+        for pipeline_class in [UnorderedPipeline, ProcessPipeline]:
+
+            with self.assertRaises(AssertionError):
+                pipeline_class(extractor=extractor, loader=ListLoader())
+
+        loader = ListLoader(checkpoint=extractor.checkpoint)
+        pipeline.Pipeline(extractor=extractor, loader=loader).run()
+        self.assertEqual(
+            get_id_list(loader.object_list),
+            list(range(RangeExtractor.page_count * RangeExtractor.page_size)),
+        )
+
+
+class PrefetchTest(unittest.TestCase):
+
+    def make_extractor(self, prefetch_page_count=3):
+        page_number_list = []
+
+        class SlowExtractor(RangeExtractor):
+
+            def get_page(self, page_number):
+                page_number_list.append(page_number)
+                # Later pages finish first
+                time.sleep(0.001 * (page_number % 3))
+                return super().get_page(page_number)
+
+        extractor = SlowExtractor()
+        extractor.prefetch_page_count = prefetch_page_count
+
+        return extractor, page_number_list
+
+    def testOrder(self):
+        extractor, page_number_list = self.make_extractor()
+
+        self.assertEqual(
+            get_id_list(extractor.extract()),
+            list(range(RangeExtractor.page_count * RangeExtractor.page_size)),
+        )
+        # Pages past the last one were fetched, and discarded
+        self.assertEqual(
+            sorted(page_number_list),
+            list(range(1, RangeExtractor.page_count + 4)),
+        )
+
+    def testEarlyTermination(self):
+        extractor, page_number_list = self.make_extractor()
+        object_iter = extractor.extract()
+
+        for _ in range(RangeExtractor.page_size + 1):
+            next(object_iter)
+
+        object_iter.close()
+        fetched_count = len(page_number_list)
+
+        # Only a window of pages past the one being read was fetched, and
+        # nothing more is fetched once the consumer stops
+        self.assertLessEqual(fetched_count, 2 + 3)
+        time.sleep(0.05)
+        self.assertEqual(len(page_number_list), fetched_count)
+
+    def testFailure(self):
+        extractor, _ = self.make_extractor()
+        extractor.fail_page_number = 3
+
+        with self.assertRaisesRegex(ValueError, "extract failed"):
+            list(extractor.extract())
+
+
+class FileExtractorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "data")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_file(self, data):
+        with open(self.file_path, "w") as open_file:
+            open_file.write(data)
+
+    def make_extractor(self, extractor_class, **kwargs):
+        return type("TestExtractor", (extractor_class,), {
+            "file_path": self.file_path,
+            **kwargs,
+        })()
+
+    def testJsonFile(self):
+        object_list = [
+            {"id": object_id, "name": f"é {object_id}"}
+            for object_id in range(50)
+        ]
+        self.write_file(json.dumps({"meta": {"count": 50}, "results": object_list}))
+
+        extractor = self.make_extractor(
+            extract.JsonFileExtractor,
+            data_path=["results"],
+            get_data_list=lambda self, data: data["results"],
+        )
+        self.assertEqual(list(extractor.extract()), object_list)
+
+        extractor = self.make_extractor(
+            extract.JsonFileExtractor,
+            incremental=True,
+            data_path=["results"],
+        )
+        self.assertEqual(list(extractor.extract()), object_list)
+
+    def testNewlineJsonFile(self):
+        self.write_file('{"id": 0}\n\n  \n{"id": 1}\n{"id": 2}')
+        extractor = self.make_extractor(extract.NewlineJsonFileExtractor)
+
+        # Blank lines are skipped, and the last line doesn't need a newline
+        self.assertEqual(get_id_list(extractor.extract()), [0, 1, 2])
+
+        self.write_file('{"id": 0}\n{"id": \n')
+        object_iter = extractor.extract()
+
+        # Lines are parsed as they are read
+        self.assertEqual(next(object_iter), {"id": 0})
+
+        with self.assertRaises(ValueError):
+            next(object_iter)
+
+
+class CsvLoaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "data.csv")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_loader(self, **kwargs):
+        file_list = []
+
+        class TestCsvLoader(load.CsvLoader):
+            file_path = self.file_path
+            field_names = ["id", "name"]
+            chunk_size = 10
+
+            def load_file(self, open_file, object_list):
+                file_list.append(open_file)
+                super().load_file(open_file, object_list)
+
+        return type("CsvLoader", (TestCsvLoader,), kwargs)(), file_list
+
+    def get_object_list(self):
+        return [
+            {"id": i, "name": f"name, \"{i}\"\n", "extra": "dropped"}
+            for i in range(25)
+        ]
+
+    def read_row_list(self, open_file):
+        return list(csv.reader(open_file))
+
+    def testRoundTrip(self):
+        loader, file_list = self.make_loader()
+        loader.load(self.get_object_list())
+
+        # One handle is used for every chunk, and closed at the end
+        self.assertEqual(len(file_list), 3)
+        self.assertEqual(len(set(map(id, file_list))), 1)
+        self.assertTrue(file_list[0].closed)
+        self.assertIsNone(loader.open_file)
+
+        with open(self.file_path, newline="") as open_file:
+            row_list = self.read_row_list(open_file)
+
+        # The header is written once, and quoted values survive
+        self.assertEqual(row_list[0], ["id", "name"])
+        self.assertEqual(
+            row_list[1:],
+            [[str(obj["id"]), obj["name"]] for obj in self.get_object_list()],
+        )
+
+    def testSingleField(self):
+        loader, _ = self.make_loader(field_names=["name"])
+        loader.load(self.get_object_list())
+
+        with open(self.file_path, newline="") as open_file:
+            row_list = self.read_row_list(open_file)
+
+        self.assertEqual(
+            row_list,
+            [["name"]] + [[obj["name"]] for obj in self.get_object_list()],
+        )
+
+    def testCompress(self):
+        self.file_path += ".gz"
+        loader, _ = self.make_loader(compress=True)
+        loader.load(self.get_object_list())
+
+        with gzip.open(self.file_path, "rt", newline="") as open_file:
+            row_list = self.read_row_list(open_file)
+
+        self.assertEqual(len(row_list), 26)
+        self.assertEqual(row_list[5], ["4", "name, \"4\"\n"])
+
+        # Loading again appends another gzip member, which is read back as
+        # one stream
+        loader.load(self.get_object_list()[:2])
+
+        with gzip.open(self.file_path, "rt", newline="") as open_file:
+            row_list = self.read_row_list(open_file)
+
+        self.assertEqual(len(row_list), 28)
+        self.assertEqual(row_list[-1], ["1", "name, \"1\"\n"])
+
+
+@unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+class ParquetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "data.parquet")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_loader(self, **kwargs):
+        return type("TestParquetLoader", (load.ParquetLoader,), {
+            "file_path": self.file_path,
+            "field_names": ["id", "name", "score"],
+            "chunk_size": 10,
+            **kwargs,
+        })()
+
+    def make_extractor(self, **kwargs):
+        return type("TestParquetExtractor", (extract.ParquetExtractor,), {
+            "file_path": self.file_path,
+            **kwargs,
+        })()
+
+    def get_object_list(self, count=25):
+        return [
+            {"id": i, "name": f"name {i}", "score": i / 2, "extra": "dropped"}
+            for i in range(count)
+        ]
+
+    def testRoundTrip(self):
+        self.make_loader().load(self.get_object_list())
+
+        # Each chunk is a row group
+        metadata = parquet.ParquetFile(self.file_path).metadata
+        self.assertEqual(
+            [
+                metadata.row_group(i).num_rows
+                for i in range(metadata.num_row_groups)
+            ],
+            [10, 10, 5],
+        )
+
+        for batch_size in [1, 7, 65536]:
+            self.assertEqual(
+                list(self.make_extractor(batch_size=batch_size).extract()),
+                [
+                    {key: obj[key] for key in ["id", "name", "score"]}
+                    for obj in self.get_object_list()
+                ],
+            )
+
+        # Only the projected columns are read
+        self.assertEqual(
+            list(self.make_extractor(field_names=["score", "id"]).extract())[3],
+            {"score": 1.5, "id": 3},
+        )
+
+        # Loading again replaces the file
+        self.make_loader().load(self.get_object_list(3))
+        self.assertEqual(len(list(self.make_extractor().extract())), 3)
+
+    def testSchema(self):
+        schema = pyarrow.schema([
+            ("id", pyarrow.int32()),
+            ("name", pyarrow.string()),
+            ("score", pyarrow.float32()),
+        ])
+        self.make_loader(schema=schema).load(self.get_object_list())
+        self.assertEqual(parquet.read_schema(self.file_path), schema)
+
+    def testSchemaMismatch(self):
+        object_list = self.get_object_list()
+        # Later chunks must match the types inferred from the first one
+        object_list[15]["id"] = "not a number"
+
+        with self.assertRaises((pyarrow.ArrowInvalid, pyarrow.ArrowTypeError)):
+            self.make_loader().load(object_list)
+
+        # The file is closed, with the chunks before the failure
+        self.assertEqual(
+            [obj["id"] for obj in self.make_extractor().extract()],
+            list(range(10)),
+        )
+
+
+class FakeS3Body(io.BytesIO):
+    """
+    Reads like a botocore streaming body, which only has `.read(size)`
+    Records the threads which read it
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.thread_list = []
+
+    def read(self, size=-1):
+        self.thread_list.append(threading.get_ident())
+        return super().read(size)
+
+    def readinto(self, buffer):
+        raise AssertionError("streaming bodies can't be read into a buffer")
+
+
+class FakeS3Paginator:
+
+    def __init__(self, client):
+        self.client = client
+
+    def paginate(self, Bucket, Prefix):
+        key_list = sorted(
+            key for key in self.client.file_dict[Bucket]
+            if key.startswith(Prefix)
+        )
+
+        # Two keys per listing page, so that keys span several pages
+        for start in range(0, len(key_list), 2):
+            yield {
+                "Contents": [{"Key": key} for key in key_list[start:start + 2]],
+            }
+
+        if not key_list:
+            yield {}
+
+
+class FakeS3Client:
+    """
+    Serves files from a dict of bucket names to dicts of keys to file data
+    """
+
+    def __init__(self, file_dict):
+        self.file_dict = file_dict
+        self.get_key_list = []
+        self.body_dict = {}
+
+    def get_paginator(self, operation_name):
+        assert operation_name == "list_objects_v2"
+        return FakeS3Paginator(self)
+
+    def get_object(self, Bucket, Key):
+        self.get_key_list.append(Key)
+        data = self.file_dict[Bucket][Key]
+        response = {"ContentLength": len(data)}
+
+        if isinstance(data, tuple):
+            content_encoding, data = data
+            response["ContentEncoding"] = content_encoding
+
+        response["Body"] = FakeS3Body(data)
+        self.body_dict[Key] = response["Body"]
+
+        return response
+
+
+class S3ExtractorTest(unittest.TestCase):
+
+    def make_csv(self, start, stop):
+        line_list = ["id,name"] + [f"{i},name {i}" for i in range(start, stop)]
+        return "\n".join(line_list).encode() + b"\n"
+
+    def make_extractor(self, file_dict, **kwargs):
+        client = FakeS3Client({"bucket": file_dict})
+        extractor_class = type("TestS3Extractor", (extract.S3Extractor,), {
+            "bucket_name": "bucket",
+            "bucket_path": "data/",
+            "get_s3_client": lambda self: client,
+        })
+
+        return extractor_class(**kwargs)
+
+    def get_file_dict(self):
+        return {
+            "data/1.csv": self.make_csv(0, 3),
+            "data/2.csv.gz": gzip.compress(self.make_csv(3, 6)),
+            "data/3.csv": ("gzip", gzip.compress(self.make_csv(6, 9))),
+            "data/4.csv": self.make_csv(9, 12),
+            "data/5.csv": self.make_csv(12, 15),
+            "other/1.csv": self.make_csv(100, 101),
+        }
+
+    def get_id_list(self, object_list):
+        return [int(obj["id"]) for obj in object_list]
+
+    def testPagination(self):
+        extractor = self.make_extractor(self.get_file_dict())
+
+        self.assertEqual(
+            extractor.page_path_list,
+            [
+                "data/1.csv",
+                "data/2.csv.gz",
+                "data/3.csv",
+                "data/4.csv",
+                "data/5.csv",
+            ],
+        )
+        self.assertEqual(self.make_extractor({}).page_path_list, [])
+
+    def testExtract(self):
+        for prefetch_page_count in [0, 3]:
+            extractor = self.make_extractor(self.get_file_dict())
+            extractor.prefetch_page_count = prefetch_page_count
+            object_list = list(extractor.extract())
+
+            # Gzipped files are read by key suffix and by content encoding
+            self.assertEqual(self.get_id_list(object_list), list(range(15)))
+            self.assertEqual(object_list[4], {"id": "4", "name": "name 4"})
+
+        self.assertEqual(
+            self.get_id_list(extractor.extract(page_number=3)),
+            [6, 7, 8],
+        )
+        self.assertIsNone(extractor.get_page(6))
+
+    def testPrefetchBody(self):
+        file_dict = self.get_file_dict()
+        file_dict["data/6.csv"] = self.make_csv(15, 1000)
+        extractor = self.make_extractor(file_dict)
+        extractor.prefetch_page_count = 2
+        extractor.prefetch_byte_count = 100
+
+        self.assertEqual(self.get_id_list(extractor.extract()), list(range(1000)))
+
+        # Bodies are read on the prefetching threads, up to
+        # `prefetch_byte_count` bytes, and larger files are streamed by the
+        # consumer
+        body_dict = extractor.client.body_dict
+
+        for body in body_dict.values():
+            self.assertNotEqual(body.thread_list[0], threading.get_ident())
+
+        self.assertNotIn(threading.get_ident(), body_dict["data/1.csv"].thread_list)
+        self.assertIn(threading.get_ident(), body_dict["data/6.csv"].thread_list)
+
+    def testResume(self):
+        file_dict = self.get_file_dict()
+        store = MemoryCheckpointStore()
+        store.set("job", "data/2.csv.gz")
+
+        # A file which sorts before the checkpoint was added since, and is
+        # not extracted
+        file_dict["data/0.csv"] = self.make_csv(200, 201)
+
+        job_checkpoint = checkpoint.Checkpoint("job", store)
+        extractor = self.make_extractor(file_dict, checkpoint=job_checkpoint)
+        loader = ListLoader(checkpoint=job_checkpoint)
+        loader.load(extractor.extract())
+
+        self.assertEqual(self.get_id_list(loader.object_list), list(range(6, 15)))
+        self.assertEqual(
+            extractor.client.get_key_list,
+            ["data/3.csv", "data/4.csv", "data/5.csv"],
+        )
+        self.assertIsNone(store.get("job"))
+
+
+@unittest.skipIf(django is None, "django is not installed")
+class DjangoModelLoaderTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from django.conf import settings
+
+        if not settings.configured:
+            settings.configure(
+                DATABASES={
+                    "default": {
+                        "ENGINE": "django.db.backends.sqlite3",
+                        "NAME": ":memory:",
+                    },
+                },
+            )
+
+        django.setup()
+
+        from django.db import connection, models
+
+        if connection.vendor != "sqlite":
+            raise unittest.SkipTest("the default database isn't SQLite")
+
+        class Item(models.Model):
+            code = models.CharField(max_length=20, unique=True)
+            name = models.CharField(max_length=100)
+            count = models.IntegerField(default=0)
+            data = models.JSONField(null=True)
+
+            class Meta:
+                app_label = "kbde_etl_tests"
+
+        cls.model = Item
+
+        with connection.schema_editor() as schema_editor:
+            schema_editor.create_model(cls.model)
+
+    @classmethod
+    def tearDownClass(cls):
+        from django.db import connection
+
+        with connection.schema_editor() as schema_editor:
+            schema_editor.delete_model(cls.model)
+
+        super().tearDownClass()
+
+    def setUp(self):
+        self.model.objects.all().delete()
+
+    def make_loader(self, **kwargs):
+        return type("ItemLoader", (load.DjangoModelLoader,), {
+            "model": self.model,
+            "field_names": ["code", "name", "count"],
+            "field_map": {"code": "id"},
+            "chunk_size": 10,
+            **kwargs,
+        })()
+
+    def get_row_list(self):
+        return list(
+            self.model.objects.order_by("code").values_list("code", "name", "count")
+        )
+
+    def testLoad(self):
+        loader = self.make_loader()
+        loader.load(
+            {"id": f"{i:02}", "name": f"name {i}", "count": i}
+            for i in range(25)
+        )
+
+        row_list = self.get_row_list()
+        self.assertEqual(len(row_list), 25)
+        self.assertEqual(row_list[3], ("03", "name 3", 3))
+
+    def testUpsert(self):
+        loader = self.make_loader(unique_field_names=["code"])
+        loader.load({"id": f"{i:02}", "name": "old", "count": i} for i in range(5))
+        loader.load({"id": f"{i:02}", "name": "new", "count": 0} for i in range(3, 8))
+
+        self.assertEqual(
+            self.get_row_list(),
+            [(f"{i:02}", "old", i) for i in range(3)]
+            + [(f"{i:02}", "new", 0) for i in range(3, 8)],
+        )
+
+        # Only the update fields are changed
+        loader = self.make_loader(
+            unique_field_names=["code"],
+            update_field_names=["count"],
+        )
+        loader.load([{"id": "00", "name": "ignored", "count": 10}])
+
+        self.assertEqual(self.get_row_list()[0], ("00", "old", 10))
+
+    def testFailedChunk(self):
+        from django.db import IntegrityError
+
+        object_list = [
+            {"id": f"{i:02}", "name": f"name {i}", "count": i}
+            for i in range(25)
+        ]
+        # The second chunk conflicts with a row in the first
+        object_list[15]["id"] = "05"
+
+        loader = self.make_loader()
+
+        with self.assertRaises(IntegrityError):
+            loader.load(object_list)
+
+        # The failed chunk left no rows behind
+        self.assertEqual(
+            [row[0] for row in self.get_row_list()],
+            [f"{i:02}" for i in range(10)],
+        )
+
+    def testCopyValue(self):
+        from django.db import connection
+
+        loader = self.make_loader(copy=True)
+
+        # COPY is only used on PostgreSQL
+        self.assertFalse(loader.can_copy(connection))
+
+        self.assertEqual(loader.get_copy_value(None), "\\N")
+        self.assertEqual(loader.get_copy_value(True), "t")
+        self.assertEqual(loader.get_copy_value(False), "f")
+        self.assertEqual(loader.get_copy_value(5), "5")
+        self.assertEqual(
+            loader.get_copy_value("a\tb\nc\rd\\e"),
+            "a\\tb\\nc\\rd\\\\e",
+        )
+        self.assertEqual(loader.get_copy_value(b"\x00\xff"), "\\\\x00ff")
+        self.assertEqual(
+            loader.get_copy_value({"key": "a\tb"}),
+            '{"key": "a\\\\tb"}',
+        )
+        self.assertEqual(
+            [field.name for field in loader.get_copy_field_list()],
+            ["code", "name", "count", "data"],
+        )
+
+    def testCopyJsonValue(self):
+        loader = self.make_loader(copy=True)
+        field = self.model._meta.get_field("data")
+
+        # JSON values are always written as JSON, even when they are
+        # strings or None
+        for value, copy_value in [
+            ("abc", '"abc"'),
+            (None, "null"),
+            (5, "5"),
+            (True, "true"),
+            ({"a": "b\tc"}, '{"a": "b\\\\tc"}'),
+            (["x", None], '["x", null]'),
+        ]:
+            instance = self.model(code="00", name="name", data=value)
+            self.assertEqual(loader.get_copy_field_value(field, instance), copy_value)
+
+        field = self.model._meta.get_field("name")
+        instance = self.model(code="00", name="a\tb")
+        self.assertEqual(loader.get_copy_field_value(field, instance), "a\\tb")
+
+
+class FakeSnowflakeConnector:
+    """
+    Records each statement, and reads the rows out of each staged file as
+    it is put
+    """
+
+    def __init__(self, fail_statement_list=()):
+        # Statements which raise, by how they start, and the number of the
+        # matching statement to fail on
+        self.fail_statement_list = list(fail_statement_list)
+        self.statement_list = []
+        self.file_dict = {}
+        self.lock = threading.Lock()
+
+    def execute(self, statement):
+        with self.lock:
+            self.statement_list.append(statement)
+            match_count = sum(
+                1 for executed in self.statement_list
+                if executed.split()[0] == statement.split()[0]
+            )
+
+        if (statement.split()[0], match_count) in self.fail_statement_list:
+            raise RuntimeError(f"{statement.split()[0]} failed")
+
+        if statement.startswith("PUT"):
+            file_path = statement.split()[1][len("file://"):]
+
+            with gzip.open(file_path, "rt") as open_file:
+                self.file_dict[os.path.basename(file_path)] = open_file.read()
+
+    def get_statement_list(self, statement_type):
+        return [
+            statement for statement in self.statement_list
+            if statement.split()[0] == statement_type
+        ]
+
+
+class SnowflakeLoaderTest(unittest.TestCase):
+    object_count = 95
+
+    def make_loader(self, connector, checkpoint=None, **kwargs):
+        loader_class = type("TestSnowflakeLoader", (load.SnowflakeLoader,), {
+            "table_name": "item",
+            "field_names": ["id", "double"],
+            "chunk_size": 10,
+            "copy_file_count": 3,
+            "upload_worker_count": 2,
+            **kwargs,
+        })
+
+        return loader_class(connector=connector, checkpoint=checkpoint)
+
+    def get_object_list(self, fail_id=None):
+
+        for object_id in range(self.object_count):
+
+            if object_id == fail_id:
+                raise ValueError("extract failed")
+
+            yield {"id": object_id, "double": object_id * 2}
+
+    def get_file_name_list(self, statement):
+        # File names are quoted in `files = (...)`
+        file_names = statement.split("files = (")[1].split(")")[0]
+        return file_names.replace("'", "").split(", ")
+
+    def get_put_file_path(self, statement):
+        return statement.split()[1][len("file://"):]
+
+    def get_removed_file_name_list(self, connector):
+        return [
+            statement.split("/")[-1]
+            for statement in connector.get_statement_list("remove")
+        ]
+
+    def testLoad(self):
+        connector = FakeSnowflakeConnector()
+        loader = self.make_loader(connector)
+        loader.load(self.get_object_list())
+
+        put_list = connector.get_statement_list("PUT")
+        copy_list = connector.get_statement_list("copy")
+        self.assertEqual(len(put_list), 10)
+        # Batches of 3 files, and the last file when the load finishes
+        self.assertEqual(
+            [len(self.get_file_name_list(statement)) for statement in copy_list],
+            [3, 3, 3, 1],
+        )
+        self.assertEqual(connector.get_statement_list("remove"), [])
+
+        # Every file which was put was copied, and deleted locally
+        copied_file_name_list = [
+            file_name
+            for statement in copy_list
+            for file_name in self.get_file_name_list(statement)
+        ]
+        self.assertEqual(sorted(copied_file_name_list), sorted(connector.file_dict))
+
+        for statement in put_list:
+            self.assertFalse(os.path.exists(self.get_put_file_path(statement)))
+
+        row_list = [
+            line
+            for file_name in copied_file_name_list
+            for line in connector.file_dict[file_name].splitlines()
+        ]
+        self.assertEqual(row_list, [f"{i},{i * 2}" for i in range(self.object_count)])
+
+    def testLoadData(self):
+        connector = FakeSnowflakeConnector()
+        loader = self.make_loader(connector)
+        loader.load_data(list(self.get_object_list())[:10])
+
+        # Outside of `load()`, each chunk is copied straight away
+        self.assertEqual(len(connector.get_statement_list("PUT")), 1)
+        self.assertEqual(len(connector.get_statement_list("copy")), 1)
+        self.assertEqual(loader.staged_file_list, [])
+
+        connector.connection = object()
+        self.assertIs(loader.connection, connector.connection)
+
+    def testPutFailure(self):
+        connector = FakeSnowflakeConnector([("PUT", 5)])
+        loader = self.make_loader(connector)
+
+        with self.assertRaisesRegex(RuntimeError, "PUT failed"):
+            loader.load(self.get_object_list())
+
+        # The first batch was copied, and the rest of the second batch, along
+        # with the failed file, was removed
+        copy_list = connector.get_statement_list("copy")
+        self.assertEqual(len(copy_list), 1)
+        self.assertEqual(len(self.get_removed_file_name_list(connector)), 3)
+
+        self.assertEqual(
+            set(self.get_file_name_list(copy_list[0]))
+            | set(self.get_removed_file_name_list(connector)),
+            {
+                os.path.basename(self.get_put_file_path(statement))
+                for statement in connector.get_statement_list("PUT")
+            },
+        )
+
+        for statement in connector.get_statement_list("PUT"):
+            self.assertFalse(os.path.exists(self.get_put_file_path(statement)))
+
+    def testCopyFailure(self):
+        connector = FakeSnowflakeConnector([("copy", 2)])
+        loader = self.make_loader(connector)
+
+        with self.assertRaisesRegex(RuntimeError, "copy failed"):
+            loader.load(self.get_object_list())
+
+        copy_list = connector.get_statement_list("copy")
+        self.assertEqual(
+            sorted(self.get_removed_file_name_list(connector)),
+            sorted(self.get_file_name_list(copy_list[1])),
+        )
+
+    def testExtractFailure(self):
+        connector = FakeSnowflakeConnector()
+        loader = self.make_loader(connector)
+
+        with self.assertRaisesRegex(ValueError, "extract failed"):
+            loader.load(self.get_object_list(fail_id=45))
+
+        # The 4th chunk was uploaded, but never copied
+        self.assertEqual(len(connector.get_statement_list("copy")), 1)
+        self.assertEqual(len(self.get_removed_file_name_list(connector)), 1)
+
+    def testRemoveFailure(self):
+        connector = FakeSnowflakeConnector([("copy", 1), ("remove", 1)])
+        loader = self.make_loader(connector)
+
+        # The failed removal is logged, rather than hiding the copy failure
+        with self.assertLogs("kbde.etl", level="ERROR"):
+
+            with self.assertRaisesRegex(RuntimeError, "copy failed"):
+                loader.load(self.get_object_list())
+
+        self.assertEqual(len(connector.get_statement_list("remove")), 3)
+
+    def testCheckpoint(self):
+        store = MemoryCheckpointStore()
+        job_checkpoint = checkpoint.Checkpoint("job", store)
+        connector = FakeSnowflakeConnector([("copy", 2)])
+        loader = self.make_loader(
+            connector,
+            checkpoint=job_checkpoint,
+            field_names=["id"],
+        )
+
+        with self.assertRaises(RuntimeError):
+            loader.load(RangeExtractor(checkpoint=job_checkpoint).extract())
+
+        # Only the first batch of 30 objects was copied, which covers page 1
+        self.assertEqual(store.get("job"), 1)
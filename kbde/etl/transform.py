@@ -1,28 +1,141 @@
+import time
 
 
 class Transformer:
+    # A `metrics.Metrics`, which records calls to `.transform_object()` under
+    # the `transform` stage, in batches of `metrics_row_batch_size`
+    metrics = None
+    metrics_row_batch_size = 1000
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics or self.metrics
 
     def transform(self, object_list):
+        if self.metrics is not None:
+            yield from self.get_measured_object_list(object_list)
+            return
         
         for obj in object_list:
             yield self.transform_object(obj)
 
+    def get_measured_object_list(self, object_list):
+        """
+        Takes an iterable of objects
+        Yields each transformed object, recording the time spent in
+        `.transform_object()`
+        """
+        perf_counter = time.perf_counter
+        seconds = 0.0
+        row_count = 0
+
+        try:
+
+            for obj in object_list:
+                start = perf_counter()
+                obj = self.transform_object(obj)
+                seconds += perf_counter() - start
+                row_count += 1
+
+                yield obj
+
+                if row_count == self.metrics_row_batch_size:
+                    self.metrics.record("transform", seconds, row_count)
+                    seconds = 0.0
+                    row_count = 0
+
+        finally:
+
+            if row_count:
+                self.metrics.record("transform", seconds, row_count)
+
+    def transform_batch(self, object_list):
+        """
+        Takes a list of objects
+        Returns a list of the transformed objects
+
+        Pipelines call this once per chunk. Override it to work on a whole
+        chunk at once, and to record their own metrics.
+        """
+        return list(self.transform(object_list))
+
     def transform_object(self, obj):
         raise NotImplementedError(
             f"{self.__class__} must implement .transform_object()"
         )
 
 
-class KeyMapTransformer(Transformer):
-    key_map = {}
+class KeyTransformer(Transformer):
+    """
+    Base class for transformers which rename the keys of each object
+
+    Objects in a feed usually share the same keys, so the new keys are
+    worked out once for each distinct sequence of keys, and reused.
+    """
+    key_cache_size = 1024
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.key_cache = {}
+
+    def transform_batch(self, object_list):
+
+        if type(self).transform_object is not KeyTransformer.transform_object:
+            # A subclass changes each object further, so go through it
+            return super().transform_batch(object_list)
+
+        start = time.perf_counter()
+        get_new_key_tuple = self.get_new_key_tuple
+
+        object_list = [
+            dict(zip(get_new_key_tuple(tuple(obj)), obj.values()))
+            for obj in object_list
+        ]
+
+        if self.metrics is not None:
+            self.metrics.record(
+                "transform",
+                time.perf_counter() - start,
+                len(object_list),
+            )
+
+        return object_list
 
     def transform_object(self, obj):
-        return {
-            self.key_map.get(key, key): value for key, value in obj.items()
-        }
+        return dict(zip(self.get_new_key_tuple(tuple(obj)), obj.values()))
+
+    def get_new_key_tuple(self, key_tuple):
+        """
+        Takes a tuple of keys
+        Returns a tuple of the new name for each key
+        """
+        new_key_tuple = self.key_cache.get(key_tuple)
 
+        if new_key_tuple is None:
 
-class KeyReplaceTransformer(Transformer):
+            if len(self.key_cache) >= self.key_cache_size:
+                # The objects don't share their keys, so don't let the cache
+                # grow without bound
+                self.key_cache.clear()
+
+            new_key_tuple = tuple(self.get_new_key(key) for key in key_tuple)
+            self.key_cache[key_tuple] = new_key_tuple
+
+        return new_key_tuple
+
+    def get_new_key(self, key):
+        raise NotImplementedError(
+            f"{self.__class__} must implement .get_new_key()"
+        )
+
+
+class KeyMapTransformer(KeyTransformer):
+    key_map = {}
+
+    def get_new_key(self, key):
+        return self.key_map.get(key, key)
+
+
+class KeyReplaceTransformer(KeyTransformer):
     old = None
     new = None
 
@@ -30,7 +143,5 @@ class KeyReplaceTransformer(Transformer):
         assert self.old is not None and self.new is not None
         super().__init__(*args, **kwargs)
 
-    def transform_object(self, obj):
-        return {
-            key.replace(self.old, self.new): value for key, value in obj.items()
-        }
+    def get_new_key(self, key):
+        return key.replace(self.old, self.new)
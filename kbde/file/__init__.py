@@ -1,4 +1,5 @@
 from .file_reader import FileReader
+from .line_index import LineIndex
 from .file_writer import FileWriter
 from .flat_file import FlatFile
 from .csv_file import CsvFile
@@ -0,0 +1,266 @@
+import json, os, random, sys, tempfile, time
+
+from .csv_file import CsvFile
+from .file_reader import FileReader
+from .flat_file import FlatFile
+from .line_index import LineIndex
+from .newline_json_writer import NewlineJsonWriter
+
+
+class Benchmark:
+    """
+    Measures the throughput of reading and writing synthetic files of about
+    `byte_count` bytes
+
+    Each case returns a list of result dicts, one per way of reading the
+    file.
+    """
+    case_list = [
+        "flat_file",
+        "csv_file",
+        "newline_json_write",
+        "line_index",
+    ]
+    # The number of records read at random by the line_index case
+    seek_count = 1000
+    # Approximate size of each line written by the newline_json_write case
+    line_byte_count = 110
+    batch_size = 1000
+
+    def __init__(self, byte_count, directory_path=None):
+        self.byte_count = byte_count
+        self.directory_path = directory_path
+
+    def run(self, case):
+        assert case in self.case_list, (
+            f"case must be one of {self.case_list}"
+        )
+
+        with tempfile.TemporaryDirectory(dir=self.directory_path) as directory_path:
+            return getattr(self, f"run_{case}")(directory_path)
+
+    def run_flat_file(self, directory_path):
+        file_path = os.path.join(directory_path, "data.txt")
+        self.write_file(file_path, "|", quote=False)
+
+        return [
+            self.time_lines("FlatFile.split", file_path, self.read_split),
+            self.time_lines(
+                "FlatFile.get",
+                file_path,
+                lambda file_path: self.read_get(FlatFile(file_path, "|")),
+            ),
+            self.time_lines(
+                "FlatFile.iter_batches",
+                file_path,
+                lambda file_path: self.read_batches(FlatFile(file_path, "|")),
+            ),
+        ]
+
+    def run_csv_file(self, directory_path):
+        file_path = os.path.join(directory_path, "data.csv")
+        self.write_file(file_path, ",", quote=True)
+
+        return [
+            self.time_lines(
+                "CsvFile.get",
+                file_path,
+                lambda file_path: self.read_get(CsvFile(file_path)),
+            ),
+            self.time_lines(
+                "CsvFile.iter_batches",
+                file_path,
+                lambda file_path: self.read_batches(CsvFile(file_path)),
+            ),
+        ]
+
+    def run_newline_json_write(self, directory_path):
+        line_count = self.byte_count // self.line_byte_count
+        line_dict_list = [
+            {
+                "id": line_number,
+                "name": f"name-{line_number}",
+                "email": f"user-{line_number}@example.com",
+                "price": line_number / 100,
+                "active": line_number % 2 == 0,
+            }
+            for line_number in range(line_count)
+        ]
+
+        def write_put_line(file_path, fast_json):
+            with NewlineJsonWriter(file_path, fast_json=fast_json) as writer:
+
+                for line_dict in line_dict_list:
+                    writer.put_line(line_dict)
+
+            return line_count
+
+        def write_put_many(file_path, fast_json):
+            with NewlineJsonWriter(file_path, fast_json=fast_json) as writer:
+                writer.put_many(line_dict_list)
+
+            return line_count
+
+        return [
+            self.time_lines(
+                name,
+                os.path.join(directory_path, f"{name}.ndjson"),
+                lambda file_path: write(file_path, fast_json),
+            )
+            for name, write, fast_json in [
+                ("NewlineJsonWriter.put_line", write_put_line, False),
+                ("NewlineJsonWriter.put_many", write_put_many, False),
+                ("NewlineJsonWriter.put_line.fast_json", write_put_line, True),
+                ("NewlineJsonWriter.put_many.fast_json", write_put_many, True),
+            ]
+        ]
+
+    def run_line_index(self, directory_path):
+        file_path = os.path.join(directory_path, "data.txt")
+        self.write_file(file_path, "|", quote=False)
+
+        def load_index(file_path):
+            return len(LineIndex(file_path))
+
+        # There is no sidecar yet, so the first index is built, and the
+        # second is loaded
+        result_list = [
+            self.time_lines("LineIndex.build", file_path, load_index),
+            self.time_lines("LineIndex.load", file_path, load_index),
+        ]
+
+        record_count = result_list[0]["line_count"] - 1
+        record_number_list = random.Random(0).sample(
+            range(record_count),
+            min(self.seek_count, record_count),
+        )
+
+        def read_scan(file_path):
+            # Reads up to each record from the start of the file, the way that
+            # records were found without an index, for comparison. Only a few
+            # records are read, since each read is slow.
+            for record_number in record_number_list[:3]:
+                flat_file = FlatFile(file_path, "|")
+                flat_file.get_many(record_number)
+                flat_file.get()
+
+            return len(record_number_list[:3])
+
+        def read_seek(file_path):
+            flat_file = FlatFile(file_path, "|")
+
+            for record_number in record_number_list:
+                flat_file.seek_record(record_number)
+                flat_file.get()
+
+            return len(record_number_list)
+
+        return result_list + [
+            self.time_lines("FlatFile.scan", file_path, read_scan),
+            self.time_lines("FlatFile.seek_record", file_path, read_seek),
+        ]
+
+    def write_file(self, file_path, delimiter, quote):
+        """
+        Writes a header, and then lines until the file is at least
+        `.byte_count` bytes
+        """
+        byte_count = 0
+        line_number = 0
+
+        with open(file_path, "w") as open_file:
+            header_line = delimiter.join(["id", "name", "email", "price", "note"]) + "\n"
+            open_file.write(header_line)
+            byte_count += len(header_line)
+
+            while byte_count < self.byte_count:
+                note = f"note {line_number}"
+
+                if quote:
+                    note = f'"{note}, with a comma"'
+
+                line = delimiter.join([
+                    str(line_number),
+                    f"name-{line_number}",
+                    f"user-{line_number}@example.com",
+                    str(line_number / 100),
+                    note,
+                ]) + "\n"
+                open_file.write(line)
+                byte_count += len(line)
+                line_number += 1
+
+    def read_split(self, file_path):
+        """
+        Reads lines the way that FlatFile used to, for comparison
+        """
+        file_reader = FileReader(file_path)
+        header_list = file_reader.get_line().split("|")
+        line_count = 0
+
+        while True:
+            line = file_reader.get_line()
+
+            if line is None:
+                return line_count
+
+            line_list = line.split("|")
+            line_dict = {}
+            index = 0
+            for column_name in header_list:
+                line_dict[column_name] = line_list[index]
+                index += 1
+
+            line_count += 1
+
+    def read_get(self, flat_file):
+        line_count = 0
+
+        while flat_file.get() is not None:
+            line_count += 1
+
+        return line_count
+
+    def read_batches(self, flat_file):
+        line_count = 0
+
+        for line_dict_list in flat_file.iter_batches(self.batch_size):
+            line_count += len(line_dict_list)
+
+        return line_count
+
+    def time_lines(self, name, file_path, read):
+        """
+        Takes a name, a file path, and a function which reads or writes the
+        file and returns the number of lines
+        Returns a result dict
+        """
+        start = time.perf_counter()
+        line_count = read(file_path)
+        seconds = time.perf_counter() - start
+        byte_count = os.path.getsize(file_path)
+
+        return {
+            "name": name,
+            "line_count": line_count,
+            "byte_count": byte_count,
+            "seconds": seconds,
+            "lines_per_second": line_count / seconds if seconds else None,
+            "bytes_per_second": byte_count / seconds if seconds else None,
+        }
+
+
+def run(case_list, byte_count_list, output=sys.stdout, **kwargs):
+    """
+    Runs each benchmark case for each file size
+    Writes each result to `output` as a line of JSON
+    """
+    for case in case_list:
+
+        for byte_count in byte_count_list:
+            benchmark = Benchmark(byte_count, **kwargs)
+
+            for result in benchmark.run(case):
+                result["case"] = case
+                output.write(json.dumps(result) + "\n")
+                output.flush()
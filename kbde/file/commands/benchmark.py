@@ -0,0 +1,30 @@
+from kbde.kbde_cli import command
+
+
+class Command(command.Command):
+
+    def add_arguments(self, parser):
+        from kbde.file import benchmark
+
+        parser.add_argument(
+            "case",
+            type=str,
+            nargs="+",
+            choices=benchmark.Benchmark.case_list,
+        )
+        parser.add_argument(
+            "--byte-count",
+            type=int,
+            nargs="+",
+            default=[10 ** 9],
+        )
+        parser.add_argument("--directory-path", type=str)
+
+    def handle(self, case, byte_count, directory_path):
+        from kbde.file import benchmark
+
+        benchmark.run(
+            case,
+            byte_count,
+            directory_path=directory_path,
+        )
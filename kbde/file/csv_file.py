@@ -1,5 +1,4 @@
-import csv
-from io import StringIO
+import csv, io
 from .flat_file import FlatFile
 
 
@@ -8,18 +7,29 @@ class CsvFile(FlatFile):
     Reads and writes csv files with a header
     Interfaces to caller with dictionaries
     """
+
     def __init__(self,file_path):
         super().__init__(file_path, ",")
 
+    def make_reader(self, open_file):
+        if type(self).make_list is not CsvFile.make_list:
+            # A subclass splits lines its own way
+            return super().make_reader(open_file)
+
+        # Quoted fields can contain commas and newlines, so parse the file as
+        # a whole, rather than line by line. Blank lines are read as empty
+        # lists, which are skipped.
+        return filter(None, csv.reader(open_file))
+
     def make_line(self,line_list):
-        string = StringIO.StringIO()
-        writer = csv.writer(string)
+        string = io.StringIO()
+        writer = csv.writer(string, lineterminator="")
         writer.writerow(line_list)
         line = string.getvalue()
         return line
 
     def make_list(self,line):
-        string = StringIO.StringIO(line)
+        string = io.StringIO(line)
         reader = csv.reader(string)
-        line_list = reader.next()
+        line_list = next(reader)
         return line_list
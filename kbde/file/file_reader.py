@@ -1,12 +1,24 @@
+from .line_index import LineIndex
+
+
 class FileReader:
     """
     Reads a file line by line without loading it into memory
+
+    Each line is a record. Records can also be read out of order, through a
+    `LineIndex` of the file, which is built the first time it is needed.
     """
+    # The number of lines before the first record
+    header_line_count = 0
 
     def __init__(self, file_path):
         self.file_path = file_path
         self.open_file = open(self.file_path, "r")
         self.get_line_count = 0
+        self.line_index = None
+
+    def close(self):
+        self.open_file.close()
 
     def get_line(self):
         line = self.open_file.readline()
@@ -15,3 +27,71 @@ class FileReader:
         line = line.strip()
         self.get_line_count += 1
         return line
+
+    def get_line_index(self):
+        # Rebuild the index if lines have been written to the file since it
+        # was built
+        if self.line_index is None or not self.line_index.is_current():
+            self.line_index = LineIndex(self.file_path)
+
+        return self.line_index
+
+    def get_record_count(self):
+        return max(len(self.get_line_index()) - self.header_line_count, 0)
+
+    def seek_record(self, record_number):
+        """
+        Takes a record number
+        Moves the reader to the start of that record, so that the next line
+        read is that record
+        """
+        if record_number < 0:
+            record_number += self.get_record_count()
+
+        if record_number < 0:
+            raise IndexError(f"record {record_number} is not in {self.file_path}")
+
+        # Offsets from the index are positions from the start of an undecoded
+        # line, which text files can seek to directly
+        self.open_file.seek(
+            self.get_line_index().get_offset(record_number + self.header_line_count)
+        )
+        self.get_line_count = record_number + self.header_line_count
+
+    def get_records(self, start=None, stop=None):
+        """
+        Takes a range of record numbers, which works like a list slice
+        Returns a list of those records, read through a memory map, without
+        moving the reader
+        """
+        start, stop, _ = slice(start, stop).indices(self.get_record_count())
+        data = self.get_line_index().read(
+            start + self.header_line_count,
+            max(start, stop) + self.header_line_count,
+        )
+
+        if not data:
+            return []
+
+        line_list = data.decode(self.open_file.encoding).split("\n")
+
+        if not line_list[-1]:
+            # The last line ended with a newline
+            line_list.pop()
+
+        return [line.strip() for line in line_list]
+
+    def split_records(self, part_count):
+        """
+        Takes a number of parts
+        Returns a list of up to `part_count` ranges of record numbers, with
+        about the same number of bytes in each, for `get_records()` to read
+        in separate workers
+        """
+        return [
+            (start - self.header_line_count, stop - self.header_line_count)
+            for start, stop in self.get_line_index().split(
+                part_count,
+                start=self.header_line_count,
+            )
+        ]
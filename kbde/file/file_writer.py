@@ -1,10 +1,54 @@
+import itertools
+
+
 class FileWriter:
-    def __init__(self, file_path):
+    """
+    Writes lines to a file
+
+    Writes are buffered, in a buffer of `buffer_size` bytes. Call `flush()`
+    to write the buffer to the file, and `close()` when finished, or use the
+    writer as a context manager.
+    """
+    buffer_size = 2 ** 16
+    # Number of lines which `put_many()` joins into each write
+    batch_line_count = 1000
+
+    def __init__(self, file_path, buffer_size=None):
         self.file_path = file_path
-        self.open_file = open(self.file_path, "a")
+        self.buffer_size = buffer_size or self.buffer_size
+        self.open_file = open(self.file_path, "a", buffering=self.buffer_size)
         self.write_line_count = 0
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
     def put_line(self,line):
         line = line + "\n"
         self.open_file.write(line)
         self.write_line_count += 1
+
+    def put_many(self, line_list):
+        """
+        Takes an iterable of lines
+        Writes them in batches, rather than one at a time
+        """
+        line_iterator = iter(line_list)
+
+        while True:
+            batch = list(itertools.islice(line_iterator, self.batch_line_count))
+
+            if not batch:
+                return
+
+            batch.append("")
+            self.open_file.write("\n".join(batch))
+            self.write_line_count += len(batch) - 1
+
+    def flush(self):
+        self.open_file.flush()
+
+    def close(self):
+        self.open_file.close()
@@ -1,3 +1,5 @@
+import itertools
+
 from .file_reader import FileReader
 from .file_writer import FileWriter
 
@@ -6,45 +8,108 @@ class FlatFile:
     """
     Reads and writes flat files with a header
     Interfaces to caller with dictionaries
+
+    Lines are read by a single reader, which stays bound to the open file.
+    Plain flat files have no quoting, so fields can't contain the delimiter.
+    Blank lines are skipped.
     """
 
     def __init__(self,file_path,delimiter):
         self.file_writer = FileWriter(file_path)
         self.file_reader = FileReader(file_path)
+        # Records are numbered from the line after the header
+        self.file_reader.header_line_count = 1
         self.delimiter = delimiter
+        self.reader = self.make_reader(self.file_reader.open_file)
+        self.header_list = None
         self.header_list = self.get_header_list()
 
     def get_header_list(self):
         """
         In the case where we are reading a file, derive the header_list from the first line of the file, where the header information is kept
         """
-        if self.file_reader.get_line_count > 0:
-            raise Exception("file not at first line")
+        if self.header_list is not None:
+            raise self.FileException("file not at first line")
+
+        return next(self.reader, None)
+
+    def get(self):
+        if self.header_list is None:
+            raise self.FileException("no header line found")
+
+        line_list = next(self.reader, None)
 
-        header_line = self.file_reader.get_line()
-        if not header_line:
+        if line_list is None:
             return None
 
-        header_list = self.make_list(header_line)
+        if len(line_list) < len(self.header_list):
+            raise self.get_short_line_exception()
 
-        return header_list
+        return dict(zip(self.header_list, line_list))
 
-    def get(self):
+    def get_many(self, count):
+        """
+        Takes a number of lines
+        Returns a list of up to that many line dicts, which is empty at the
+        end of the file
+        """
         if self.header_list is None:
             raise self.FileException("no header line found")
 
-        line = self.file_reader.get_line()
-        if line is None:
-            return None
-        line_list = self.make_list(line)
+        return self.make_line_dict_list(itertools.islice(self.reader, count))
 
-        line_dict = {}
-        index = 0
-        for column_name in self.header_list:
-            line_dict[column_name] = line_list[index]
-            index += 1
+    def iter_batches(self, count):
+        """
+        Takes a number of lines
+        Yields lists of up to that many line dicts, until the end of the
+        file
+        """
+        while True:
+            line_dict_list = self.get_many(count)
+
+            if not line_dict_list:
+                return
+
+            yield line_dict_list
+
+    def seek_record(self, record_number):
+        """
+        Takes a record number
+        Moves the reader to that record, through the file's `LineIndex`
+
+        Records are counted by line, so files with blank lines, or csv files
+        with newlines in quoted fields, can't be read out of order.
+        """
+        if self.header_list is None:
+            raise self.FileException("no header line found")
 
-        return line_dict
+        # Index lines which have been put, but are still buffered
+        self.file_writer.flush()
+        self.file_reader.seek_record(record_number)
+
+    def get_records(self, start=None, stop=None):
+        """
+        Takes a range of record numbers, which works like a list slice
+        Returns a list of line dicts for those records, read through a
+        memory map, without moving the reader
+        """
+        if self.header_list is None:
+            raise self.FileException("no header line found")
+
+        self.file_writer.flush()
+
+        return self.make_line_dict_list(
+            self.make_reader(self.file_reader.get_records(start, stop))
+        )
+
+    def split_records(self, part_count):
+        """
+        Takes a number of parts
+        Returns a list of up to `part_count` ranges of record numbers, for
+        `get_records()` to read in separate workers
+        """
+        self.file_writer.flush()
+        return self.file_reader.split_records(part_count)
 
     def put(self,line_dict):
         if self.header_list is None:
@@ -62,6 +127,44 @@ class FlatFile:
         line = self.make_line(line_list)
         self.file_writer.put_line(line)
 
+    def get_short_line_exception(self):
+        return self.FileException(
+            f"a line has fewer fields than the header, {self.header_list}"
+        )
+
+    def make_line_dict_list(self, line_list_iter):
+        """
+        Takes an iterable of lists of fields
+        Returns a list of dicts of them, keyed by the header
+        Raises FileException if any line has fewer fields than the header
+        """
+        header_list = self.header_list
+        line_list_list = list(line_list_iter)
+
+        if line_list_list and min(map(len, line_list_list)) < len(header_list):
+            raise self.get_short_line_exception()
+
+        # Zip and build the dicts without calling back into Python for each
+        # line
+        return list(map(
+            dict,
+            map(zip, itertools.repeat(header_list), line_list_list),
+        ))
+
+    def make_reader(self, open_file):
+        """
+        Takes an open file
+        Returns an iterator of the list of fields on each line
+
+        Lines are split with `.make_list()`, if a subclass overrides it.
+        """
+        line_list = filter(None, map(str.strip, open_file))
+
+        if type(self).make_list is not FlatFile.make_list:
+            return map(self.make_list, line_list)
+
+        return map(str.split, line_list, itertools.repeat(self.delimiter))
+
     def make_list(self,line):
         line_list = line.split(self.delimiter)
         return line_list
@@ -0,0 +1,222 @@
+import array, bisect, itertools, mmap, os, struct, sys, tempfile
+
+
+class LineIndex:
+    """
+    Holds the byte offset of the start of each line in a file, so that any
+    line can be read without reading the lines before it
+
+    The index is built in one pass over the file, and saved next to it, in a
+    sidecar file named with `.suffix`. Later instances load the sidecar
+    instead, unless the file's size or modification time has changed since
+    it was built. Lines end with "\\n", and the last line doesn't need to.
+
+    Line numbers and ranges work like list indexes and slices, so negative
+    numbers count back from the end of the file.
+    """
+    suffix = ".lineindex"
+    # Set to False to build the index in memory only, such as when the
+    # file's directory is read only
+    save = True
+    # Magic bytes and format version, followed by the file's size and
+    # modification time when it was indexed
+    header_struct = struct.Struct("<8sqq")
+    magic = b"kbdeli01"
+
+    def __init__(self, file_path, save=None):
+        self.file_path = file_path
+        self.save = self.save if save is None else save
+        self.offset_array = self.load()
+
+        if self.offset_array is None:
+            self.offset_array = self.build()
+
+            if self.save:
+                self.write()
+
+    def __len__(self):
+        return len(self.offset_array) - 1
+
+    def get_offset(self, line_number):
+        """
+        Takes a line number
+        Returns the byte offset of the start of that line, or the size of the
+        file if the line number is the number of lines
+        """
+        if line_number < 0:
+            line_number += len(self)
+
+        if not 0 <= line_number <= len(self):
+            raise IndexError(f"line {line_number} is not in {self.file_path}")
+
+        return self.offset_array[line_number]
+
+    def get_line_range(self, start=None, stop=None):
+        start, stop, _ = slice(start, stop).indices(len(self))
+        return start, max(start, stop)
+
+    def get_byte_range(self, start=None, stop=None):
+        """
+        Takes a range of line numbers
+        Returns the range of bytes which holds those lines
+        """
+        start, stop = self.get_line_range(start, stop)
+        return self.offset_array[start], self.offset_array[stop]
+
+    def read(self, start=None, stop=None):
+        """
+        Takes a range of line numbers
+        Returns the bytes of those lines, read through a memory map
+        """
+        start_byte, stop_byte = self.get_byte_range(start, stop)
+
+        if start_byte == stop_byte:
+            # Empty files can't be mapped
+            return b""
+
+        with open(self.file_path, "rb") as open_file:
+
+            with mmap.mmap(open_file.fileno(), 0, access=mmap.ACCESS_READ) as file_map:
+                return file_map[start_byte:stop_byte]
+
+    def split(self, part_count, start=None, stop=None):
+        """
+        Takes a number of parts, and an optional range of line numbers
+        Returns a list of up to `part_count` line ranges, which cover the
+        range with about the same number of bytes in each, so that they can
+        be read by separate workers
+        """
+        assert part_count > 0, "part_count must be greater than 0"
+
+        start, stop = self.get_line_range(start, stop)
+        start_byte = self.offset_array[start]
+        byte_count = self.offset_array[stop] - start_byte
+        range_list = []
+
+        for part_number in range(1, part_count + 1):
+            # The first line which starts at or after this part's share of
+            # the bytes
+            part_stop = bisect.bisect_left(
+                self.offset_array,
+                start_byte + byte_count * part_number // part_count,
+                start,
+                stop,
+            )
+
+            if part_stop > start:
+                range_list.append((start, part_stop))
+                start = part_stop
+
+        return range_list
+
+    def build(self):
+        """
+        Reads the file, and returns an array of the offset of each line,
+        followed by the size of the file
+        """
+        self.file_stat = self.get_file_stat()
+        offset_array = array.array("q", [0])
+
+        with open(self.file_path, "rb") as open_file:
+            # Binary files split lines on b"\n" only, so the running total of
+            # line lengths is the offset of each line
+            offset_array.extend(itertools.accumulate(map(len, open_file)))
+
+        return offset_array
+
+    def load(self):
+        """
+        Returns the offsets from the sidecar file, or None if there isn't
+        one, or it is out of date
+        """
+        self.file_stat = self.get_file_stat()
+
+        try:
+            open_file = open(self.get_index_path(), "rb")
+        except FileNotFoundError:
+            return None
+
+        with open_file:
+            header = open_file.read(self.header_struct.size)
+
+            if len(header) < self.header_struct.size:
+                return None
+
+            magic, *file_stat = self.header_struct.unpack(header)
+
+            if magic != self.magic or tuple(file_stat) != self.file_stat:
+                return None
+
+            data = open_file.read()
+
+        if len(data) % 8:
+            return None
+
+        offset_array = array.array("q")
+        offset_array.frombytes(data)
+
+        if sys.byteorder != "little":
+            offset_array.byteswap()
+
+        # The last offset is the end of the file
+        if not offset_array or offset_array[-1] != self.file_stat[0]:
+            return None
+
+        return offset_array
+
+    def write(self):
+        """
+        Writes the offsets to the sidecar file, through a temporary file, so
+        that a crash never leaves a partly written index
+
+        If the sidecar can't be written, such as when the file's directory
+        is read only, the index is only kept in memory.
+        """
+        offset_array = self.offset_array
+
+        if sys.byteorder != "little":
+            offset_array = array.array("q", offset_array)
+            offset_array.byteswap()
+
+        index_path = self.get_index_path()
+        temp_path = None
+
+        try:
+
+            with tempfile.NamedTemporaryFile(
+                "wb",
+                dir=os.path.dirname(index_path) or ".",
+                prefix=f".{os.path.basename(index_path)}.",
+                delete=False,
+            ) as temp:
+                temp_path = temp.name
+                temp.write(self.header_struct.pack(self.magic, *self.file_stat))
+                offset_array.tofile(temp)
+
+            os.replace(temp_path, index_path)
+
+        except OSError:
+
+            if temp_path is not None:
+
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+
+    def is_current(self):
+        """
+        Returns True if the file hasn't changed size or been modified since
+        it was indexed
+        """
+        try:
+            return self.get_file_stat() == self.file_stat
+        except FileNotFoundError:
+            return False
+
+    def get_file_stat(self):
+        file_stat = os.stat(self.file_path)
+        return file_stat.st_size, file_stat.st_mtime_ns
+
+    def get_index_path(self):
+        return self.file_path + self.suffix
@@ -1,14 +1,31 @@
 import json
+from kbde.json import backend
 from .file_reader import FileReader
 from .file_writer import FileWriter
 
 
 class NewlineJson:
-    def __init__(self,file_path):
+    """
+    Reads and writes newline-delimited JSON
+
+    Lines are written with `json.dumps()`, unless `fast_json` is set, as in
+    `NewlineJsonWriter`. Call `close()` when finished, or use it as a
+    context manager.
+    """
+    fast_json = False
+
+    def __init__(self,file_path,fast_json=None):
         self.file_path = file_path
         self.file_writer = FileWriter(file_path)
         self.file_reader = FileReader(file_path)
-        
+        self.fast_json = self.fast_json if fast_json is None else fast_json
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
     def get(self):
         line = self.file_reader.get_line()
         if line is None:
@@ -17,5 +34,23 @@ class NewlineJson:
         return line_dict
 
     def put(self,line_dict):
-        line = json.dumps(line_dict)
+        line = self.get_json_dumps()(line_dict)
         self.file_writer.put_line(line)
+
+    def put_many(self, line_dict_list):
+        self.file_writer.put_many(map(self.get_json_dumps(), line_dict_list))
+
+    def flush(self):
+        self.file_writer.flush()
+
+    def close(self):
+        try:
+            self.file_writer.close()
+        finally:
+            self.file_reader.close()
+
+    def get_json_dumps(self):
+        if self.fast_json:
+            return backend.dumps
+
+        return json.dumps
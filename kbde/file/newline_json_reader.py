@@ -8,3 +8,9 @@ class NewlineJsonReader(FileReader):
         if line is None:
             return None
         return json.loads(line)
+
+    def get_records(self, start=None, stop=None):
+        return [
+            json.loads(line)
+            for line in FileReader.get_records(self, start, stop)
+        ]
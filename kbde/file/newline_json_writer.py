@@ -1,8 +1,33 @@
-from .file_writer import FileWriter
 import json
+from kbde.json import backend
+
+from .file_writer import FileWriter
 
 
 class NewlineJsonWriter(FileWriter):
+    """
+    Writes each piece of data as a line of JSON
+
+    Lines are written with `json.dumps()`. Set `fast_json` to write them with
+    the fastest JSON library which is installed instead, which writes
+    compact lines, and writes NaN and infinity as null. See
+    `kbde.json.backend`.
+    """
+    fast_json = False
+
+    def __init__(self, file_path, buffer_size=None, fast_json=None):
+        super().__init__(file_path, buffer_size=buffer_size)
+        self.fast_json = self.fast_json if fast_json is None else fast_json
+
     def put_line(self,data):
-        json_data = json.dumps(data)
+        json_data = self.get_json_dumps()(data)
         FileWriter.put_line(self,json_data)
+
+    def put_many(self, data_list):
+        super().put_many(map(self.get_json_dumps(), data_list))
+
+    def get_json_dumps(self):
+        if self.fast_json:
+            return backend.dumps
+
+        return json.dumps
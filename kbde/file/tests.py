@@ -0,0 +1,384 @@
+import json, os, shutil, tempfile, unittest
+from unittest import mock
+
+from .csv_file import CsvFile
+from .file_reader import FileReader
+from .file_writer import FileWriter
+from .flat_file import FlatFile
+from .line_index import LineIndex
+from .newline_json import NewlineJson
+from .newline_json_writer import NewlineJsonWriter
+
+
+class LineIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "lines.txt")
+        self.write_file("zero\none\n\nthree\nfour")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_file(self, data, mode="w"):
+        with open(self.file_path, mode) as open_file:
+            open_file.write(data)
+
+    def testIndex(self):
+        line_index = LineIndex(self.file_path)
+
+        # The last line doesn't need to end with a newline
+        self.assertEqual(len(line_index), 5)
+        self.assertEqual(line_index.get_offset(0), 0)
+        self.assertEqual(line_index.get_offset(3), 10)
+        self.assertEqual(line_index.get_offset(-1), 16)
+        self.assertEqual(line_index.get_offset(5), 20)
+
+        with self.assertRaises(IndexError):
+            line_index.get_offset(6)
+
+        self.assertEqual(line_index.read(1, 4), b"one\n\nthree\n")
+        self.assertEqual(line_index.read(-2), b"three\nfour")
+        self.assertEqual(line_index.read(4, 1), b"")
+
+    def testSplit(self):
+        line_index = LineIndex(self.file_path)
+
+        for part_count in range(1, 8):
+            range_list = line_index.split(part_count)
+
+            # The parts cover every line, in order, without overlapping
+            self.assertLessEqual(len(range_list), part_count)
+            self.assertEqual(range_list[0][0], 0)
+            self.assertEqual(range_list[-1][1], 5)
+
+            for (_, stop), (start, _) in zip(range_list, range_list[1:]):
+                self.assertEqual(stop, start)
+
+        self.assertEqual(line_index.split(2, start=1, stop=3), [(1, 2), (2, 3)])
+
+    def testSidecar(self):
+        LineIndex(self.file_path)
+        self.assertTrue(os.path.exists(self.file_path + LineIndex.suffix))
+
+        # A later instance loads the sidecar, rather than reading the file
+        with mock.patch.object(LineIndex, "build") as build:
+            self.assertEqual(len(LineIndex(self.file_path)), 5)
+
+        build.assert_not_called()
+
+        # Changing the file makes the sidecar out of date
+        self.write_file("\nfive\n", mode="a")
+        line_index = LineIndex(self.file_path)
+        self.assertEqual(line_index.read(-1), b"five\n")
+        self.assertTrue(line_index.is_current())
+
+        os.remove(self.file_path + LineIndex.suffix)
+        LineIndex(self.file_path, save=False)
+        self.assertFalse(os.path.exists(self.file_path + LineIndex.suffix))
+
+    def testUnwritableSidecar(self):
+
+        with mock.patch("tempfile.NamedTemporaryFile", side_effect=PermissionError):
+            line_index = LineIndex(self.file_path)
+
+        # The index is kept in memory
+        self.assertEqual(line_index.read(1, 2), b"one\n")
+        self.assertEqual(os.listdir(self.directory.name), ["lines.txt"])
+
+        with mock.patch("os.replace", side_effect=PermissionError):
+            line_index = LineIndex(self.file_path)
+
+        # The temporary file is cleaned up
+        self.assertEqual(len(line_index), 5)
+        self.assertEqual(os.listdir(self.directory.name), ["lines.txt"])
+
+    def testEmptyFile(self):
+        self.write_file("")
+        line_index = LineIndex(self.file_path)
+
+        self.assertEqual(len(line_index), 0)
+        self.assertEqual(line_index.read(), b"")
+        self.assertEqual(line_index.split(3), [])
+
+
+class FileReaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "records.txt")
+
+        with open(self.file_path, "w") as open_file:
+            open_file.write("header\n" + "".join(f"record {i}\n" for i in range(10)))
+
+        self.reader = FileReader(self.file_path)
+        self.reader.header_line_count = 1
+
+    def tearDown(self):
+        self.reader.open_file.close()
+        self.directory.cleanup()
+
+    def testSeekRecord(self):
+        self.reader.seek_record(3)
+        self.assertEqual(self.reader.get_line(), "record 3")
+        self.assertEqual(self.reader.get_line(), "record 4")
+
+        self.reader.seek_record(-1)
+        self.assertEqual(self.reader.get_line(), "record 9")
+        self.assertIsNone(self.reader.get_line())
+
+        with self.assertRaises(IndexError):
+            self.reader.seek_record(-11)
+
+    def testGetRecords(self):
+        self.assertEqual(self.reader.get_record_count(), 10)
+        self.assertEqual(self.reader.get_records(2, 4), ["record 2", "record 3"])
+        self.assertEqual(self.reader.get_records(-1), ["record 9"])
+        self.assertEqual(self.reader.get_records(5, 2), [])
+        self.assertEqual(len(self.reader.get_records()), 10)
+
+        # The reader isn't moved
+        self.assertEqual(self.reader.get_line(), "header")
+
+    def testSplitRecords(self):
+        range_list = self.reader.split_records(3)
+
+        self.assertEqual(
+            [
+                record
+                for start, stop in range_list
+                for record in self.reader.get_records(start, stop)
+            ],
+            [f"record {i}" for i in range(10)],
+        )
+
+    def testAppendedRecords(self):
+        self.assertEqual(self.reader.get_record_count(), 10)
+
+        with open(self.file_path, "a") as open_file:
+            open_file.write("record 10\n")
+
+        # The index is rebuilt once the file has changed
+        self.assertEqual(self.reader.get_record_count(), 11)
+        self.assertEqual(self.reader.get_records(-1), ["record 10"])
+
+
+class FlatFileTest(unittest.TestCase):
+    record_list = [
+        {"name": "kurtis", "age": "26", "title": "CEO"},
+        {"name": "dave", "age": "23", "title": "Scumbag"},
+        {"name": "ryan", "age": "12", "title": "Intern"},
+        {"name": "Tyler", "age": "18", "title": "barback"},
+    ]
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        # Work on a copy, so that index sidecars aren't written next to the
+        # original
+        self.file_path = os.path.join(self.directory.name, "flat.txt")
+        shutil.copy(
+            os.path.join(
+                os.path.dirname(__file__),
+                "test_pipe_delimited_flat_file.txt",
+            ),
+            self.file_path,
+        )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_flat_file(self, flat_file_class=FlatFile, file_path=None):
+        if issubclass(flat_file_class, CsvFile):
+            flat_file = flat_file_class(file_path or self.file_path)
+        else:
+            flat_file = flat_file_class(file_path or self.file_path, "|")
+
+        self.addCleanup(flat_file.file_reader.open_file.close)
+        self.addCleanup(flat_file.file_writer.close)
+        return flat_file
+
+    def write_file(self, data):
+        with open(self.file_path, "w") as open_file:
+            open_file.write(data)
+
+    def testGet(self):
+        flat_file = self.make_flat_file()
+        self.assertEqual(flat_file.header_list, ["name", "age", "title"])
+        self.assertEqual(
+            [flat_file.get() for _ in range(5)],
+            self.record_list + [None],
+        )
+
+    def testGetMany(self):
+        flat_file = self.make_flat_file()
+        self.assertEqual(flat_file.get(), self.record_list[0])
+        self.assertEqual(flat_file.get_many(2), self.record_list[1:3])
+        self.assertEqual(flat_file.get_many(2), self.record_list[3:])
+        self.assertEqual(flat_file.get_many(2), [])
+
+        flat_file = self.make_flat_file()
+        self.assertEqual(
+            list(flat_file.iter_batches(3)),
+            [self.record_list[:3], self.record_list[3:]],
+        )
+
+    def testRecords(self):
+        flat_file = self.make_flat_file()
+        self.assertEqual(flat_file.get_records(1, 3), self.record_list[1:3])
+
+        flat_file.seek_record(2)
+        self.assertEqual(flat_file.get(), self.record_list[2])
+
+    def testShortLine(self):
+        self.write_file("a|b|c\n1|2|3\n\n4|5\n")
+        flat_file = self.make_flat_file()
+
+        # Blank lines are skipped
+        self.assertEqual(flat_file.get(), {"a": "1", "b": "2", "c": "3"})
+
+        with self.assertRaises(FlatFile.FileException):
+            flat_file.get()
+
+        flat_file = self.make_flat_file()
+
+        with self.assertRaises(FlatFile.FileException):
+            flat_file.get_many(5)
+
+        flat_file = self.make_flat_file()
+
+        with self.assertRaises(FlatFile.FileException):
+            list(flat_file.iter_batches(1))
+
+    def testEmptyFile(self):
+        self.write_file("")
+        flat_file = self.make_flat_file()
+
+        with self.assertRaises(FlatFile.FileException):
+            flat_file.get()
+
+    def testMakeList(self):
+
+        class PaddedFlatFile(FlatFile):
+
+            def make_list(self, line):
+                return [field.strip() for field in super().make_list(line)]
+
+        self.write_file("a | b\n 1 |2 \n")
+
+        # Lines are split by an overridden `.make_list()`
+        flat_file = self.make_flat_file(PaddedFlatFile)
+        self.assertEqual(flat_file.header_list, ["a", "b"])
+        self.assertEqual(flat_file.get(), {"a": "1", "b": "2"})
+        self.assertEqual(flat_file.get_records(), [{"a": "1", "b": "2"}])
+
+    def testCsvFile(self):
+        self.write_file('a,b\n"1,2","x\ny"\n3,4\n')
+        csv_file = self.make_flat_file(CsvFile)
+
+        # Quoted fields can hold commas and newlines
+        self.assertEqual(
+            csv_file.get_many(5),
+            [{"a": "1,2", "b": "x\ny"}, {"a": "3", "b": "4"}],
+        )
+
+    def testPutThenGetRecords(self):
+        flat_file = self.make_flat_file(
+            file_path=os.path.join(self.directory.name, "new.txt"),
+        )
+        flat_file.put({"name": "kurtis", "age": 26})
+        self.assertEqual(flat_file.get_records(), [{"age": "26", "name": "kurtis"}])
+
+        # Records which are put after the file was indexed are read too
+        flat_file.put({"name": "dave", "age": 23})
+        self.assertEqual(flat_file.get_records(-1), [{"age": "23", "name": "dave"}])
+        self.assertEqual(flat_file.split_records(1), [(0, 2)])
+
+
+class FileWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "lines.txt")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def read_file(self):
+        with open(self.file_path) as open_file:
+            return open_file.read()
+
+    def testPutMany(self):
+
+        class CountingWriter(FileWriter):
+            batch_line_count = 3
+
+        with CountingWriter(self.file_path) as writer:
+            writer.open_file = mock.Mock(wraps=writer.open_file)
+            writer.put_line("first")
+            writer.put_many(f"line {i}" for i in range(7))
+            writer.put_many([])
+            write_list = [call.args[0] for call in writer.open_file.write.call_args_list]
+
+        # Lines are joined into one write per batch
+        self.assertEqual(
+            write_list,
+            [
+                "first\n",
+                "line 0\nline 1\nline 2\n",
+                "line 3\nline 4\nline 5\n",
+                "line 6\n",
+            ],
+        )
+        self.assertEqual(writer.write_line_count, 8)
+        self.assertEqual(
+            self.read_file(),
+            "first\n" + "".join(f"line {i}\n" for i in range(7)),
+        )
+
+
+class NewlineJsonTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "data.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def read_file(self):
+        with open(self.file_path) as open_file:
+            return open_file.read()
+
+    def testReadWrite(self):
+        data_list = [{"a": 1, "b": "é"}, {"a": 2.5, "b": None}]
+
+        with NewlineJson(self.file_path) as newline_json:
+            newline_json.put(data_list[0])
+            newline_json.put_many(data_list[1:])
+            newline_json.flush()
+
+            self.assertEqual(
+                [newline_json.get() for _ in range(3)],
+                data_list + [None],
+            )
+
+        self.assertTrue(newline_json.file_writer.open_file.closed)
+        self.assertTrue(newline_json.file_reader.open_file.closed)
+
+        # Lines are written with `json.dumps()` by default
+        self.assertEqual(
+            self.read_file(),
+            "".join(json.dumps(data) + "\n" for data in data_list),
+        )
+
+    def testFastJson(self):
+        data_list = [{"a": 1, "b": "é", "c": float("nan")}]
+
+        with NewlineJson(self.file_path, fast_json=True) as newline_json:
+            newline_json.put_many(data_list)
+
+        with NewlineJsonWriter(self.file_path, fast_json=True) as writer:
+            writer.put_line(data_list[0])
+
+        self.assertEqual(self.read_file(), '{"a":1,"b":"é","c":null}\n' * 2)
+        self.assertEqual(writer.write_line_count, 1)
@@ -1 +1,2 @@
 from .encoder import Encoder
+from .stream import ArrayReader
@@ -0,0 +1,111 @@
+"""
+Serializes JSON with the fastest library which is installed
+
+`orjson` is used if it is installed, then `ujson`, and then the standard
+library's `json`. Output is the same whichever library is used:
+- it is compact, and non-ASCII characters are written as they are, rather
+  than escaped
+- NaN and infinity, which aren't valid JSON, are written as `null`, which
+  is what `orjson` does
+- other values are accepted if `json` accepts them, so datetimes and
+  objects of unknown types raise `TypeError`
+
+This differs from `json.dumps()` with its default arguments, so callers
+which write JSON should use `dumps()` only when asked to.
+
+Some floats are formatted differently, such as `1e100` and `1e+100`, which
+read back as the same value. A few types are also handled differently.
+`orjson` writes `uuid.UUID` values and plain `enum.Enum` members, and
+`ujson` calls a `toDict()` or `__json__()` method if an object has one,
+where `json` would raise.
+"""
+import json, math
+
+
+def dumps_json(obj):
+    try:
+        return json.dumps(
+            obj,
+            separators=(",", ":"),
+            ensure_ascii=False,
+            allow_nan=False,
+        )
+    except ValueError as e:
+
+        if not str(e).startswith("Out of range float"):
+            raise
+
+        return dumps_json(replace_non_finite(obj))
+
+
+def replace_non_finite(obj):
+    """
+    Takes a value
+    Returns a copy of it with NaN and infinite floats replaced by None
+    """
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+
+    if isinstance(obj, dict):
+        return {key: replace_non_finite(value) for key, value in obj.items()}
+
+    if isinstance(obj, (list, tuple)):
+        return [replace_non_finite(value) for value in obj]
+
+    return obj
+
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+if orjson is not None:
+    # Datetimes, dataclasses, and subclasses of builtin types raise
+    # TypeError, and are passed to `json`, which handles them its own way
+    orjson_option = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+        | orjson.OPT_PASSTHROUGH_SUBCLASS
+    )
+
+
+def dumps_orjson(obj):
+    try:
+        return orjson.dumps(obj, option=orjson_option).decode()
+    except TypeError:
+        return dumps_json(obj)
+
+
+def dumps_ujson(obj):
+    try:
+        return ujson.dumps(
+            obj,
+            ensure_ascii=False,
+            escape_forward_slashes=False,
+            reject_bytes=True,
+            allow_nan=False,
+        )
+    except (TypeError, OverflowError):
+        # Includes NaN and infinity, which ujson rejects
+        return dumps_json(obj)
+
+
+if orjson is not None:
+    backend_name = "orjson"
+    dumps = dumps_orjson
+
+elif ujson is not None:
+    backend_name = "ujson"
+    dumps = dumps_ujson
+
+else:
+    backend_name = "json"
+    dumps = dumps_json
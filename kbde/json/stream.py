@@ -0,0 +1,200 @@
+import json, re
+
+
+class ArrayReader:
+    """
+    Reads the elements of a JSON array from a text file, one at a time
+
+    Only one element, plus a read buffer, is held in memory at once. The
+    array can be nested within objects, by giving the `path` of keys which
+    lead to it. Values under other keys are parsed and discarded, so they
+    must fit in memory.
+
+    Elements which are larger than `max_value_size` characters raise
+    `ValueError`, so that invalid JSON which can't be told apart from a
+    value that is still being read doesn't buffer the rest of the file.
+    """
+    read_size = 65536
+    max_value_size = 2 ** 26
+    # Errors further than this from the end of the buffer can't have been
+    # caused by cutting off a value, such as a `\uXXXX` escape pair
+    truncation_window = 12
+    whitespace_pattern = re.compile(r"[ \t\n\r]*")
+    number_pattern = re.compile(r"[0-9.eE+\-]*")
+
+    def __init__(self, open_file, path=(), read_size=None):
+        self.open_file = open_file
+        self.path = list(path)
+        self.read_size = read_size or self.read_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+        self.is_finished = False
+
+    def __iter__(self):
+        for key in self.path:
+            self.enter_key(key)
+
+        self.expect("[")
+
+        if self.peek() == "]":
+            self.position += 1
+            return
+
+        while True:
+            yield self.decode_value()
+
+            character = self.next_character()
+
+            if character == "]":
+                return
+
+            if character != ",":
+                raise self.get_error(f"expected `,` or `]`, got `{character}`")
+
+    def enter_key(self, key):
+        """
+        Takes a key
+        Moves the reader to the start of the value at that key, within the
+        object at the current position
+        """
+        self.expect("{")
+
+        if self.peek() == "}":
+            raise self.get_error(f"key `{key}` not found")
+
+        while True:
+            object_key = self.decode_value()
+            self.expect(":")
+
+            if object_key == key:
+                return
+
+            # Skip this value
+            self.decode_value()
+
+            character = self.next_character()
+
+            if character == "}":
+                raise self.get_error(f"key `{key}` not found")
+
+            if character != ",":
+                raise self.get_error(f"expected `,` or `}}`, got `{character}`")
+
+    def decode_value(self):
+        self.skip_whitespace()
+        read_size = self.read_size
+
+        while True:
+
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError as e:
+
+                if not self.is_truncation_error(e):
+                    raise self.get_error(f"invalid JSON value, {e.msg}")
+
+                value, end = None, None
+
+            # A number which runs to the end of the buffer may have been cut
+            # off, so read more and decode it again
+            if end is not None and (
+                self.is_finished
+                or not isinstance(value, (int, float))
+                or self.number_pattern.match(self.buffer, end).end() < len(self.buffer)
+            ):
+                self.position = end
+                return value
+
+            if end is None and len(self.buffer) - self.position > self.max_value_size:
+                raise self.get_error(
+                    f"JSON value is larger than {self.max_value_size} "
+                    f"characters, or invalid"
+                )
+
+            if not self.fill(read_size):
+
+                if end is not None:
+                    self.position = end
+                    return value
+
+                raise self.get_error("invalid or truncated JSON value")
+
+            # Read in growing amounts, so that large values aren't decoded
+            # from scratch too many times
+            read_size = min(max(read_size, len(self.buffer)), self.max_value_size)
+
+    def is_truncation_error(self, error):
+        """
+        Takes a JSONDecodeError from decoding the buffer
+        Returns True if it could have been caused by the end of the buffer
+        cutting off the value, so that reading more may fix it
+        """
+        return (
+            error.msg.startswith("Unterminated string")
+            or error.pos >= len(self.buffer) - self.truncation_window
+        )
+
+    def expect(self, expected_character):
+        character = self.next_character()
+
+        if character != expected_character:
+            raise self.get_error(
+                f"expected `{expected_character}`, got `{character}`"
+            )
+
+    def next_character(self):
+        character = self.peek()
+
+        if not character:
+            raise self.get_error("unexpected end of file")
+
+        self.position += 1
+        return character
+
+    def peek(self):
+        """
+        Skips whitespace
+        Returns the next character, or an empty string at the end of the
+        file
+        """
+        self.skip_whitespace()
+
+        if self.position >= len(self.buffer):
+            return ""
+
+        return self.buffer[self.position]
+
+    def skip_whitespace(self):
+        while True:
+            self.position = self.whitespace_pattern.match(
+                self.buffer,
+                self.position,
+            ).end()
+
+            if self.position < len(self.buffer) or not self.fill(self.read_size):
+                return
+
+    def fill(self, read_size):
+        """
+        Takes a number of characters to read
+        Appends them to the buffer, dropping the part which has already been
+        read
+        Returns False at the end of the file
+        """
+        if self.is_finished:
+            return False
+
+        data = self.open_file.read(read_size)
+
+        if not data:
+            self.is_finished = True
+            return False
+
+        self.buffer = self.buffer[self.position:] + data
+        self.position = 0
+
+        return True
+
+    def get_error(self, message):
+        return ValueError(f"{message}, near `{self.buffer[self.position:self.position + 20]}`")
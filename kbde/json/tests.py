@@ -0,0 +1,202 @@
+import dataclasses, datetime, io, json, unittest
+
+from . import backend
+from .stream import ArrayReader
+
+
+class CountingFile(io.StringIO):
+    """
+    Counts the characters which have been read
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read_count = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.read_count += len(data)
+        return data
+
+
+class ArrayReaderTest(unittest.TestCase):
+
+    def read(self, data, **kwargs):
+        return list(ArrayReader(io.StringIO(data), **kwargs))
+
+    def testRead(self):
+        data_list = [
+            1,
+            -2.5e-3,
+            1234567890123,
+            "a \"quoted\" \\u00e9 string",
+            "é",
+            True,
+            None,
+            {"a": [1, {"b": "c"}], "d": {}},
+            [],
+        ]
+        data = json.dumps(data_list, indent=2)
+
+        # Elements, including numbers, are split across reads of every size
+        for read_size in [1, 2, 3, 7, 64, 65536]:
+            self.assertEqual(self.read(data, read_size=read_size), data_list)
+
+        self.assertEqual(self.read(json.dumps(data_list)), data_list)
+
+    def testEmpty(self):
+        for data in ["[]", " [ ] ", "\n[\n]\n"]:
+
+            for read_size in [1, 65536]:
+                self.assertEqual(self.read(data, read_size=read_size), [])
+
+    def testPath(self):
+        data = json.dumps({
+            "meta": {"count": 3, "data": ["skipped"]},
+            "results": {"skipped": [1], "data": [1, 2, 3]},
+        })
+
+        for read_size in [1, 5, 65536]:
+            self.assertEqual(
+                self.read(data, path=["results", "data"], read_size=read_size),
+                [1, 2, 3],
+            )
+
+        with self.assertRaisesRegex(ValueError, "key `missing` not found"):
+            self.read(data, path=["missing"])
+
+        with self.assertRaisesRegex(ValueError, "key `x` not found"):
+            self.read('{"a": {}}', path=["a", "x"])
+
+        with self.assertRaisesRegex(ValueError, "expected `{`"):
+            self.read(data, path=["meta", "count", "x"])
+
+    def testInvalid(self):
+        for data in [
+            "[1, 2,]",
+            "[1,, 2]",
+            "[1 2]",
+            '{"a": [1]}',
+            "",
+        ]:
+
+            for read_size in [1, 65536]:
+
+                with self.assertRaises(ValueError, msg=data):
+                    self.read(data, read_size=read_size)
+
+    def testTruncated(self):
+        data = json.dumps([{"a": "b"}, 12345, "string", [1, 2]])
+
+        for stop in range(1, len(data)):
+
+            for read_size in [1, 4, 65536]:
+
+                with self.assertRaises(ValueError, msg=data[:stop]):
+                    self.read(data[:stop], read_size=read_size)
+
+        # The elements before the cut are still read
+        reader = iter(ArrayReader(io.StringIO(data[:-5]), read_size=4))
+        self.assertEqual(next(reader), {"a": "b"})
+        self.assertEqual(next(reader), 12345)
+
+    def testInvalidValueIsBounded(self):
+        # The error is raised without reading the rest of the file
+        open_file = CountingFile('[1, {"a": nope}, ' + "1, " * 100000 + "1]")
+
+        with self.assertRaisesRegex(ValueError, "invalid JSON value"):
+            list(ArrayReader(open_file, read_size=16))
+
+        self.assertLess(open_file.read_count, 100)
+
+        # An unterminated string can't be told apart from one that is still
+        # being read, so it is limited by `max_value_size`
+        open_file = CountingFile('[1, "' + "a" * 100000 + "]")
+        reader = ArrayReader(open_file, read_size=16)
+        reader.max_value_size = 1000
+
+        with self.assertRaisesRegex(ValueError, "larger than 1000"):
+            list(reader)
+
+        self.assertLess(open_file.read_count, 3000)
+
+        # Values of up to `max_value_size` are read
+        reader = ArrayReader(io.StringIO(json.dumps(["a" * 998])), read_size=16)
+        reader.max_value_size = 1000
+        self.assertEqual(list(reader), ["a" * 998])
+
+
+class BackendTest(unittest.TestCase):
+
+    def get_dumps_list(self):
+        dumps_list = [backend.dumps_json]
+
+        if backend.orjson is not None:
+            dumps_list.append(backend.dumps_orjson)
+
+        if backend.ujson is not None:
+            dumps_list.append(backend.dumps_ujson)
+
+        return dumps_list
+
+    def testSameOutput(self):
+
+        class Text(str):
+            pass
+
+        class Mapping(dict):
+            pass
+
+        for value in [
+            {"a": 1, "b": [1.5, None, True, False], "c": {"d": "e"}},
+            # Non-ASCII characters are written as they are
+            {"é": "ü ñ 日本 \U0001f600", "slash": "a/b", "quote": "\"\\\n"},
+            # NaN and infinity are written as null, wherever they are
+            {"a": float("nan"), "b": [float("inf"), (1, float("-inf"))]},
+            float("nan"),
+            # Non-string keys are written as strings
+            {1: "a", True: "b", None: "c"},
+            (1, 2),
+            # Subclasses of builtin types
+            {"text": Text("abc"), "mapping": Mapping(a=1)},
+            2 ** 70,
+            -2 ** 63,
+            "",
+            [],
+        ]:
+            expected = backend.dumps_json(value)
+            self.assertEqual(
+                json.loads(expected),
+                json.loads(json.dumps(backend.replace_non_finite(value))),
+            )
+
+            for dumps in self.get_dumps_list():
+                self.assertEqual(dumps(value), expected, (dumps, value))
+
+        self.assertEqual(backend.dumps_json({"a": float("nan")}), '{"a":null}')
+        self.assertEqual(backend.dumps_json("é"), '"é"')
+
+    def testUnsupportedTypes(self):
+
+        @dataclasses.dataclass
+        class Point:
+            x: int
+
+        # Types which `json` can't write raise TypeError from every backend
+        for value in [
+            datetime.datetime(2024, 1, 2),
+            datetime.date(2024, 1, 2),
+            Point(1),
+            object(),
+            {"a": {1, 2}},
+            b"bytes",
+        ]:
+
+            for dumps in self.get_dumps_list():
+
+                with self.assertRaises(TypeError, msg=(dumps, value)):
+                    dumps(value)
+
+    def testDumps(self):
+        self.assertIn(backend.backend_name, ["orjson", "ujson", "json"])
+        self.assertEqual(backend.dumps({"a": [1, "é"]}), '{"a":[1,"é"]}')
@@ -1 +1,5 @@
 from .manager import DictManager, ObjectManager
+from .columnar import ColumnarDictManager
+from .concurrent import ConcurrentDictManager, ConcurrentObjectManager
+from .query_set import QuerySet
+from .records import RecordManager, make_record_class
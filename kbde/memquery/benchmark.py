@@ -0,0 +1,215 @@
+import json, random, resource, sys, time, tracemalloc
+from types import SimpleNamespace
+
+from .manager import DictManager, ObjectManager
+
+
+class Benchmark:
+    """
+    Times memquery operations against a synthetic dataset
+
+    Each row has a unique `id`, an int key `number` and a string key `word`
+    which each have `cardinality` distinct values, and a float `price`.
+    Results are returned as a list of dicts, one per operation.
+    """
+    backend_list = [
+        "dict",
+        "object",
+        "columnar",
+    ]
+    add_count = 1000
+    query_count = 100
+
+    def __init__(self,
+                 backend,
+                 row_count,
+                 cardinality,
+                 query_count=None,
+                 trace_memory=False,
+                 seed=0):
+        assert backend in self.backend_list, (
+            f"backend must be one of {self.backend_list}"
+        )
+        self.backend = backend
+        self.row_count = row_count
+        self.cardinality = cardinality
+        self.query_count = query_count or self.query_count
+        self.trace_memory = trace_memory
+        self.random = random.Random(seed)
+
+    def run(self):
+        result_list = []
+
+        object_list = self.make_object_list(self.row_count)
+
+        manager, result = self.time_operation(
+            "build",
+            1,
+            self.get_manager_class(),
+            object_list,
+        )
+        result_list.append(result)
+
+        if self.backend != "columnar":
+
+            for key in ["id", "number", "word", "price"]:
+                _, result = self.time_operation(f"index_{key}", 1, manager.index, key)
+                result_list.append(result)
+
+        new_object_list = self.make_object_list(self.add_count, start=self.row_count)
+        _, result = self.time_operation(
+            "add",
+            self.add_count,
+            self.add_all,
+            manager,
+            new_object_list,
+        )
+        result_list.append(result)
+
+        row_count = self.row_count + self.add_count
+        query_list = [
+            ("get", self.get, lambda: {"id": self.random.randrange(row_count)}),
+            ("count", self.count, lambda: {"number": self.get_number()}),
+            ("count_multi", self.count, lambda: {
+                "number": self.get_number(),
+                "word": self.get_word(),
+            }),
+            ("filter_single", self.filter, lambda: {"number": self.get_number()}),
+            ("filter_multi", self.filter, lambda: {
+                "number": self.get_number(),
+                "word": self.get_word(),
+            }),
+            ("filter_range", self.filter, lambda: {
+                "price__range": sorted([self.random.random(), self.random.random()]),
+                "number": self.get_number(),
+            }),
+        ]
+
+        for operation, function, make_kwargs in query_list:
+            kwargs_list = [make_kwargs() for _ in range(self.query_count)]
+            _, result = self.time_operation(
+                operation,
+                self.query_count,
+                self.run_queries,
+                function,
+                manager,
+                kwargs_list,
+            )
+            result_list.append(result)
+
+        return result_list
+
+    def get_manager_class(self):
+        if self.backend == "dict":
+            return DictManager
+        if self.backend == "object":
+            return ObjectManager
+
+        from .columnar import ColumnarDictManager
+
+        # Import NumPy up front, so that it isn't included in the timings
+        import numpy
+
+        return ColumnarDictManager
+
+    def make_object_list(self, row_count, start=0):
+        object_list = []
+
+        for row_id in range(start, start + row_count):
+            obj = {
+                "id": row_id,
+                "number": self.get_number(),
+                "word": self.get_word(),
+                "price": self.random.random(),
+            }
+
+            if self.backend == "object":
+                obj = SimpleNamespace(**obj)
+
+            object_list.append(obj)
+
+        return object_list
+
+    def get_number(self):
+        return self.random.randrange(self.cardinality)
+
+    def get_word(self):
+        return f"word-{self.random.randrange(self.cardinality)}"
+
+    def add_all(self, manager, object_list):
+        for obj in object_list:
+            manager.add(obj)
+
+        # Make sure that any buffered rows are included in the timing
+        manager.count()
+
+    def run_queries(self, function, manager, kwargs_list):
+        for kwargs in kwargs_list:
+            function(manager, **kwargs)
+
+    def get(self, manager, **kwargs):
+        return manager.get(**kwargs)
+
+    def count(self, manager, **kwargs):
+        return manager.count(**kwargs)
+
+    def filter(self, manager, **kwargs):
+        # Evaluate the QuerySet, so that the whole query is timed
+        return list(manager.filter(**kwargs))
+
+    def time_operation(self, operation, call_count, function, *args):
+        """
+        Takes an operation name, the number of calls it represents, and a
+        function with its args
+        Returns the function's result, and a result dict for the operation
+        """
+        if self.trace_memory:
+            tracemalloc.start()
+
+        start = time.perf_counter()
+        value = function(*args)
+        seconds = time.perf_counter() - start
+
+        result = {
+            "backend": self.backend,
+            "row_count": self.row_count,
+            "cardinality": self.cardinality,
+            "operation": operation,
+            "call_count": call_count,
+            "seconds": seconds,
+            "calls_per_second": call_count / seconds if seconds else None,
+            "max_rss_bytes": self.get_max_rss(),
+        }
+
+        if self.trace_memory:
+            _, result["peak_traced_bytes"] = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        return value, result
+
+    def get_max_rss(self):
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        # Linux reports kilobytes, macOS reports bytes
+        if sys.platform != "darwin":
+            max_rss *= 1024
+
+        return max_rss
+
+
+def run(backend_list, row_count_list, cardinality_list, output=sys.stdout, **kwargs):
+    """
+    Runs a benchmark for every combination of backend, row count, and
+    cardinality
+    Writes each result to `output` as a line of JSON
+    """
+    for backend in backend_list:
+
+        for row_count in row_count_list:
+
+            for cardinality in cardinality_list:
+                benchmark = Benchmark(backend, row_count, cardinality, **kwargs)
+
+                for result in benchmark.run():
+                    output.write(json.dumps(result) + "\n")
+                    output.flush()
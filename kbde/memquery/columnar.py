@@ -0,0 +1,595 @@
+import os, pickle
+
+from .manager import ManagerBase
+
+
+class ColumnarDictManager(ManagerBase):
+    """
+    A DictManager which stores each key of a homogeneous list of dicts as a
+    NumPy column
+
+    Numeric and boolean keys are stored as typed arrays. All other keys are
+    dictionary-encoded, as an array of integer codes and a list of distinct
+    values. Queries are evaluated as vectorized boolean masks, and dicts are
+    only built for the matching rows.
+
+    Results are new dicts, rather than the dicts which were originally given
+    to the manager. Requires NumPy.
+    """
+    code_dtype = "int32"
+    batch_size = 1000
+    metadata_file_name = "columns.pickle"
+
+    def __init__(self, object_list):
+        self.key_list = None
+        self.column_dict = {}
+        self.row_count = 0
+        self.pending_list = []
+
+        for obj in object_list:
+            self.pending_list.append(obj)
+
+        self.flush_pending()
+
+    def add(self, obj):
+        # Rows are appended to the columns in bulk, the next time the manager
+        # is queried. Check their keys now, so that a bad row is reported
+        # here, rather than by a later query.
+        if self.key_list is None:
+            self.key_list = list(obj.keys())
+        else:
+            self.check_keys(obj)
+
+        self.pending_list.append(obj)
+
+    def remove(self, obj):
+        raise self.QueryException(
+            f"{self.__class__} is append-only, and can't remove objects"
+        )
+
+    def update(self, obj, **changes):
+        raise self.QueryException(
+            f"{self.__class__} is append-only, and can't update objects"
+        )
+
+    def iter_query(self, filter_list=(), exclude_list=()):
+        """
+        Takes a list of filter keywords and a list of exclude keywords
+        Yields dicts for the matching rows, built `batch_size` rows at a time
+        """
+        import numpy as np
+
+        mask = self.get_query_mask(filter_list, exclude_list)
+
+        if mask is None:
+            row_list = np.arange(self.row_count)
+        else:
+            row_list = np.flatnonzero(mask)
+
+        for start in range(0, len(row_list), self.batch_size):
+            yield from self.make_object_list(
+                row_list[start:start + self.batch_size]
+            )
+
+    def count_query(self, filter_list=(), exclude_list=()):
+        import numpy as np
+
+        mask = self.get_query_mask(filter_list, exclude_list)
+
+        if mask is None:
+            return self.row_count
+
+        return int(np.count_nonzero(mask))
+
+    def get_query_mask(self, filter_list, exclude_list):
+        """
+        Takes a list of filter keywords and a list of exclude keywords
+        Returns a boolean array of the matching rows, or None if every row
+        matches
+        """
+        import numpy as np
+
+        self.flush_pending()
+
+        mask = None
+
+        for kwargs in filter_list:
+            filter_mask = self.get_mask(**kwargs)
+
+            if mask is None:
+                mask = filter_mask
+            else:
+                np.logical_and(mask, filter_mask, out=mask)
+
+        for kwargs in exclude_list:
+            exclude_mask = self.get_mask(**kwargs)
+
+            if mask is None:
+                mask = np.ones(self.row_count, dtype=bool)
+
+            np.logical_and(mask, ~exclude_mask, out=mask)
+
+        return mask
+
+    def index(self, key):
+        # Every key is already stored as a column, so there is nothing to
+        # build
+        pass
+
+    def ensure_index(self, key):
+        pass
+
+    def plan(self, **kwargs):
+        """
+        Takes filter keywords
+        Returns a step for each keyword, with the key, lookup, value, and
+        number of matching rows, fewest first
+
+        Every keyword is evaluated as a mask over its whole column, so the
+        counts are exact, rather than estimates.
+        """
+        import numpy as np
+
+        self.flush_pending()
+
+        step_list = []
+
+        for query_key, value in kwargs.items():
+            key, lookup = self.parse_query_key(query_key)
+            mask = self.get_column(key).get_mask(self, lookup, value)
+            step_list.append({
+                "key": key,
+                "lookup": lookup,
+                "value": value,
+                "estimate": int(np.count_nonzero(mask)),
+            })
+
+        step_list.sort(key=lambda step: step["estimate"])
+
+        return step_list
+
+    def get_index_stats(self, key):
+        """
+        Takes a key
+        Returns cardinality statistics for its column
+        """
+        self.flush_pending()
+
+        value_count = self.get_column(key).get_value_count()
+
+        return {
+            "object_count": self.row_count,
+            "value_count": value_count,
+            "bucket_size": self.row_count / value_count if value_count else 0,
+        }
+
+    def get_mask(self, **kwargs):
+        """
+        Takes filter keywords
+        Returns a boolean array, with one entry per row
+        """
+        import numpy as np
+
+        self.flush_pending()
+
+        mask = None
+
+        for query_key, value in kwargs.items():
+            key, lookup = self.parse_query_key(query_key)
+            column = self.get_column(key)
+            column_mask = column.get_mask(self, lookup, value)
+
+            if mask is None:
+                mask = column_mask
+            else:
+                np.logical_and(mask, column_mask, out=mask)
+
+            if not mask.any():
+                break
+
+        return mask
+
+    def save(self, directory_path):
+        """
+        Takes a directory path
+        Writes each column to it as a `.npy` file, along with a metadata file
+
+        Snapshots can be opened with `.load()`, which memory-maps the column
+        files by default. Processes which load the same snapshot share the
+        column pages through the page cache, rather than each holding a copy.
+        """
+        import numpy as np
+
+        self.flush_pending()
+        os.makedirs(directory_path, exist_ok=True)
+
+        column_list = []
+
+        for position, key in enumerate(self.key_list or []):
+            column = self.column_dict[key]
+            np.save(
+                os.path.join(directory_path, f"{position}.npy"),
+                column.get_array(),
+            )
+            column_list.append(column.get_metadata())
+
+        metadata = {
+            "key_list": self.key_list,
+            "row_count": self.row_count,
+            "column_list": column_list,
+        }
+
+        with open(os.path.join(directory_path, self.metadata_file_name), "wb") as open_file:
+            pickle.dump(metadata, open_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, directory_path, mmap_mode="r"):
+        """
+        Takes the path of a snapshot written by `.save()`, and optionally a
+        NumPy mmap mode
+        Returns a new manager backed by the snapshot's columns
+
+        With the default read-only mmap mode, columns are paged in from disk
+        as they are used. Rows added to the manager afterwards are kept in
+        memory.
+        """
+        import numpy as np
+
+        with open(os.path.join(directory_path, cls.metadata_file_name), "rb") as open_file:
+            metadata = pickle.load(open_file)
+
+        manager = cls([])
+        manager.key_list = metadata["key_list"]
+        manager.row_count = metadata["row_count"]
+
+        for position, key in enumerate(manager.key_list or []):
+            column_array = np.load(
+                os.path.join(directory_path, f"{position}.npy"),
+                mmap_mode=mmap_mode,
+            )
+            column_metadata = metadata["column_list"][position]
+            column_class = cls.get_column_class(column_metadata["type"])
+            manager.column_dict[key] = column_class.from_array(
+                column_array,
+                column_metadata,
+            )
+
+        return manager
+
+    @classmethod
+    def get_column_class(cls, column_type):
+        return {
+            "numeric": NumericColumn,
+            "encoded": EncodedColumn,
+        }[column_type]
+
+    def get_column(self, key):
+        column = self.column_dict.get(key)
+
+        if column is None:
+            raise self.QueryException(f"key `{key}` is not a column")
+
+        return column
+
+    def make_object_list(self, row_list):
+        """
+        Takes an array of row numbers
+        Returns a list of dicts for those rows
+        """
+        if not len(row_list):
+            return []
+
+        value_lists = [
+            self.column_dict[key].take(row_list) for key in self.key_list
+        ]
+
+        return [dict(zip(self.key_list, row)) for row in zip(*value_lists)]
+
+    def flush_pending(self):
+        """
+        Appends any rows which have been added to the manager to the columns
+        """
+        if not self.pending_list:
+            return
+
+        pending_list = self.pending_list
+
+        if self.key_list is None:
+            self.key_list = list(pending_list[0].keys())
+
+        # Collect every key's values before changing any column, so that a
+        # missing key leaves the columns as they were
+        value_list_dict = {}
+
+        for key in self.key_list:
+            try:
+                value_list_dict[key] = [obj[key] for obj in pending_list]
+            except KeyError:
+                raise self.IndexException(
+                    f"all objects must have the key `{key}`"
+                )
+
+        for key, value_list in value_list_dict.items():
+            column = self.column_dict.get(key)
+
+            if column is None:
+                column = self.make_column(value_list)
+            else:
+                column = column.extend(self, value_list)
+
+            self.column_dict[key] = column
+
+        self.row_count += len(pending_list)
+        self.pending_list = []
+
+    def check_keys(self, obj):
+        for key in self.key_list:
+
+            if key not in obj:
+                raise self.IndexException(
+                    f"all objects must have the key `{key}`"
+                )
+
+    def make_column(self, value_list):
+        """
+        Takes a list of values for a single key
+        Returns the most compact column which can hold them
+        """
+        value_type = self.get_numeric_type(value_list)
+
+        if value_type is not None:
+            return NumericColumn(value_list, value_type)
+
+        return EncodedColumn(value_list, self.code_dtype)
+
+    def get_value(self, obj, key):
+        return obj[key]
+
+    def get_keys(self, obj):
+        return obj.keys()
+
+    def get_numeric_type(self, value_list):
+        """
+        Takes a list of values
+        Returns the Python type of the values, if they can be stored in a
+        typed array without changing them, otherwise None
+        """
+        if not value_list:
+            return None
+
+        value_type = type(value_list[0])
+
+        if value_type not in NumericColumn.dtype_map:
+            return None
+
+        if any(type(value) is not value_type for value in value_list):
+            return None
+
+        if value_type is int:
+            # Values outside of int64 would turn into an object array
+            if (
+                min(value_list) < NumericColumn.int_min
+                or max(value_list) > NumericColumn.int_max
+            ):
+                return None
+
+        return value_type
+
+
+class NumericColumn:
+    """
+    A column of ints, floats, or bools, stored as a typed array
+    """
+    dtype_map = {
+        bool: "bool",
+        int: "int64",
+        float: "float64",
+    }
+    int_min = -(2 ** 63)
+    int_max = 2 ** 63 - 1
+
+    def __init__(self, value_list, value_type):
+        import numpy as np
+
+        self.value_type = value_type
+        self.values = np.array(value_list, dtype=self.dtype_map[value_type])
+
+    @classmethod
+    def from_array(cls, values, metadata):
+        column = cls.__new__(cls)
+        column.value_type = metadata["value_type"]
+        column.values = values
+        return column
+
+    def get_array(self):
+        return self.values
+
+    def get_metadata(self):
+        return {
+            "type": "numeric",
+            "value_type": self.value_type,
+        }
+
+    def extend(self, manager, value_list):
+        import numpy as np
+
+        if manager.get_numeric_type(value_list) is self.value_type:
+            column = NumericColumn(value_list, self.value_type)
+            self.values = np.concatenate([self.values, column.values])
+            return self
+
+        # The new values don't fit in this column, so fall back to encoding
+        # everything
+        return EncodedColumn(self.values.tolist() + value_list, manager.code_dtype)
+
+    def take(self, row_list):
+        return self.values[row_list].tolist()
+
+    def get_value_count(self):
+        import numpy as np
+
+        return len(np.unique(self.values))
+
+    def get_mask(self, manager, lookup, value):
+        import numpy as np
+
+        values = self.values
+
+        try:
+
+            if lookup == "exact":
+                return values == value
+            if lookup == "in":
+                return np.isin(values, list(value))
+            if lookup == "gt":
+                return values > value
+            if lookup == "gte":
+                return values >= value
+            if lookup == "lt":
+                return values < value
+            if lookup == "lte":
+                return values <= value
+
+            low, high = manager.get_range_bounds(lookup, value)
+            return (values >= low) & (values <= high)
+
+        except TypeError:
+            raise manager.QueryException(
+                f"cannot compare a numeric column to {value!r}"
+            )
+
+
+class EncodedColumn:
+    """
+    A dictionary-encoded column
+    Each distinct value is stored once, and rows hold an integer code
+    """
+
+    def __init__(self, value_list, code_dtype):
+        import numpy as np
+
+        self.category_list = []
+        # Keyed by type too, so that `1`, `1.0` and `True` keep their own
+        # codes, and are read back unchanged
+        self.category_dict = {}
+        # The codes of the categories which equal each value, which are
+        # matched by exact lookups, as they would be with `==`
+        self.equal_code_dict = {}
+        self.codes = np.array(self.encode(value_list), dtype=code_dtype)
+
+    @classmethod
+    def from_array(cls, codes, metadata):
+        column = cls.__new__(cls)
+        column.category_list = []
+        column.category_dict = {}
+        column.equal_code_dict = {}
+
+        for value in metadata["category_list"]:
+            column.add_category(value)
+
+        column.codes = codes
+        return column
+
+    def get_array(self):
+        return self.codes
+
+    def get_metadata(self):
+        return {
+            "type": "encoded",
+            "category_list": self.category_list,
+        }
+
+    def encode(self, value_list):
+        category_dict = self.category_dict
+        code_list = []
+
+        for value in value_list:
+            code = category_dict.get((type(value), value))
+
+            if code is None:
+                code = self.add_category(value)
+
+            code_list.append(code)
+
+        return code_list
+
+    def add_category(self, value):
+        code = len(self.category_list)
+        self.category_dict[(type(value), value)] = code
+        self.equal_code_dict.setdefault(value, []).append(code)
+        self.category_list.append(value)
+
+        return code
+
+    def extend(self, manager, value_list):
+        import numpy as np
+
+        codes = np.array(self.encode(value_list), dtype=self.codes.dtype)
+        self.codes = np.concatenate([self.codes, codes])
+
+        return self
+
+    def get_value_count(self):
+        # Rows are never removed, so every category is still in use
+        return len(self.category_list)
+
+    def take(self, row_list):
+        category_list = self.category_list
+        return [category_list[code] for code in self.codes[row_list].tolist()]
+
+    def get_mask(self, manager, lookup, value):
+        import numpy as np
+
+        if lookup == "exact":
+            code_list = self.equal_code_dict.get(value)
+
+            if code_list is None:
+                return np.zeros(len(self.codes), dtype=bool)
+
+            if len(code_list) == 1:
+                return self.codes == code_list[0]
+
+            return np.isin(self.codes, code_list)
+
+        if lookup == "in":
+            code_list = [
+                code
+                for v in value
+                for code in self.equal_code_dict.get(v, [])
+            ]
+            return np.isin(self.codes, code_list)
+
+        # Evaluate the range lookup once per distinct value, then broadcast
+        # the result to the rows
+        category_mask = np.array(
+            [
+                self.match_category(manager, category, lookup, value)
+                for category in self.category_list
+            ],
+            dtype=bool,
+        )
+
+        return category_mask[self.codes]
+
+    def match_category(self, manager, category, lookup, value):
+        if category is None:
+            return False
+
+        try:
+
+            if lookup == "gt":
+                return category > value
+            if lookup == "gte":
+                return category >= value
+            if lookup == "lt":
+                return category < value
+            if lookup == "lte":
+                return category <= value
+
+            low, high = manager.get_range_bounds(lookup, value)
+            return low <= category <= high
+
+        except TypeError:
+            raise manager.QueryException(
+                f"cannot compare {category!r} to {value!r}"
+            )
@@ -0,0 +1,43 @@
+from kbde.kbde_cli import command
+
+
+class Command(command.Command):
+
+    def add_arguments(self, parser):
+        from kbde.memquery import benchmark
+
+        parser.add_argument(
+            "--backend",
+            type=str,
+            nargs="+",
+            choices=benchmark.Benchmark.backend_list,
+            default=["dict", "object"],
+        )
+        parser.add_argument(
+            "--row-count",
+            type=int,
+            nargs="+",
+            default=[10 ** 4, 10 ** 5, 10 ** 6],
+        )
+        parser.add_argument("--cardinality", type=int, nargs="+", default=[100])
+        parser.add_argument("--query-count", type=int)
+        parser.add_argument("--trace-memory", action="store_true")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self,
+               backend,
+               row_count,
+               cardinality,
+               query_count,
+               trace_memory,
+               seed):
+        from kbde.memquery import benchmark
+
+        benchmark.run(
+            backend,
+            row_count,
+            cardinality,
+            query_count=query_count,
+            trace_memory=trace_memory,
+            seed=seed,
+        )
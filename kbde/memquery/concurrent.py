@@ -0,0 +1,177 @@
+import threading
+from concurrent import futures
+
+from .manager import REMOVED, DictManager, ObjectManager
+
+
+class ConcurrentManagerMixin:
+    """
+    Makes a manager safe to share between threads, without blocking readers
+
+    Published index buckets and sorted indexes are never changed in place.
+    Mutations copy the buckets they touch, change the copies, and swap them
+    in, so a query which is already running keeps reading the version it
+    started with. Mutations and index builds are serialized by a lock, and
+    threads which need an index that is already being built wait for that
+    build rather than starting another one.
+
+    Writes cost a copy of each bucket they touch, so this suits managers
+    which are read far more often than they are changed.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.write_lock = threading.RLock()
+        self.index_build_lock = threading.Lock()
+        self.index_build_dict = {}
+
+    def add(self, obj):
+        with self.write_lock:
+            return super().add(obj)
+
+    def remove(self, obj):
+        with self.write_lock:
+            return super().remove(obj)
+
+    def update(self, obj, **changes):
+        with self.write_lock:
+            return super().update(obj, **changes)
+
+    def upsert(self, obj, **kwargs):
+        # Build any indexes which the lookup needs before taking the write
+        # lock, so that this thread never waits on another thread's index
+        # build while holding it
+        self.plan(**kwargs)
+
+        with self.write_lock:
+            return super().upsert(obj, **kwargs)
+
+    def save(self, file_path):
+        with self.write_lock:
+            return super().save(file_path)
+
+    def index(self, key):
+        if key in self.index_dict:
+            raise self.IndexException(f"key `{key}` has already been indexed")
+
+        self.ensure_index(key)
+
+    def ensure_index(self, key):
+        if key in self.index_dict:
+            return
+
+        with self.index_build_lock:
+            build = self.index_build_dict.get(key)
+            is_builder = build is None
+
+            if is_builder:
+                build = futures.Future()
+                self.index_build_dict[key] = build
+
+        if not is_builder:
+            # Another thread is building this index. Wait for it, and raise
+            # its exception if it failed.
+            build.result()
+            return
+
+        try:
+
+            with self.write_lock:
+
+                if key not in self.index_dict:
+                    # Build the index privately, then publish it
+                    self.index_dict[key] = self.make_index(self.iter_objects(), key)
+
+        except Exception as e:
+            build.set_exception(e)
+            raise
+
+        else:
+            build.set_result(None)
+
+        finally:
+
+            with self.index_build_lock:
+                del self.index_build_dict[key]
+
+    def get_sorted_index(self, key):
+        sorted_index = self.sorted_index_dict.get(key)
+
+        if sorted_index is not None:
+            return sorted_index
+
+        # Building the sorted index iterates over the index, so it can't run
+        # alongside a mutation
+        with self.write_lock:
+            return super().get_sorted_index(key)
+
+    def index_object(self, obj, key):
+        index = self.index_dict[key]
+        value = self.get_index_value(obj, key)
+        posting = index.get(value)
+
+        if posting is None:
+            posting = {}
+        else:
+            posting = posting.copy()
+
+        posting[self.get_object_key(obj)] = obj
+        is_new_value = value not in index
+        index[value] = posting
+
+        sorted_index = self.sorted_index_dict.get(key)
+
+        if is_new_value and sorted_index is not None:
+            sorted_index = sorted_index.copy()
+            self.add_to_sorted_index(sorted_index, value)
+            self.sorted_index_dict[key] = sorted_index
+
+    def unindex_object(self, obj, key):
+        index = self.index_dict[key]
+        value = self.get_index_value(obj, key)
+        posting = index.get(value)
+        object_key = self.get_object_key(obj)
+
+        if posting is None or object_key not in posting:
+            raise self.NotFoundException(
+                f"object is not indexed under {value!r}"
+            )
+
+        if len(posting) > 1:
+            posting = posting.copy()
+            del posting[object_key]
+            index[value] = posting
+            return
+
+        del index[value]
+
+        sorted_index = self.sorted_index_dict.get(key)
+
+        if sorted_index is not None:
+            sorted_index = sorted_index.copy()
+            self.remove_from_sorted_index(sorted_index, value)
+            self.sorted_index_dict[key] = sorted_index
+
+    @property
+    def object_list(self):
+        # Compacting here could race with a writer, so return a copy
+        return list(self.iter_objects())
+
+    def iter_objects(self):
+        # An object can be marked as removed while this is iterating, so
+        # always check
+        return (obj for obj in self.slot_list if obj is not REMOVED)
+
+    def compact_object_list(self):
+        # Replace the slots, rather than shifting them under readers which
+        # are iterating over them
+        self.slot_list = list(self.iter_objects())
+        self.position_dict = None
+
+
+class ConcurrentDictManager(ConcurrentManagerMixin, DictManager):
+    pass
+
+
+class ConcurrentObjectManager(ConcurrentManagerMixin, ObjectManager):
+    pass
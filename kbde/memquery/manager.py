@@ -1,66 +1,642 @@
 
 
+import array, bisect, itertools, pickle
+
+from .query_set import QuerySet
+
+
 class ManagerBase:
+    lookup_separator = "__"
+    lookup_list = [
+        "exact",
+        "in",
+        "gt",
+        "gte",
+        "lt",
+        "lte",
+        "range",
+        "between",
+    ]
 
     def __init__(self, object_list):
-        self.object_list = object_list
+        # The manager keeps its own copy of the list, so that the caller's
+        # list is never changed. A removed object's slot holds `REMOVED`
+        # until the list is compacted, so read objects from `.object_list`
+        # or `.iter_objects()`, rather than from this.
+        self.slot_list = list(object_list)
+        self.object_count = len(self.slot_list)
+        # Object key -> position in the object list, built on the first
+        # removal
+        self.position_dict = None
         self.index_dict = {}
+        self.sorted_index_dict = {}
+
+    @property
+    def object_list(self):
+        """
+        Returns the list of objects in the manager, in the order that they
+        were added
+        """
+        if len(self.slot_list) != self.object_count:
+            self.compact_object_list()
+
+        return self.slot_list
 
     def add(self, obj):
-        for index_key, index in self.index_dict.items():
-            self.add_to_index(index, obj, index_key)
-        self.object_list.append(obj)
+        for index_key in self.index_dict:
+            self.index_object(obj, index_key)
+
+        if self.position_dict is not None:
+            self.position_dict[self.get_object_key(obj)] = len(self.slot_list)
+
+        self.slot_list.append(obj)
+        self.object_count += 1
+
+    def remove(self, obj):
+        """
+        Takes an object which is in the manager
+        Removes it from every index and from the object list
+
+        The object's slot is marked as removed, rather than shifting every
+        object after it, and the slots are compacted once more than half of
+        them have been removed, or when `.object_list` is read.
+        """
+        position = self.get_object_position(obj)
+        unindexed_key_list = []
+
+        try:
+
+            for index_key in self.index_dict:
+                self.unindex_object(obj, index_key)
+                unindexed_key_list.append(index_key)
+
+        except self.NotFoundException:
+            # Leave the object as it was
+            for index_key in unindexed_key_list:
+                self.index_object(obj, index_key)
+
+            raise
+
+        self.remove_from_object_list(obj, position)
+
+    def update(self, obj, **changes):
+        """
+        Takes an object which is in the manager, and new values for its keys
+        Sets the new values, moving the object between buckets of the indexes
+        whose value changed
+        """
+        changed_index_key_list = [
+            index_key for index_key in self.index_dict
+            if self.get_index_value(obj, index_key)
+            != self.get_index_value(obj, index_key, changes)
+        ]
+
+        for index_key in changed_index_key_list:
+            self.unindex_object(obj, index_key)
+
+        for key, value in changes.items():
+            self.set_value(obj, key, value)
+
+        for index_key in changed_index_key_list:
+            self.index_object(obj, index_key)
+
+        return obj
+
+    def upsert(self, obj, **kwargs):
+        """
+        Takes an object and filter keywords which identify it
+        Updates the object which matches the keywords with the values of the
+        given object, or adds the given object if there is no match
+        Returns the object which is in the manager
+        """
+        if not kwargs:
+            raise self.QueryException("upsert requires at least one lookup")
 
-    def get(self, **kwargs):
         filter_result = self.filter(**kwargs)
         result_count = len(filter_result)
 
         if result_count > 1:
-            raise self.QueryException("query returned more than 1 result. it returned {0}".format(result_count))
+            raise self.QueryException(
+                f"upsert matched more than 1 result. it matched {result_count}"
+            )
         if result_count < 1:
-            raise self.NotFoundException("no objects found")
+            self.add(obj)
+            return obj
 
-        return filter_result[0]
+        existing_obj = filter_result[0]
+        changes = {key: self.get_value(obj, key) for key in self.get_keys(obj)}
 
-    def count(self, **kwargs):
-        return len(self.filter(**kwargs))
+        return self.update(existing_obj, **changes)
+
+    def get_object_position(self, obj):
+        """
+        Takes an object
+        Returns its position in the object list
+        Raises NotFoundException if it isn't in the manager
+        """
+        if self.position_dict is None:
+            get_object_key = self.get_object_key
+            self.position_dict = {
+                get_object_key(list_obj): position
+                for position, list_obj in enumerate(self.slot_list)
+                if list_obj is not REMOVED
+            }
+
+        position = self.position_dict.get(self.get_object_key(obj))
+
+        if position is None or self.slot_list[position] is not obj:
+            raise self.NotFoundException("object is not in this manager")
+
+        return position
+
+    def remove_from_object_list(self, obj, position):
+        del self.position_dict[self.get_object_key(obj)]
+        self.slot_list[position] = REMOVED
+        self.object_count -= 1
+
+        if self.object_count * 2 < len(self.slot_list):
+            self.compact_object_list()
+
+    def compact_object_list(self):
+        """
+        Drops the slots of removed objects, in place
+        """
+        self.slot_list[:] = self.iter_objects()
+        self.position_dict = None
+
+    def iter_objects(self):
+        """
+        Returns an iterator of the objects in the manager, in the order that
+        they were added
+        """
+        slot_list = self.slot_list
+
+        if len(slot_list) == self.object_count:
+            return iter(slot_list)
+
+        return (obj for obj in slot_list if obj is not REMOVED)
+
+    def save(self, file_path):
+        """
+        Takes a file path
+        Writes a snapshot of the object list and every built index to it
+
+        Each index is stored as its list of values, and flat arrays of
+        bucket sizes and object list positions, so loading a snapshot doesn't
+        need to read any values from the objects.
+        """
+        object_list = list(self.iter_objects())
+        position_dict = {
+            self.get_object_key(obj): position
+            for position, obj in enumerate(object_list)
+        }
+        index_dict = {}
+
+        for index_key, index in self.index_dict.items():
+            size_array = array.array("q")
+            position_array = array.array("q")
+
+            for posting in index.values():
+                size_array.append(len(posting))
+                position_array.extend(
+                    position_dict[object_key] for object_key in posting
+                )
+
+            index_dict[index_key] = (list(index), size_array, position_array)
+
+        snapshot = {
+            "object_list": object_list,
+            "index_dict": index_dict,
+            "sorted_index_dict": self.sorted_index_dict,
+        }
+
+        with open(file_path, "wb") as open_file:
+            pickle.dump(snapshot, open_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, file_path, **kwargs):
+        """
+        Takes the path of a snapshot written by `.save()`, and any other
+        kwargs for the manager
+        Returns a new manager, with its indexes already built
+        """
+        with open(file_path, "rb") as open_file:
+            snapshot = pickle.load(open_file)
+
+        manager = cls(snapshot["object_list"], **kwargs)
+        object_list = manager.object_list
+        get_object_key = manager.get_object_key
+
+        for index_key, index_data in snapshot["index_dict"].items():
+            value_list, size_array, position_array = index_data
+            position_iter = iter(position_array)
+            index = {}
+
+            for value, size in zip(value_list, size_array):
+                index[value] = {
+                    get_object_key(obj): obj
+                    for obj in map(
+                        object_list.__getitem__,
+                        itertools.islice(position_iter, size),
+                    )
+                }
+
+            manager.index_dict[index_key] = index
+
+        manager.sorted_index_dict = snapshot["sorted_index_dict"]
+
+        return manager
+
+    def all(self):
+        return QuerySet(self)
 
     def filter(self, **kwargs):
-        filter_result = None
+        return self.all().filter(**kwargs)
+
+    def exclude(self, **kwargs):
+        return self.all().exclude(**kwargs)
+
+    def get(self, **kwargs):
+        return self.all().get(**kwargs)
+
+    def count(self, **kwargs):
+        return self.filter(**kwargs).count()
+
+    def iter_query(self, filter_list=(), exclude_list=()):
+        """
+        Takes a list of filter keywords and a list of exclude keywords
+        Yields the objects which match all of the filters and none of the
+        excludes, without building a list of results
+        """
+        posting_list = self.get_posting_list(filter_list)
+
+        if posting_list is None:
+            return
+
+        exclude_posting_list = [
+            self.get_exclude_posting(kwargs) for kwargs in exclude_list
+        ]
+        exclude_posting_list = [
+            posting for posting in exclude_posting_list if posting
+        ]
+
+        if posting_list:
+            object_iter = self.intersection(*posting_list)
+        else:
+            object_iter = self.iter_objects()
+
+        if not exclude_posting_list:
+            yield from object_iter
+            return
+
+        get_object_key = self.get_object_key
+
+        for obj in object_iter:
+            object_key = get_object_key(obj)
+
+            if not any(object_key in posting for posting in exclude_posting_list):
+                yield obj
+
+    def count_query(self, filter_list=(), exclude_list=()):
+        """
+        Takes a list of filter keywords and a list of exclude keywords
+        Returns the number of matching objects, if it can be known without
+        visiting them, otherwise None
+        """
+        if exclude_list:
+            return None
 
-        for key, value in kwargs.items():
+        posting_list = self.get_posting_list(filter_list)
 
-            if key not in self.index_dict:
-                self.index(key)
+        if posting_list is None:
+            return 0
+        if not posting_list:
+            return self.object_count
+        if len(posting_list) == 1:
+            return len(posting_list[0])
 
-            index = self.index_dict.get(key)
-            result = index.get(value, [])
+        return None
 
-            if filter_result is None:
-                filter_result = result
+    def get_posting_list(self, filter_list):
+        """
+        Takes a list of filter keywords
+        Returns the posting lists which need to be intersected to answer
+        them, smallest first, or None if nothing can match
+        """
+        posting_list = []
+
+        for kwargs in filter_list:
+
+            for step in self.plan(**kwargs):
+                posting = self.get_posting(
+                    step["key"],
+                    step["lookup"],
+                    step["value"],
+                )
+
+                if not posting:
+                    # One of the steps has no matches, so the intersection is
+                    # empty
+                    return None
+
+                posting_list.append(posting)
+
+        # Start with the most selective posting list, so that the work done
+        # is bounded by the size of the smallest candidate set
+        posting_list.sort(key=len)
+
+        return posting_list
+
+    def get_exclude_posting(self, kwargs):
+        """
+        Takes exclude keywords
+        Returns a posting list, or a set of object keys, for the objects which
+        match all of them
+        """
+        posting_list = self.get_posting_list([kwargs])
+
+        if not posting_list:
+            return None
+
+        if len(posting_list) == 1:
+            return posting_list[0]
+
+        get_object_key = self.get_object_key
+
+        return {get_object_key(obj) for obj in self.intersection(*posting_list)}
+
+    def explain(self, **kwargs):
+        """
+        Takes filter keywords
+        Returns the plan which `.filter()` would use for them, as a list of
+        steps, each with the index key, lookup, value, and estimated number of
+        matching objects
+        """
+        return self.plan(**kwargs)
+
+    def plan(self, **kwargs):
+        """
+        Takes filter keywords
+        Returns a list of index lookups which together answer the query,
+        cheapest first
+
+        Exact lookups are answered by a composite index when one has been
+        built over a subset of the queried keys, preferring the indexes which
+        cover the most keys, and then the most selective ones. Everything
+        else is answered by single-key indexes, which are built as needed.
+        """
+        exact_dict = {}
+        step_list = []
+
+        for query_key, value in kwargs.items():
+            key, lookup = self.parse_query_key(query_key)
+
+            if lookup == "exact":
+                exact_dict[key] = value
             else:
-                filter_result = self.intersection(filter_result, result)
+                step_list.append(self.make_step(key, lookup, value))
+
+        composite_key_list = [
+            index_key for index_key in list(self.index_dict)
+            if isinstance(index_key, tuple)
+        ]
 
-            if not filter_result:
+        while composite_key_list:
+            composite_key_list = [
+                index_key for index_key in composite_key_list
+                if all(key in exact_dict for key in index_key)
+            ]
+
+            if not composite_key_list:
                 break
-        
-        if filter_result is None:
-            return self.object_list.copy()
 
-        return filter_result
+            step = min(
+                (
+                    self.make_step(
+                        index_key,
+                        "exact",
+                        tuple(exact_dict[key] for key in index_key),
+                    )
+                    for index_key in composite_key_list
+                ),
+                key=lambda step: (-len(step["key"]), step["estimate"]),
+            )
+            step_list.append(step)
+
+            for key in step["key"]:
+                del exact_dict[key]
+
+        for key, value in exact_dict.items():
+            step_list.append(self.make_step(key, "exact", value))
 
-    def intersection(self, list_1, list_2):
+        step_list.sort(key=lambda step: step["estimate"])
+
+        return step_list
+
+    def make_step(self, key, lookup, value):
+        self.ensure_index(key)
+
+        return {
+            "key": key,
+            "lookup": lookup,
+            "value": value,
+            "estimate": self.estimate(key, lookup, value),
+        }
+
+    def estimate(self, key, lookup, value):
+        """
+        Takes an indexed key, a lookup, and a value
+        Returns the estimated number of objects which match, without
+        collecting them
+        """
+        index = self.index_dict[key]
+
+        if lookup == "exact":
+            return len(index.get(value, ()))
+
+        if lookup == "in":
+            return sum(len(index.get(v, ())) for v in value)
+
+        sorted_index = self.get_sorted_index(key)
+        start, stop = self.get_range(sorted_index, lookup, value)
+
+        return round((stop - start) * self.get_index_stats(key)["bucket_size"])
+
+    def get_index_stats(self, key):
+        """
+        Takes an indexed key
+        Returns cardinality statistics for that index
+        """
+        # Every object is in exactly one bucket of each index
+        object_count = self.object_count
+        value_count = len(self.index_dict[key])
+
+        return {
+            "object_count": object_count,
+            "value_count": value_count,
+            "bucket_size": object_count / value_count if value_count else 0,
+        }
+
+    def parse_query_key(self, query_key):
+        """
+        Takes a filter keyword, such as `price__gte`
+        Returns a tuple of (key, lookup)
+
+        Keywords without a known lookup suffix are exact matches on the full
+        keyword.
+        """
+        key, separator, lookup = query_key.rpartition(self.lookup_separator)
+
+        if separator and key and lookup in self.lookup_list:
+            return key, lookup
+
+        return query_key, "exact"
+
+    def get_posting(self, key, lookup, value):
+        """
+        Takes a key, a lookup, and a value
+        Returns the posting list of objects which match
+        """
+        self.ensure_index(key)
+
+        index = self.index_dict[key]
+
+        if lookup == "exact":
+            return index.get(value)
+
+        if lookup == "in":
+            return self.union(index.get(v) for v in value)
+
+        # The remaining lookups are ranges over the sorted index
+        sorted_index = self.get_sorted_index(key)
+        start, stop = self.get_range(sorted_index, lookup, value)
+
+        return self.union(index.get(v) for v in sorted_index[start:stop])
+
+    def get_range(self, sorted_index, lookup, value):
+        """
+        Takes a sorted list of index values, a range lookup, and a value
+        Returns the (start, stop) slice of the sorted index which matches
+        """
+        try:
+
+            if lookup == "gt":
+                return bisect.bisect_right(sorted_index, value), len(sorted_index)
+            if lookup == "gte":
+                return bisect.bisect_left(sorted_index, value), len(sorted_index)
+            if lookup == "lt":
+                return 0, bisect.bisect_left(sorted_index, value)
+            if lookup == "lte":
+                return 0, bisect.bisect_right(sorted_index, value)
+
+            # `range` and `between` are inclusive on both ends
+            low, high = self.get_range_bounds(lookup, value)
+
+            return (
+                bisect.bisect_left(sorted_index, low),
+                bisect.bisect_right(sorted_index, high),
+            )
+
+        except TypeError:
+            raise self.QueryException(
+                f"cannot compare the indexed values to {value!r}"
+            )
+
+    def get_range_bounds(self, lookup, value):
+        """
+        Takes a `range` or `between` lookup and its value
+        Returns the (low, high) bounds
+        """
+        try:
+            low, high = value
+        except (TypeError, ValueError):
+            raise self.QueryException(
+                f"`{lookup}` lookups require a (low, high) pair, got {value!r}"
+            )
+
+        return low, high
+
+    def union(self, posting_list):
+        """
+        Takes an iterable of posting lists, some of which may be None
+        Returns a single posting list with all of their objects
+        """
+        result = {}
+
+        for posting in posting_list:
+            if posting:
+                result.update(posting)
+
+        return result
+
+    def intersection(self, *posting_list):
         """
-        Returns the intersection
+        Takes posting lists, ordered from smallest to largest
+        Yields the objects which are in all of them
         """
-        return [o for o in list_1 if o in list_2]
+        posting, *other_posting_list = posting_list
+
+        if not other_posting_list:
+            yield from posting.values()
+            return
+
+        for object_key, obj in posting.items():
+
+            if all(object_key in other for other in other_posting_list):
+                yield obj
 
     def index(self, key):
         #Make sure we haven't indexed by this key yet
         if key in self.index_dict:
             raise self.IndexException(f"key `{key}` has already been indexed")
 
-        self.index_dict[key] = self.make_index(self.object_list, key)
+        self.index_dict[key] = self.make_index(self.iter_objects(), key)
+
+    def ensure_index(self, key):
+        """
+        Takes a key
+        Builds an index for it, if there isn't one already
+        """
+        if key not in self.index_dict:
+            self.index(key)
+
+    def get_sorted_index(self, key):
+        """
+        Takes a key which has been indexed
+        Returns a sorted list of the distinct values in that index
+
+        The sorted index is built on first use and kept up to date by
+        `.add()`. `None` values are left out, since they can't be ordered, and
+        are never matched by range lookups.
+        """
+        sorted_index = self.sorted_index_dict.get(key)
+
+        if sorted_index is None:
+            try:
+                sorted_index = sorted(
+                    value for value in self.index_dict[key]
+                    if value is not None
+                )
+            except TypeError:
+                raise self.QueryException(
+                    f"values for key `{key}` cannot be ordered"
+                )
+
+            self.sorted_index_dict[key] = sorted_index
+
+        return sorted_index
+
+    def add_to_sorted_index(self, sorted_index, value):
+        if value is None:
+            return
+
+        position = bisect.bisect_left(sorted_index, value)
+
+        if position < len(sorted_index) and sorted_index[position] == value:
+            # Already present
+            return
+
+        sorted_index.insert(position, value)
 
     def make_index(self, object_list, key):
         new_index = {}
@@ -70,12 +646,104 @@ class ManagerBase:
 
         return new_index
 
+    def index_object(self, obj, key):
+        """
+        Takes an object and an indexed key
+        Adds the object to the index, and to the sorted index if it exists
+        """
+        self.add_to_index(self.index_dict[key], obj, key)
+
+        sorted_index = self.sorted_index_dict.get(key)
+        if sorted_index is not None:
+            self.add_to_sorted_index(sorted_index, self.get_index_value(obj, key))
+
+    def unindex_object(self, obj, key):
+        """
+        Takes an object and an indexed key
+        Removes the object from the index, dropping its bucket if it is empty
+        """
+        index = self.index_dict[key]
+        value = self.get_index_value(obj, key)
+
+        if not self.remove_from_index(index, obj, value):
+            # Bucket is still in use
+            return
+
+        sorted_index = self.sorted_index_dict.get(key)
+        if sorted_index is not None:
+            self.remove_from_sorted_index(sorted_index, value)
+
+    def remove_from_index(self, index, obj, value):
+        """
+        Takes an index, an object, and the value it is indexed under
+        Removes the object from that bucket
+        Returns True if the bucket was emptied and removed
+        """
+        posting = index.get(value)
+        object_key = self.get_object_key(obj)
+
+        if posting is None or object_key not in posting:
+            raise self.NotFoundException(
+                f"object is not indexed under {value!r}"
+            )
+
+        del posting[object_key]
+
+        if posting:
+            return False
+
+        del index[value]
+        return True
+
+    def remove_from_sorted_index(self, sorted_index, value):
+        if value is None:
+            return
+
+        position = bisect.bisect_left(sorted_index, value)
+
+        if position < len(sorted_index) and sorted_index[position] == value:
+            del sorted_index[position]
+
     def add_to_index(self, index, obj, key):
-        value = self.get_value(obj, key)
-        value_list = index.get(value, [])
-        value_list.append(obj)
-        index[value] = value_list
-        
+        value = self.get_index_value(obj, key)
+        posting = index.get(value)
+
+        if posting is None:
+            posting = {}
+            index[value] = posting
+
+        posting[self.get_object_key(obj)] = obj
+
+    def get_object_key(self, obj):
+        """
+        Takes an object
+        Returns the key which identifies that object within a posting list
+
+        Posting lists are dicts of object key -> object, so that they can be
+        intersected with constant-time membership checks. Objects are
+        identified by identity, since dicts are not hashable.
+        """
+        return id(obj)
+
+    def get_index_value(self, obj, key, changes=None):
+        """
+        Takes an object, an index key, and optionally pending changes to the
+        object
+        Returns the value which the object is indexed under
+
+        Composite index keys are tuples of keys, and are indexed under a
+        tuple of the object's values for those keys.
+        """
+        if isinstance(key, tuple):
+            return tuple(
+                self.get_index_value(obj, part, changes) for part in key
+            )
+
+        if changes and key in changes:
+            return changes[key]
+
+        return self.get_value(obj, key)
+
     def get_value(self, obj, key):
         """
         Takes an object and a key
@@ -84,6 +752,20 @@ class ManagerBase:
         """
         raise NotImplementedError
 
+    def set_value(self, obj, key, value):
+        """
+        Takes an object, a key, and a value
+        Sets the value of the object at key
+        """
+        raise NotImplementedError
+
+    def get_keys(self, obj):
+        """
+        Takes an object
+        Returns the keys which the object has values for
+        """
+        raise NotImplementedError
+
     class IndexException(Exception):
         pass
 
@@ -94,13 +776,44 @@ class ManagerBase:
         pass
 
 
+# Marks the place of a removed object in a manager's object list
+REMOVED = object()
+
+
 class DictManager(ManagerBase):
 
     def get_value(self, obj, key):
         return obj[key]
 
+    def set_value(self, obj, key, value):
+        obj[key] = value
+
+    def get_keys(self, obj):
+        return obj.keys()
+
 
 class ObjectManager(ManagerBase):
 
     def get_value(self, obj, key):
         return getattr(obj, key)
+
+    def set_value(self, obj, key, value):
+        setattr(obj, key, value)
+
+    def get_keys(self, obj):
+        key_list = list(getattr(obj, "__dict__", ()))
+
+        # Objects of classes with `__slots__` keep some or all of their
+        # values outside of `__dict__`
+        for cls in type(obj).__mro__:
+            slots = getattr(cls, "__slots__", ())
+
+            if isinstance(slots, str):
+                slots = [slots]
+
+            key_list.extend(
+                key for key in slots
+                if key not in ("__dict__", "__weakref__") and hasattr(obj, key)
+            )
+
+        return key_list
@@ -0,0 +1,234 @@
+import itertools
+
+
+class QuerySet:
+    """
+    A lazy, chainable query against a manager
+
+    Nothing is evaluated until the QuerySet is iterated, counted, or indexed.
+    Once it has been fully iterated, the results are cached.
+    """
+
+    def __init__(self,
+                 manager,
+                 filter_list=(),
+                 exclude_list=(),
+                 order_by_list=(),
+                 values_key_list=None,
+                 start=0,
+                 stop=None):
+        self.manager = manager
+        self.filter_list = filter_list
+        self.exclude_list = exclude_list
+        self.order_by_list = order_by_list
+        self.values_key_list = values_key_list
+        self.start = start
+        self.stop = stop
+        self.result_list = None
+
+    def clone(self, **kwargs):
+        query_kwargs = {
+            "filter_list": self.filter_list,
+            "exclude_list": self.exclude_list,
+            "order_by_list": self.order_by_list,
+            "values_key_list": self.values_key_list,
+            "start": self.start,
+            "stop": self.stop,
+        }
+        query_kwargs.update(kwargs)
+
+        return self.__class__(self.manager, **query_kwargs)
+
+    def filter(self, **kwargs):
+        self.assert_not_sliced("filter")
+
+        if not kwargs:
+            return self.clone()
+
+        return self.clone(filter_list=self.filter_list + (kwargs,))
+
+    def exclude(self, **kwargs):
+        self.assert_not_sliced("exclude")
+
+        if not kwargs:
+            return self.clone()
+
+        return self.clone(exclude_list=self.exclude_list + (kwargs,))
+
+    def order_by(self, *keys):
+        """
+        Takes keys to order by
+        Keys which start with `-` are in descending order
+        """
+        self.assert_not_sliced("order_by")
+        return self.clone(order_by_list=keys)
+
+    def values(self, *keys):
+        """
+        Takes keys
+        Returns a QuerySet which yields dicts of those keys, or of all of each
+        object's keys if none are given
+        """
+        return self.clone(values_key_list=keys)
+
+    def get(self, **kwargs):
+        query_set = self.filter(**kwargs)
+        result_list = list(itertools.islice(query_set.iter_results(), 2))
+        result_count = len(result_list)
+
+        if result_count > 1:
+            raise self.manager.QueryException(
+                f"query returned more than 1 result. it returned "
+                f"{query_set.count()}"
+            )
+        if result_count < 1:
+            raise self.manager.NotFoundException("no objects found")
+
+        return result_list[0]
+
+    def first(self):
+        for obj in self[:1]:
+            return obj
+
+        return None
+
+    def exists(self):
+        if self.result_list is not None:
+            return bool(self.result_list)
+
+        if self.start or self.stop is not None:
+            object_iter = self.iter_results()
+        else:
+            # Ordering doesn't change whether there are results
+            object_iter = self.iter_objects()
+
+        for obj in object_iter:
+            return True
+
+        return False
+
+    def count(self):
+        if self.result_list is not None:
+            return len(self.result_list)
+
+        count = self.manager.count_query(self.filter_list, self.exclude_list)
+
+        if count is None:
+            # Count without building a list of results
+            count = sum(1 for obj in self.iter_objects())
+
+        return self.get_sliced_count(count)
+
+    def get_sliced_count(self, count):
+        count = max(count - self.start, 0)
+
+        if self.stop is not None:
+            count = min(count, self.stop - self.start)
+
+        return count
+
+    def assert_not_sliced(self, method_name):
+        assert self.start == 0 and self.stop is None, (
+            f"cannot call .{method_name}() on a sliced QuerySet"
+        )
+
+    def iter_objects(self):
+        """
+        Yields the objects which match the filters and excludes, in no
+        particular order
+        """
+        return self.manager.iter_query(self.filter_list, self.exclude_list)
+
+    def iter_results(self):
+        """
+        Yields the results of this QuerySet, without caching them
+        """
+        object_iter = self.iter_objects()
+
+        if self.order_by_list:
+            object_iter = iter(self.sort(list(object_iter)))
+
+        if self.start or self.stop is not None:
+            object_iter = itertools.islice(object_iter, self.start, self.stop)
+
+        if self.values_key_list is not None:
+            object_iter = (self.make_values(obj) for obj in object_iter)
+
+        return object_iter
+
+    def sort(self, object_list):
+        get_value = self.manager.get_value
+
+        # Sort by the least significant key first, relying on sort stability
+        for key in reversed(self.order_by_list):
+            reverse = key.startswith("-")
+            key = key.lstrip("-")
+            object_list.sort(
+                key=lambda obj: get_value(obj, key),
+                reverse=reverse,
+            )
+
+        return object_list
+
+    def make_values(self, obj):
+        key_list = self.values_key_list or self.manager.get_keys(obj)
+        get_value = self.manager.get_value
+
+        return {key: get_value(obj, key) for key in key_list}
+
+    def __iter__(self):
+        if self.result_list is None:
+            self.result_list = list(self.iter_results())
+
+        return iter(self.result_list)
+
+    def __len__(self):
+        if self.result_list is None:
+            self.result_list = list(self.iter_results())
+
+        return len(self.result_list)
+
+    def __bool__(self):
+        return self.exists()
+
+    def __getitem__(self, item):
+
+        if self.result_list is not None:
+            return self.result_list[item]
+
+        if isinstance(item, slice):
+
+            if (
+                item.step not in (None, 1)
+                or (item.start or 0) < 0
+                or (item.stop or 0) < 0
+            ):
+                return list(self)[item]
+
+            start = self.start + (item.start or 0)
+            stop = self.stop
+
+            if item.stop is not None:
+                stop = self.start + item.stop
+
+                if self.stop is not None:
+                    stop = min(stop, self.stop)
+
+                stop = max(start, stop)
+
+            return self.clone(start=start, stop=stop)
+
+        if item < 0:
+            return list(self)[item]
+
+        for obj in self[item:item + 1]:
+            return obj
+
+        raise IndexError("QuerySet index out of range")
+
+    def __repr__(self):
+        result_list = list(itertools.islice(self.iter_results(), 21))
+        suffix = ", ..." if len(result_list) > 20 else ""
+        result_list = result_list[:20]
+
+        return f"<{self.__class__.__name__} {result_list!r}{suffix}>"
@@ -0,0 +1,172 @@
+import collections, sys
+from collections import abc
+
+from .manager import ObjectManager
+
+
+class SlotsRecord:
+    """
+    Base class for records built by `make_record_class()` with `slots`
+    storage
+    """
+    __slots__ = ()
+    _fields = ()
+
+    def __init__(self, *args, **kwargs):
+        if len(args) > len(self._fields):
+            raise TypeError(
+                f"{self.__class__.__name__} takes {len(self._fields)} values, "
+                f"but {len(args)} were given"
+            )
+
+        for field, value in zip(self._fields, args):
+            setattr(self, field, value)
+
+        for field, value in kwargs.items():
+            setattr(self, field, value)
+
+    def __iter__(self):
+        return (getattr(self, field) for field in self._fields)
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+
+        return tuple(self) == tuple(other)
+
+    def __repr__(self):
+        values = ", ".join(
+            f"{field}={getattr(self, field, None)!r}" for field in self._fields
+        )
+        return f"{self.__class__.__name__}({values})"
+
+    def __reduce__(self):
+        return self.__class__, tuple(self)
+
+
+def make_record_class(name, field_list, storage="slots", module=None):
+    """
+    Takes a class name, a list of field names, and a storage type
+    Returns a compact record class with those fields
+
+    `slots` records are mutable, and have no per-instance `__dict__`.
+    `tuple` records are named tuples, which are smaller still, but can't be
+    changed in place.
+
+    Like `collections.namedtuple()`, the class is attributed to the calling
+    module, so records can be pickled if the class is assigned to a module
+    level name which matches `name`.
+    """
+    if module is None:
+        module = sys._getframe(1).f_globals.get("__name__", "__main__")
+
+    if storage == "tuple":
+        return collections.namedtuple(name, field_list, module=module)
+
+    assert storage == "slots", (
+        f"storage must be `slots` or `tuple`, not `{storage}`"
+    )
+
+    return type(
+        name,
+        (SlotsRecord,),
+        {
+            "__slots__": tuple(field_list),
+            "_fields": tuple(field_list),
+            "__module__": module,
+        },
+    )
+
+
+class RecordManager(ObjectManager):
+    """
+    An ObjectManager which stores its objects as compact records
+
+    Dicts and objects given to the manager are converted to instances of
+    `record_class`, such as a class made with `make_record_class()`. String
+    values are interned, as are the values of any fields in
+    `intern_field_list`, so that each distinct value is only held in memory
+    once, no matter how many records share it. Only list low-cardinality
+    fields there, since interning unique values costs more than it saves.
+    """
+    record_class = None
+    intern_field_list = []
+
+    def __init__(self, object_list, record_class=None):
+        self.record_class = record_class or self.record_class
+
+        assert self.record_class, (
+            f"{self.__class__} must define .record_class, or be given a "
+            f"`record_class`"
+        )
+
+        self.interned_value_dict = {}
+        self.intern_field_set = set(self.intern_field_list)
+
+        # The manager copies the records into its own list
+        super().__init__(self.make_record(obj) for obj in object_list)
+
+    def add(self, obj):
+        record = self.make_record(obj)
+        super().add(record)
+        return record
+
+    def update(self, obj, **changes):
+        changes = {
+            key: self.intern(key, value) for key, value in changes.items()
+        }
+
+        if not issubclass(self.record_class, tuple):
+            return super().update(obj, **changes)
+
+        # Tuple records can't be changed in place, so replace the record
+        record = obj._replace(**changes)
+        self.remove(obj)
+        super().add(record)
+
+        return record
+
+    def upsert(self, obj, **kwargs):
+        return super().upsert(self.make_record(obj), **kwargs)
+
+    def make_record(self, obj):
+        """
+        Takes a record, dict, or object
+        Returns a record, with its values interned
+        """
+        if isinstance(obj, self.record_class):
+            return obj
+
+        field_list = self.record_class._fields
+
+        if isinstance(obj, abc.Mapping):
+            value_list = [obj[field] for field in field_list]
+        else:
+            value_list = [getattr(obj, field) for field in field_list]
+
+        return self.record_class(*[
+            self.intern(field, value)
+            for field, value in zip(field_list, value_list)
+        ])
+
+    def intern(self, field, value):
+        """
+        Takes a field and a value
+        Returns an equal value which is shared by every record in the
+        manager, if the value can be interned
+        """
+        if type(value) is str:
+            return sys.intern(value)
+
+        if field not in self.intern_field_set:
+            return value
+
+        try:
+            # Key by type too, so that `1`, `1.0` and `True` stay distinct
+            return self.interned_value_dict.setdefault((type(value), value), value)
+        except TypeError:
+            # Unhashable values can't be shared
+            return value
+
+    def get_keys(self, obj):
+        return self.record_class._fields
@@ -1,8 +1,19 @@
-import unittest
+import os, tempfile, threading, unittest
 from types import SimpleNamespace
 
 from .manager import DictManager, ObjectManager
+from .columnar import ColumnarDictManager
+from .concurrent import ConcurrentDictManager
+from .records import RecordManager, make_record_class
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+Record = make_record_class("Record", ["number", "word"])
+TupleRecord = make_record_class("TupleRecord", ["number", "word"], storage="tuple")
 
 NUMBERS = range(100000)
 WORDS = [
@@ -70,3 +81,402 @@ class ManagerTest(unittest.TestCase):
         print(manager.count())
         print(manager.count(number=2))
         print(manager.count(word="two"))
+
+    def testIntersection(self):
+        obj_list = generateDict()
+        manager = DictManager(obj_list)
+
+        result = list(manager.filter(number=2, word="two"))
+        self.assertEqual(result, [{"number": 2, "word": "two"}])
+        self.assertIs(result[0], obj_list[2 * len(WORDS) + 1])
+
+        # Results keep the order of the original object list
+        result = list(manager.filter(word="two", number=2))
+        self.assertEqual(result, [{"number": 2, "word": "two"}])
+
+        self.assertEqual(list(manager.filter(number=2, word="missing")), [])
+        self.assertEqual(list(manager.filter(number=-1, word="two")), [])
+
+    def testLookups(self):
+        obj_list = generateObjects()
+        manager = ObjectManager(obj_list)
+
+        self.assertEqual(manager.count(number__gt=99997), 2 * len(WORDS))
+        self.assertEqual(manager.count(number__gte=99997), 3 * len(WORDS))
+        self.assertEqual(manager.count(number__lt=2), 2 * len(WORDS))
+        self.assertEqual(manager.count(number__lte=2), 3 * len(WORDS))
+        self.assertEqual(manager.count(number__range=(10, 19)), 10 * len(WORDS))
+        self.assertEqual(manager.count(number__between=(10, 19), word="one"), 10)
+        self.assertEqual(manager.count(word__in=["one", "two", "zero"]), 2 * len(NUMBERS))
+        self.assertEqual(manager.count(number__exact=5), len(WORDS))
+
+        # The sorted index is kept up to date when objects are added
+        new = SimpleNamespace()
+        new.number = 1000000
+        new.word = "one"
+        manager.add(new)
+        self.assertEqual(manager.get(number__gt=99999), new)
+
+        with self.assertRaises(manager.QueryException):
+            list(manager.filter(number__range=5))
+
+        # Values which can't be compared with the indexed values
+        for kwargs in [
+            {"number__gt": None},
+            {"number__lte": "5"},
+            {"number__range": (1, "5")},
+        ]:
+
+            with self.assertRaises(manager.QueryException):
+                manager.count(**kwargs)
+
+
+    def testMutation(self):
+        obj_list = generateDict()
+        manager = DictManager(obj_list)
+        manager.index("word")
+        manager.count(number__gte=0)
+
+        obj = manager.get(number=2, word="two")
+
+        manager.update(obj, word="2", number=100000)
+        self.assertEqual(list(manager.filter(number=2, word="two")), [])
+        self.assertIs(manager.get(number=100000), obj)
+        self.assertEqual(manager.count(number__gt=99999), 1)
+        self.assertEqual(manager.count(word="two"), len(NUMBERS) - 1)
+
+        manager.remove(obj)
+        self.assertEqual(manager.count(number=100000), 0)
+        self.assertEqual(manager.count(number__gt=99999), 0)
+        self.assertEqual(manager.count(), len(NUMBERS) * len(WORDS) - 1)
+
+        with self.assertRaises(manager.NotFoundException):
+            manager.remove(obj)
+
+        new = {"number": 3, "word": "three", "extra": True}
+        existing = manager.upsert(new, number=3, word="three")
+        self.assertIsNot(existing, new)
+        self.assertEqual(existing, new)
+
+        new = {"number": 2, "word": "two"}
+        self.assertIs(manager.upsert(new, number=2, word="two"), new)
+        self.assertIs(manager.get(number=2, word="two"), new)
+
+    def testRemove(self):
+        obj_list = [{"number": number, "word": "one"} for number in range(10)]
+        given_list = list(obj_list)
+        manager = DictManager(given_list)
+        manager.index("word")
+
+        manager.remove(obj_list[0])
+
+        # The given list is never changed, and removed objects are never
+        # seen in the object list
+        self.assertEqual(given_list, obj_list)
+        self.assertEqual(manager.object_list, obj_list[1:])
+
+        for obj in obj_list[1:6]:
+            manager.remove(obj)
+
+        # Objects keep their order, and removed ones are dropped from the
+        # list once more than half of it has been removed
+        self.assertEqual(list(manager.all()), obj_list[6:])
+        self.assertEqual(manager.count(), 4)
+        self.assertEqual(manager.object_list, obj_list[6:])
+
+        manager.remove(obj_list[7])
+        self.assertEqual(list(manager.all()), [obj_list[6], obj_list[8], obj_list[9]])
+        self.assertEqual(manager.count(word="one"), 3)
+
+        new = {"number": 10, "word": "one"}
+        manager.add(new)
+        manager.remove(new)
+        self.assertEqual(manager.count(), 3)
+        self.assertEqual(given_list, obj_list)
+
+        # An object which can't be unindexed is left in the manager
+        obj = obj_list[8]
+        manager.index("number")
+        obj["word"] = "changed"
+
+        with self.assertRaises(manager.NotFoundException):
+            manager.remove(obj)
+
+        self.assertIs(manager.get(number=8), obj)
+        self.assertEqual(manager.count(), 3)
+
+    def testSlots(self):
+
+        class SlotObject:
+            __slots__ = ("number", "word")
+
+            def __init__(self, number, word):
+                self.number = number
+                self.word = word
+
+        manager = ObjectManager([SlotObject(1, "one"), SlotObject(2, "two")])
+        existing = manager.upsert(SlotObject(1, "uno"), number=1)
+        self.assertEqual(existing.word, "uno")
+        self.assertIs(manager.get(word="uno"), existing)
+
+    def testCompositeIndex(self):
+        obj_list = generateDict()
+        manager = DictManager(obj_list)
+        manager.index(("number", "word"))
+
+        plan = manager.explain(word="two", number=2, number__lt=10)
+        self.assertEqual(
+            [(step["key"], step["lookup"], step["estimate"]) for step in plan],
+            [(("number", "word"), "exact", 1), ("number", "lt", 60)],
+        )
+
+        obj = manager.get(number=2, word="two")
+        self.assertIs(obj, obj_list[2 * len(WORDS) + 1])
+
+        manager.update(obj, word="2")
+        self.assertEqual(manager.count(number=2, word="two"), 0)
+        self.assertIs(manager.get(number=2, word="2"), obj)
+
+        stats = manager.get_index_stats(("number", "word"))
+        self.assertEqual(stats["value_count"], len(NUMBERS) * len(WORDS))
+        self.assertEqual(stats["bucket_size"], 1)
+
+    def testQuerySet(self):
+        obj_list = generateDict()
+        manager = DictManager(obj_list)
+
+        query_set = manager.filter(number__lt=10).exclude(word="one")
+        self.assertEqual(query_set.count(), 10 * (len(WORDS) - 1))
+        self.assertIsNone(query_set.result_list)
+
+        query_set = query_set.filter(word__in=["two", "three"]).exclude(
+            number=5,
+            word="two",
+        )
+        self.assertEqual(query_set.count(), 19)
+        self.assertTrue(query_set.exists())
+        self.assertFalse(manager.filter(number=-1).exists())
+
+        ordered = query_set.order_by("-number", "word")
+        self.assertEqual(
+            list(ordered.values("number", "word")[:3]),
+            [
+                {"number": 9, "word": "three"},
+                {"number": 9, "word": "two"},
+                {"number": 8, "word": "three"},
+            ],
+        )
+        self.assertEqual(ordered[1:3].count(), 2)
+        self.assertEqual(ordered.first(), {"number": 9, "word": "three"})
+        self.assertIsNone(manager.filter(number=-1).first())
+
+        self.assertIs(manager.all()[0], obj_list[0])
+        self.assertEqual(manager.count(), len(obj_list))
+        self.assertEqual(len(manager.filter(number=3)), len(WORDS))
+
+    def testSnapshot(self):
+        obj_list = generateObjects()
+        manager = ObjectManager(obj_list)
+        manager.index(("number", "word"))
+        manager.count(number__gte=99999)
+
+        with tempfile.TemporaryDirectory() as directory_path:
+            file_path = os.path.join(directory_path, "manager.pickle")
+            manager.save(file_path)
+            loaded = ObjectManager.load(file_path)
+
+        self.assertEqual(set(loaded.index_dict), {("number", "word"), "number"})
+        self.assertEqual(loaded.count(), len(obj_list))
+        self.assertEqual(loaded.count(number__gte=99999), len(WORDS))
+
+        obj = loaded.get(number=2, word="two")
+        self.assertIs(obj, loaded.object_list[2 * len(WORDS) + 1])
+
+        loaded.remove(obj)
+        self.assertEqual(loaded.count(number=2), len(WORDS) - 1)
+
+@unittest.skipUnless(numpy, "requires numpy")
+class ColumnarManagerTest(unittest.TestCase):
+
+    def testColumnar(self):
+        obj_list = generateDict()
+        manager = ColumnarDictManager(obj_list)
+        dict_manager = DictManager(obj_list)
+
+        for kwargs in [
+            {},
+            {"number": 2},
+            {"number": -1},
+            {"word": "two"},
+            {"number__range": (10, 19), "word__in": ["one", "six"]},
+            {"word__gt": "six", "number__lt": 5},
+        ]:
+            self.assertEqual(list(manager.filter(**kwargs)), list(dict_manager.filter(**kwargs)))
+            self.assertEqual(manager.count(**kwargs), dict_manager.count(**kwargs))
+
+        self.assertEqual(manager.get(number=2, word="two"), {"number": 2, "word": "two"})
+
+        # Adding a row which doesn't fit the numeric column re-encodes it
+        manager.add({"number": "2", "word": "two"})
+        self.assertEqual(manager.count(word="two"), len(NUMBERS) + 1)
+        self.assertEqual(manager.get(number="2"), {"number": "2", "word": "two"})
+
+    def testMissingKey(self):
+        manager = ColumnarDictManager([{"a": 1, "b": 1}, {"a": 2, "b": 2}])
+
+        with self.assertRaises(manager.IndexException):
+            manager.add({"a": 3})
+
+        # The bad row is rejected, and the manager keeps working
+        manager.add({"a": 3, "b": 3})
+        self.assertEqual(manager.count(), 3)
+        self.assertEqual(manager.get(a=3), {"a": 3, "b": 3})
+
+        with self.assertRaises(ColumnarDictManager.IndexException):
+            ColumnarDictManager([{"a": 1, "b": 1}, {"a": 2}])
+
+    def testMixedTypes(self):
+        obj_list = [{"v": 1}, {"v": True}, {"v": "s"}, {"v": 1.0}, {"v": None}]
+        manager = ColumnarDictManager(obj_list)
+        dict_manager = DictManager(obj_list)
+
+        # Equal values of different types are read back unchanged
+        result = list(manager.filter())
+        self.assertEqual(result, obj_list)
+        self.assertEqual([type(obj["v"]) for obj in result], [int, bool, str, float, type(None)])
+
+        # Lookups match equal values, as they do in a DictManager
+        for kwargs in [{"v": 1}, {"v": True}, {"v": "s"}, {"v__in": [1.0, None]}, {"v": 2}]:
+            self.assertEqual(list(manager.filter(**kwargs)), list(dict_manager.filter(**kwargs)))
+
+        with tempfile.TemporaryDirectory() as directory_path:
+            manager.save(directory_path)
+            loaded = ColumnarDictManager.load(directory_path)
+
+            self.assertEqual([type(obj["v"]) for obj in loaded.filter()], [int, bool, str, float, type(None)])
+            self.assertEqual(loaded.count(v=1), 3)
+
+    def testPlan(self):
+        manager = ColumnarDictManager(generateDict())
+
+        plan = manager.explain(word="two", number__lt=10)
+        self.assertEqual(
+            [(step["key"], step["lookup"], step["estimate"]) for step in plan],
+            [("number", "lt", 10 * len(WORDS)), ("word", "exact", len(NUMBERS))],
+        )
+
+        stats = manager.get_index_stats("word")
+        self.assertEqual(stats["value_count"], len(WORDS))
+        self.assertEqual(stats["bucket_size"], len(NUMBERS))
+        self.assertEqual(manager.get_index_stats("number")["value_count"], len(NUMBERS))
+
+        with self.assertRaises(manager.QueryException):
+            manager.get_index_stats("missing")
+
+        obj = manager.get(number=2, word="two")
+
+        with self.assertRaises(manager.QueryException):
+            manager.update(obj, word="2")
+
+        with self.assertRaises(manager.QueryException):
+            manager.remove(obj)
+
+    def testSnapshot(self):
+        manager = ColumnarDictManager(generateDict())
+
+        with tempfile.TemporaryDirectory() as directory_path:
+            manager.save(directory_path)
+            loaded = ColumnarDictManager.load(directory_path)
+
+            self.assertIsInstance(loaded.column_dict["number"].values, numpy.memmap)
+            self.assertEqual(loaded.count(), manager.count())
+            self.assertEqual(
+                list(loaded.filter(number__range=(5, 6), word="two")),
+                list(manager.filter(number__range=(5, 6), word="two")),
+            )
+
+            loaded.add({"number": 5, "word": "two"})
+            self.assertEqual(loaded.count(number=5, word="two"), 2)
+
+
+class ConcurrentManagerTest(unittest.TestCase):
+
+    def testConcurrentReads(self):
+        build_list = []
+
+        class Manager(ConcurrentDictManager):
+
+            def make_index(self, object_list, key):
+                build_list.append(key)
+                return super().make_index(object_list, key)
+
+        manager = Manager(generateDict())
+        error_list = []
+        start = threading.Barrier(9)
+
+        def read():
+            try:
+                start.wait()
+
+                for number in range(200):
+                    self.assertEqual(manager.count(number=number, word="one"), 1)
+                    self.assertTrue(manager.filter(number__range=(number, number + 1)).exists())
+
+            except Exception as e:
+                error_list.append(e)
+
+        def write():
+            try:
+                start.wait()
+
+                for number in range(50):
+                    obj = {"number": number, "word": "new"}
+                    manager.add(obj)
+                    manager.update(obj, number=-number)
+                    manager.remove(obj)
+
+            except Exception as e:
+                error_list.append(e)
+
+        thread_list = [threading.Thread(target=read) for _ in range(8)]
+        thread_list.append(threading.Thread(target=write))
+
+        for thread in thread_list:
+            thread.start()
+        for thread in thread_list:
+            thread.join()
+
+        self.assertEqual(error_list, [])
+        self.assertEqual(sorted(build_list), ["number", "word"])
+        self.assertEqual(manager.count(word="new"), 0)
+        self.assertEqual(manager.count(), len(NUMBERS) * len(WORDS))
+
+
+class RecordManagerTest(unittest.TestCase):
+
+    def testRecords(self):
+        for record_class in [Record, TupleRecord]:
+            manager = RecordManager(generateDict(), record_class=record_class)
+            self.assertTrue(all(type(obj) is record_class for obj in manager.object_list))
+            self.assertFalse(hasattr(manager.object_list[0], "__dict__"))
+
+            # Equal strings are shared between records
+            self.assertIs(manager.object_list[0].word, manager.object_list[6].word)
+
+            record = manager.get(number=2, word="two")
+            self.assertEqual(record, record_class(2, "two"))
+
+            record = manager.update(record, word="2")
+            self.assertEqual(manager.count(number=2, word="two"), 0)
+            self.assertIs(manager.get(number=2, word="2"), record)
+
+            record = manager.add({"number": -1, "word": "one"})
+            self.assertIs(manager.get(number=-1), record)
+            self.assertEqual(list(manager.filter(number=-1).values()), [{"number": -1, "word": "one"}])
+
+            with tempfile.TemporaryDirectory() as directory_path:
+                file_path = os.path.join(directory_path, "manager.pickle")
+                manager.save(file_path)
+                loaded = RecordManager.load(file_path, record_class=record_class)
+
+            self.assertEqual(loaded.get(number=-1), record)